@@ -0,0 +1,62 @@
+"""Benchmark of the date handling
+
+Compares the datetime64 date helpers of `hoopla.util` with the previous implementation (one
+`datetime` object per time step, with the fields read in Python loops) on a 30 year series of
+3-hourly dates.
+
+Usage (from the repository root): python -m benchmarks.date_handling
+"""
+import timeit
+from datetime import datetime
+
+import numpy as np
+
+from hoopla.util import find_day_of_year, find_hour, find_non_winter_indexes
+
+N_YEARS = 30
+TIME_STEP_HOURS = 3
+
+
+def find_day_of_year_loop(dates: list[datetime]) -> np.ndarray:
+    """Previous implementation, one date at a time"""
+    day_of_year = []
+    for date in dates:
+        date_interval = date - datetime(year=date.year, month=1, day=1)
+        day_of_year.append(date_interval.days + date_interval.seconds / (60*60*24))
+
+    return np.array(day_of_year)
+
+
+def find_hour_loop(dates: list[datetime]) -> np.ndarray:
+    return np.array([date.hour for date in dates])
+
+
+def find_non_winter_indexes_loop(dates: list[datetime]) -> list[int]:
+    return [i for i, date in enumerate(dates) if date.month not in (1, 2, 3, 12)]
+
+
+def main():
+    dates = np.arange(np.datetime64('1990-01-01T00', 's'), np.datetime64(f'{1990 + N_YEARS}-01-01T00', 's'),
+                      np.timedelta64(TIME_STEP_HOURS, 'h'))
+    date_objects = dates.astype(datetime).tolist()
+
+    cases = [
+        ('day of year', find_day_of_year_loop, find_day_of_year),
+        ('hour', find_hour_loop, find_hour),
+        ('non winter indexes', find_non_winter_indexes_loop, find_non_winter_indexes)
+    ]
+
+    print(f'{len(dates)} dates')
+    print(f'{"":>18} {"loop (ms)":>10} {"datetime64 (ms)":>16} {"speed-up":>9} {"equal":>6}')
+    for name, loop, vectorized in cases:
+        number = 5
+        time_loop = timeit.timeit(lambda: loop(date_objects), number=number) / number
+        time_vectorized = timeit.timeit(lambda: vectorized(dates), number=number) / number
+        equal = np.array_equal(loop(date_objects), vectorized(dates))
+
+        print(f'{name:>18} {1e3 * time_loop:>10.1f} {1e3 * time_vectorized:>16.2f} '
+              f'{time_loop / time_vectorized:>9.1f} {str(equal):>6}')
+
+
+if __name__ == '__main__':
+    main()
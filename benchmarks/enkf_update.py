@@ -0,0 +1,67 @@
+"""Benchmark of the Ensemble Kalman filter analysis
+
+Compares `hoopla.models.DA.ensemble_kalman_filter.update` with an explicit-inverse reference
+(explicit inverse of the innovation covariance and (N, N) intermediate matrices, as the previous
+implementation) for a single gauge and for several gauges.
+
+The reference computes the state anomalies from the ensemble mean, as `update`, so that both give
+the same analysis. The previous implementation used `X - X / N` instead, which is not the anomaly
+matrix: its results differ, and it is not timed here.
+
+Usage (from the repository root): python -m benchmarks.enkf_update
+"""
+import timeit
+
+import numpy as np
+
+from hoopla.models.DA.ensemble_kalman_filter import update
+
+N_STATES = 3
+ENSEMBLE_SIZES = [10, 50, 100, 500, 1000]
+
+
+def explicit_inverse_reference(X: np.ndarray, HX: np.ndarray, D: np.ndarray, E: np.ndarray) -> np.ndarray:
+    """Explicit-inverse reference, with the means computed from ones matrices"""
+    N = X.shape[1]
+    HX, D, E = np.atleast_2d(HX), np.atleast_2d(D), np.atleast_2d(E)
+
+    z = np.dot(HX, np.ones(shape=(N, 1)))
+    HA = HX - np.dot(z, np.ones(shape=(1, N))) / N
+    Y = D - HX
+    L = np.dot(E, E.T) / N
+    P = L + np.dot(HA, HA.T) / (N - 1)
+    M = np.dot(np.linalg.inv(P), Y)
+    Z = np.dot(HA.T, M)
+    A = X - np.dot(X, np.ones(shape=(N, N))) / N
+
+    return X + np.dot(A, Z) / (N - 1)
+
+
+def make_ensemble(N: int, n_obs: int, rng: np.random.Generator) -> tuple:
+    X = rng.gamma(2, 10, size=(N_STATES, N))
+    HX = rng.gamma(2, 1, size=(n_obs, N))
+    E = rng.normal(0, 0.1, size=(n_obs, N))
+    D = HX.mean(axis=1, keepdims=True) + E
+
+    return X, HX, D, E
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    print(f'{"n_obs":>5} {"N":>5} {"reference (ms)":>15} {"update (ms)":>12} {"speed-up":>9} {"max abs diff":>13}')
+    for n_obs in [1, 5]:
+        for N in ENSEMBLE_SIZES:
+            X, HX, D, E = make_ensemble(N, n_obs, rng)
+            number = max(1, 20000 // N)
+
+            time_inverse = timeit.timeit(lambda: explicit_inverse_reference(X, HX, D, E), number=number) / number
+            time_update = timeit.timeit(lambda: update(X.copy(), HX, D, E), number=number) / number
+            difference = np.max(np.abs(explicit_inverse_reference(X, HX, D, E) - update(X.copy(), HX, D, E)))
+
+            print(f'{n_obs:>5} {N:>5} {1e3 * time_inverse:>15.4f} {1e3 * time_update:>12.4f} '
+                  f'{time_inverse / time_update:>9.1f} {difference:>13.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,141 @@
+from typing import Optional, Union
+
 import numpy as np
 
+from hoopla import rng
 from hoopla.config import Config
+from hoopla.models.pet_model import BasePETModel
+
+BLOCK_SIZE = 512  # Number of time steps of the blocks of perturbations drawn at once
+
+
+class Perturbations:
+    """Perturbed inputs and streamflow of the ensemble members
+
+    The perturbations are drawn on demand, by blocks of BLOCK_SIZE time steps, so that
+    only (BLOCK_SIZE, N) matrices are held in memory. Each block is drawn from its own random
+    stream (spawned from `seed` with the block number), so the perturbations do not depend
+    on the size or order of the requested chunks. The blocks are aligned on the dates (the block
+    number counts the time steps since the epoch), so that the perturbations of a date do not
+    depend on the beginning of the observations either (ex. the successive operational updates).
+
+    Perturbations (arrays of N values per time step):
+    TpetRP, TsnowRP, TmaxRP, TminRP: temperatures for the PET and the snow melt
+    QRP, eQRP: perturbed streamflow and its perturbation
+    PtRP: rainfall
+    ERP: potential evapotranspiration
+    """
+
+    def __init__(self,
+                 observations: dict,
+                 config: Config,
+                 pet_model: Optional[BasePETModel] = None,
+                 seed: Union[None, int, np.random.SeedSequence] = None):
+        self.observations = observations
+        self.config = config
+        self.pet_model = pet_model
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+        # Number of time steps between the epoch and the first observation
+        time_step = np.timedelta64(int(config.general.time_step.replace('h', '')), 'h')
+        self.offset = int((np.datetime64(observations['dates'][0], 's') - np.datetime64(0, 's')) // time_step)
+
+        self._block_number = None
+        self._block = None
+
+    def __len__(self) -> int:
+        return len(self.observations['dates'])
+
+    def __getitem__(self, t: int) -> dict:
+        """Perturbations of the time step t"""
+        block_number, i = divmod(self.offset + t, BLOCK_SIZE)
+        if block_number != self._block_number:
+            self._block = self.draw_block(block_number)
+            self._block_number = block_number
+
+        return {name: values[i] for name, values in self._block.items()}
 
+    def chunk(self, begin: int, end: int) -> dict:
+        """Perturbations of the time steps [begin, end[, as (end - begin, N) matrices"""
+        begin, end = self.offset + begin, self.offset + end
+        block_numbers = range(begin // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1)
+        blocks = [self.draw_block(block_number) for block_number in block_numbers]
+        offset = block_numbers[0] * BLOCK_SIZE
 
-def initialize(observation: dict, config: Config) -> tuple[dict, np.ndarray]:
-    """Append initialized values to observation dictionary"""
-    # Temperatures
-    T_pet_RP = np.random.normal(np.array([observation['T'] for _ in range(config.data.N)]).T, config.data.Uc_T_pet)
-    T_snow_RP = np.random.normal(np.array([observation['T'] for _ in range(config.data.N)]).T, config.data.Uc_T_snow_melt)
-    T_max_RP = np.random.normal(np.array([observation['Tmax'] for _ in range(config.data.N)]).T, config.data.Uc_T_max)
-    T_min_RP = np.random.normal(np.array([observation['T'] for _ in range(config.data.N)]).T, config.data.Uc_T_min)
+        return {name: np.concatenate([block[name] for block in blocks])[begin - offset:end - offset] for name in blocks[0]}
 
-    # Streamflow
-    QRP = np.random.normal(
-        loc=np.array([observation['Q'] for _ in range(config.data.N)]).T,
-        scale=np.array([observation['Q'] for _ in range(config.data.N)]).T * config.data.Uc_Q
-    )
-    eQRP = np.array([observation['Q'] for _ in range(config.data.N)]).T - QRP
+    def draw_block(self, block_number: int) -> dict:
+        """Perturbations of the BLOCK_SIZE time steps of the block `block_number` (counted from the epoch)
 
-    # Rainfall
-    k = observation['P'] ** 2 / (config.data.Uc_Pt * observation['P']) ** 2
-    theta = (config.data.Uc_Pt * observation['P']) ** 2 / observation['P']
+        The whole block is always drawn, so that the random streams are consumed the same way whatever the
+        observations it covers: the time steps out of the observations are drawn from zero observations.
+        """
+        begin = block_number * BLOCK_SIZE - self.offset  # Time step of the observations at the beginning of the block
+        observed_steps = slice(max(begin, 0) - begin, min(begin + BLOCK_SIZE, len(self)) - begin)
+        size = (BLOCK_SIZE, self.config.data.N)
 
-    PtRP = np.random.gamma(
-        np.array([k for _ in range(config.data.N)]).T,
-        np.array([theta for _ in range(config.data.N)]).T,
-    )
-    PtRP[np.where(np.isnan(PtRP))] = 0
+        generator = rng.generator(self.seed_sequence, block_number)
+
+        # Observations of the block, as columns broadcast against the members
+        def observed(name: str) -> np.ndarray:
+            values = np.zeros((BLOCK_SIZE, 1))
+            values[observed_steps, 0] = self.observations[name][max(begin, 0):begin + BLOCK_SIZE]
+
+            return values
+
+        block = {}
+
+        # Temperatures
+        block['TpetRP'] = generator.normal(observed('T'), self.config.data.Uc_T_pet, size=size)
+        block['TsnowRP'] = generator.normal(observed('T'), self.config.data.Uc_T_snow_melt, size=size)
+        block['TmaxRP'] = generator.normal(observed('Tmax'), self.config.data.Uc_T_max, size=size)
+        block['TminRP'] = generator.normal(observed('Tmin'), self.config.data.Uc_T_min, size=size)
+
+        # Streamflow
+        Q = observed('Q')
+        block['QRP'] = generator.normal(loc=Q, scale=np.abs(Q) * self.config.data.Uc_Q, size=size)
+        block['eQRP'] = Q - block['QRP']
+
+        # Rainfall: gamma distribution of mean P and standard deviation Uc_Pt * P (shape 1 / Uc_Pt², scale Uc_Pt² * P)
+        P = observed('P')
+        block['PtRP'] = generator.standard_gamma(1 / self.config.data.Uc_Pt ** 2, size=size) * (self.config.data.Uc_Pt ** 2 * P)
+        block['PtRP'][np.isnan(block['PtRP'])] = 0
+
+        # Potential evapotranspiration
+        if self.config.general.compute_pet:
+            # All the members at once, the PET model broadcasts the (time steps, N) temperatures
+            pet_params = self.pet_model.prepare(
+                time_step=self.config.general.time_step,
+                model_inputs={
+                    'P': P[observed_steps],
+                    'T': block['TpetRP'][observed_steps],
+                    'Tmin': block['TminRP'][observed_steps],
+                    'Tmax': block['TmaxRP'][observed_steps],
+                    'dates': self.observations['dates'][max(begin, 0):begin + BLOCK_SIZE]
+                },
+                hyper_parameters={'latitude': self.observations['latitude']}
+            )
+            block['ERP'] = np.full(size, np.nan)
+            block['ERP'][observed_steps] = self.pet_model.run(pet_params)
+        else:
+            block['ERP'] = generator.normal(observed('E'), self.config.data.Uc_E, size=size)
+
+        return block
+
+
+def initialize(observation: dict,
+               config: Config,
+               pet_model: Optional[BasePETModel] = None,
+               seed_sequence: Optional[np.random.SeedSequence] = None) -> tuple[Perturbations, np.ndarray]:
+    """Perturbations of the observations and initial weights of the ensemble members
+
+    The perturbations are drawn from `seed_sequence` (see `hoopla.rng`), or from the configured seed if None.
+    """
+    if seed_sequence is None:
+        seed_sequence = rng.spawn(rng.seed_sequence(config), rng.PERTURBATIONS)
+    perturbations = Perturbations(observation, config, pet_model=pet_model, seed=seed_sequence)
 
     # Initialize weights for the particle filter
-    weights = np.ones(shape=(1, config.data.N)) / config.data.N
-
-    # Potential evapotranspiration
-    if not config.general.compute_pet:
-        observation['ERP'] = np.random.normal([observation['E'] for _ in range(config.data.N)], config.data.Uc_E)
-
-    # Assigning the values to observation
-    observation['TpetRP'] = T_pet_RP
-    observation['TsnowRP'] = T_snow_RP
-    observation['TmaxRP'] = T_max_RP
-    observation['TminRP'] = T_min_RP
-    observation['QRP'] = QRP
-    observation['eQRP'] = eQRP
-    observation['PtRP'] = PtRP
-
-    return observation, weights
+    weights = np.ones(config.data.N) / config.data.N
+
+    return perturbations, weights
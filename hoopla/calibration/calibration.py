@@ -1,39 +1,18 @@
 import json
 import os
-from typing import Sequence
+from typing import Optional, Sequence
 
 import numpy as np
 import spotpy.parameter
-from spotpy import objectivefunctions
 
-from hoopla.calibration.optimization import shuffled_complex_evolution, dds
+from hoopla.calibration.optimization import shuffled_complex_evolution, dds, lbfgsb_refinement, nsgaii
+from hoopla.calibration.scores import SCORES, make_objective_function, score_from_cost
 from hoopla.config import Config
-from hoopla import util
+from hoopla import rng, util
 from hoopla.models.hydro_model import BaseHydroModel
 from hoopla.models.pet_model import BasePETModel
 from hoopla.models.sar_model import BaseSARModel
 
-SCORES = {
-    'RMSE': objectivefunctions.rmse,
-    'RMSEsqrt': NotImplemented,
-    'RMSElog': NotImplemented,
-    'MSE': objectivefunctions.mse,
-    'MSEsqrt': NotImplemented,
-    'MSElog': NotImplemented,
-    'MAE': objectivefunctions.mae,
-    'NSE': objectivefunctions.nashsutcliffe,
-    'NSEsqrt': NotImplemented,
-    'NSEinv': NotImplemented,
-    'PVE': NotImplemented,
-    'PVEabs': NotImplemented,
-    'Balance': NotImplemented,
-    'r': objectivefunctions.correlationcoefficient,
-    'bKGE': NotImplemented,
-    'gKGE': NotImplemented,
-    'KGEm': NotImplemented
-}
-
-
 def make_calibration(config: Config,
                      observations: dict,
                      observations_for_warm_up: dict,
@@ -41,8 +20,9 @@ def make_calibration(config: Config,
                      pet_model: BasePETModel,
                      sar_model: BaseSARModel,
                      model_parameters: Sequence[spotpy.parameter.Base],
-                     filepath_results: str) -> None:
-    simulated_streamflow, best_params = calibrate(
+                     filepath_results: str,
+                     seed_sequence: Optional[np.random.SeedSequence] = None) -> None:
+    simulated_streamflow, best_params, pareto_set = calibrate(
             config=config,
             observations=observations,
             observations_for_warmup=observations_for_warm_up,
@@ -50,6 +30,7 @@ def make_calibration(config: Config,
             pet_model=pet_model,
             sar_model=sar_model,
             model_parameters=model_parameters,
+            seed_sequence=seed_sequence
     )
 
     # Save results
@@ -60,6 +41,7 @@ def make_calibration(config: Config,
         'SAR_model': sar_model.name(),
         'Qsim': list(simulated_streamflow),
         'best_parameters': best_params,
+        'pareto_set': pareto_set,
         'observations': util.serialize_data(observations)
     }
 
@@ -81,7 +63,9 @@ def calibrate(config: Config,
               hydro_model: BaseHydroModel,
               pet_model: BasePETModel,
               sar_model: BaseSARModel,
-              model_parameters: Sequence[spotpy.parameter.Base]) -> tuple[np.ndarray, Sequence[float]]:
+              model_parameters: Sequence[spotpy.parameter.Base],
+              dbname: Optional[str] = None,
+              seed_sequence: Optional[np.random.SeedSequence] = None) -> tuple[np.ndarray, Sequence[float], Optional[dict]]:
     """Calibrate
 
     Parameters
@@ -96,10 +80,19 @@ def calibrate(config: Config,
     pet_model
     sar_model
     model_parameters
+    dbname
+        Name of the file where the optimizer stores its samples. Runs done in
+        parallel must use distinct names. Defaults to the optimizer's name.
+    seed_sequence
+        Root of the random streams of the run (see `hoopla.rng`). Defaults to the configured seed.
 
     Returns
     -------
-    simulated_streamflow, best_params
+    simulated_streamflow, best_params, pareto_set
+        With the multi-objective method (NSGAII), pareto_set is a dict of the
+        non-dominated parameters and of their scores (`config.calibration.scores`),
+        and best_params is the member of the Pareto set with the best first score.
+        Otherwise, pareto_set is None.
 
     Notes
     -----
@@ -107,12 +100,16 @@ def calibrate(config: Config,
     """
     # Scores for the objective function
     # ---------------------------------
-    if config.calibration.score not in SCORES:
-        raise ValueError(f'Score must be one of: {SCORES}')
-    if SCORES[config.calibration.score] == NotImplemented:
-        raise ValueError(f'Score function ({config.calibration.score}) is not implemented')
+    # The multi-objective calibration computes all its scores from each simulation
+    multi_objective = config.calibration.method == 'NSGAII'
+    score_names = config.calibration.scores if multi_objective else [config.calibration.score]
+
+    objective_function = make_objective_function(score_names)
 
-    objective_function = SCORES[config.calibration.score]
+    # The optimizers (spotpy) draw from the global numpy random state, seeded from the calibration stream
+    if seed_sequence is None:
+        seed_sequence = rng.seed_sequence(config)
+    random_state = rng.seed_global_state(seed_sequence, rng.CALIBRATION)
 
     # Calibration
     # This aims to find the best parameters
@@ -132,19 +129,58 @@ def calibrate(config: Config,
     if config.calibration.method == 'DDS':
         best_parameters, best_f = dds(
             hydro_model=hydro_model,
-            max_iteration=config.calibration.maxiter
+            max_iteration=config.calibration.maxiter,
+            dbname=dbname or 'dds-data',
+            random_state=random_state
         )
     elif config.calibration.method == 'SCE':
         best_parameters, best_f = shuffled_complex_evolution(
             hydro_model=hydro_model,
             ngs=config.calibration.SCE['ngs'],
-            max_iteration=config.calibration.maxiter
+            max_iteration=config.calibration.maxiter,
+            peps=config.calibration.peps,
+            dbname=dbname or 'sceua-data',
+            random_state=random_state
+        )
+    elif multi_objective:
+        pareto_parameters, pareto_costs = nsgaii(
+            hydro_model=hydro_model,
+            n_obj=len(score_names),
+            n_pop=config.calibration.NSGAII['n_pop'],
+            max_iteration=config.calibration.maxiter,
+            dbname=dbname or 'nsgaii-data',
+            random_state=random_state
         )
+        i_best = np.argmin(pareto_costs[:, 0])
+        best_parameters, best_f = tuple(pareto_parameters[i_best]), pareto_costs[i_best, 0]
     else:
         raise ValueError(f'Calibration method "{config.calibration.method}" not known. '
-                         'Calibration method should be "DDS" or "SCE"')
+                         'Calibration method should be "DDS", "SCE" or "NSGAII"')
+
+    # Polish the best parameters of the global search (single objective only). The refinement compares
+    # its result to the full precision objective function of the best parameters, never to the rounded
+    # value saved by spotpy, and keeps the best parameters if it does not improve them.
+    if config.calibration.refine and not multi_objective:
+        best_parameters, best_f = lbfgsb_refinement(
+            hydro_model=hydro_model,
+            initial_parameters=best_parameters,
+            peps=config.calibration.peps,
+            max_iteration=config.calibration.maxiter,
+            parallelism=config.general.parallelism
+        )
+
+    if multi_objective:
+        pareto_set = {
+            'parameters': pareto_parameters.tolist(),
+            'scores': {
+                score_name: score_from_cost(score_name, pareto_costs[:, i]).tolist()
+                for i, score_name in enumerate(score_names)
+            }
+        }
+    else:
+        pareto_set = None
 
     # ReRun simulation with best parameters
     simulated_streamflow = hydro_model.simulation(best_parameters)
 
-    return simulated_streamflow, best_parameters
+    return simulated_streamflow, best_parameters, pareto_set
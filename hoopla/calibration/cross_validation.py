@@ -0,0 +1,216 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+from typing import Optional
+
+import numpy as np
+
+from hoopla import data, models, rng
+from hoopla.calibration.calibration import calibrate
+from hoopla.calibration.scores import SCORES
+from hoopla.config import Config, Fold
+from hoopla.models.hydro_model import BaseHydroModel
+from hoopla.models.pet_model import BasePETModel
+from hoopla.models.sar_model import BaseSARModel
+
+
+def make_cross_validation(config: Config,
+                          observations: dict,
+                          filepath_results: str,
+                          seed_sequence: Optional[np.random.SeedSequence] = None) -> None:
+    table = cross_validate(config=config, observations=observations, seed_sequence=seed_sequence)
+
+    # Save results
+    # ------------
+    results = {
+        'score': config.calibration.score,
+        'table': table,
+    }
+
+    if config.general.verbose:
+        print(f'{"fold":>4} {"hydro_model":>12} {"PET_model":>10} {"SAR_model":>10} {"calibration":>12} {"validation":>12}')
+        for row in table:
+            print(f'{row["fold"]:>4} {row["hydro_model"]:>12} {row["PET_model"]:>10} {row["SAR_model"]:>10} '
+                  f'{row["calibration"]["score"]:>12.4f} {row["validation"]["score"]:>12.4f}')
+
+    if os.path.exists(filepath_results):
+        if config.general.overwrite:
+            print(f'{filepath_results} exists, overwriting ...')
+            with open(filepath_results, 'w') as file:
+                json.dump(results, file, indent=4, default=str)
+        else:
+            print(f'{filepath_results} exists, with "overwrite=false", not saving results.')
+    else:
+        with open(filepath_results, 'w') as file:
+            json.dump(results, file, indent=4, default=str)
+
+
+def cross_validate(config: Config,
+                   observations: dict,
+                   seed_sequence: Optional[np.random.SeedSequence] = None) -> list[dict]:
+    """Split-sample cross-validation of every models combination
+
+    Each fold of `config.cross_validation` calibrates the models on its calibration
+    period and scores the calibrated parameters on its validation period.
+    The observations are loaded once and the data (including the warm up) is cropped
+    once per fold (the PET is computed by the hydro model, as in the calibration), then
+    the folds are dispatched to a process pool if `config.general.parallelism`.
+
+    Parameters
+    ----------
+    config
+        Configuration.
+    observations
+        Dictionary of the observed data covering every fold (as returned by `data.load_observations`).
+    seed_sequence
+        Root of the random streams of the catchment (see `hoopla.rng`). Each fold of each models
+        combination calibrates with its own stream. Defaults to the configured seed.
+
+    Returns
+    -------
+    Score table, one row per fold and models combination.
+    """
+    if seed_sequence is None:
+        seed_sequence = rng.seed_sequence(config)
+
+    tasks = []
+    combination_numbers = itertools.count()
+    for pet_model_name in config.models.pet_models:
+        pet_model = models.load_pet_model(pet_model_name)
+
+        for hydro_model_name, sar_model_name in itertools.product(config.models.hydro_models, config.models.sar_models):
+            i_combination = next(combination_numbers)
+            hydro_model = models.load_hydro_model(hydro_model_name)
+            sar_model = models.load_sar_model(sar_model_name)
+
+            for i_fold, fold in enumerate(config.cross_validation.folds):
+                fold_config, fold_data = _crop_fold(config, fold, observations, hydro_model, pet_model, sar_model)
+
+                tasks.append({
+                    'fold': i_fold,
+                    'config': fold_config,
+                    'seed_sequence': rng.spawn(seed_sequence, i_combination, rng.CROSS_VALIDATION, i_fold),
+                    'hydro_model_name': hydro_model_name,
+                    'pet_model_name': pet_model_name,
+                    'sar_model_name': sar_model_name,
+                    **fold_data,
+                })
+
+    if config.general.parallelism:
+        with multiprocessing.Pool() as pool:
+            table = pool.map(_run_fold, tasks)
+    else:
+        table = [_run_fold(task) for task in tasks]
+
+    return table
+
+
+def _crop_fold(config: Config,
+               fold: Fold,
+               observations: dict,
+               hydro_model: BaseHydroModel,
+               pet_model: BasePETModel,
+               sar_model: BaseSARModel) -> tuple[Config, dict]:
+    """Configuration of the fold, and its calibration and validation data (with their warm up)
+
+    The PET is computed by the hydro model, as in the calibration.
+    """
+    fold_config = copy.deepcopy(config)
+    fold_config.general.parallelism = False  # The folds are the ones run in parallel
+    fold_config.dates.calibration = fold.calibration
+    fold_config.dates.simulation = fold.validation
+
+    observations_for_calibration, _, observations_for_calibration_warm_up = data.crop_data(
+        config=fold_config,
+        observations=observations.copy(),
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        ini_type='ini_calibration'
+    )
+    observations_for_validation, _, observations_for_validation_warm_up = data.crop_data(
+        config=fold_config,
+        observations=observations.copy(),
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        ini_type='ini_simulation'
+    )
+
+    return fold_config, {
+        'observations_for_calibration': observations_for_calibration,
+        'observations_for_calibration_warm_up': observations_for_calibration_warm_up,
+        'observations_for_validation': observations_for_validation,
+        'observations_for_validation_warm_up': observations_for_validation_warm_up,
+    }
+
+
+def _run_fold(task: dict) -> dict:
+    """Calibrate and validate one models combination on one fold"""
+    config = task['config']
+
+    hydro_model = models.load_hydro_model(task['hydro_model_name'])
+    pet_model = models.load_pet_model(task['pet_model_name'])
+    sar_model = models.load_sar_model(task['sar_model_name'])
+    model_parameters = data.load_calibration_parameters(config, hydro_model, sar_model)
+
+    # Calibration
+    # -----------
+    simulated_streamflow, best_parameters, _ = calibrate(
+        config=config,
+        observations=task['observations_for_calibration'],
+        observations_for_warmup=task['observations_for_calibration_warm_up'],
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        model_parameters=model_parameters,
+        dbname=f'{config.calibration.method.lower()}-data-fold{task["fold"]}-'
+               f'H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}',
+        seed_sequence=task['seed_sequence']
+    )
+    calibration_score = _score(config, hydro_model, simulated_streamflow)
+
+    # Validation
+    # ----------
+    # The calibration operation simulates the streamflow without data assimilation
+    # and scores it the same way as during the calibration.
+    hydro_model.setup_for_calibration(
+        config=config,
+        operation='calibration',
+        objective_function=hydro_model.objective_function,
+        observations=task['observations_for_validation'],
+        observations_for_warmup=task['observations_for_validation_warm_up'],
+        observed_streamflow=task['observations_for_validation']['Q'],
+        pet_model=pet_model,
+        sar_model=sar_model,
+        model_parameters=model_parameters,
+    )
+    simulated_streamflow = hydro_model.simulation(best_parameters)
+    validation_score = _score(config, hydro_model, simulated_streamflow)
+
+    return {
+        'fold': task['fold'],
+        'hydro_model': hydro_model.name(),
+        'PET_model': pet_model.name(),
+        'SAR_model': sar_model.name(),
+        'best_parameters': [float(p) for p in best_parameters],
+        'calibration': {
+            'begin': config.dates.calibration.begin,
+            'end': config.dates.calibration.end,
+            'score': calibration_score,
+        },
+        'validation': {
+            'begin': config.dates.simulation.begin,
+            'end': config.dates.simulation.end,
+            'score': validation_score,
+        },
+    }
+
+
+def _score(config: Config, hydro_model: BaseHydroModel, simulated_streamflow: np.ndarray) -> float:
+    evaluation, simulation = hydro_model.remove_winter(hydro_model.evaluation(), simulated_streamflow)
+
+    return float(SCORES[config.calibration.score](evaluation, simulation))
+
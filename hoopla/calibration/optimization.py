@@ -1,36 +1,190 @@
-from typing import Sequence
+import multiprocessing
+from typing import Optional, Sequence
 
 import numpy as np
+import scipy.optimize
 import spotpy.parameter
 
-from hoopla.models.hydro_model import BaseHydroModel
+from hoopla.calibration.scores import pareto_front
+from hoopla.models.hydro_model import BaseHydroModel, _init_worker, _objective_function
 
+FINITE_DIFFERENCE_STEP = 1e-3  # Step of the finite differences, relative to the range of the parameters
 
-def shuffled_complex_evolution(hydro_model: BaseHydroModel, ngs: int, max_iteration: int) -> tuple[Sequence[float], float]:
-    sampler = spotpy.algorithms.sceua(hydro_model, dbname='sceua-data', dbformat='csv')
+
+class _EvaluationsExhausted(Exception):
+    """The maximum number of objective function evaluations of the refinement is reached"""
+
+
+def shuffled_complex_evolution(hydro_model: BaseHydroModel,
+                               ngs: int,
+                               max_iteration: int,
+                               peps: float = 1e-4,
+                               dbname: str = 'sceua-data',
+                               random_state: Optional[int] = None) -> tuple[Sequence[float], float]:
+    sampler = spotpy.algorithms.sceua(hydro_model, dbname=dbname, dbformat='csv', random_state=random_state)
     sampler.sample(
         repetitions=max_iteration,  # maximum number of function evaluations allowed during optimization
         ngs=ngs,
         kstop=10,
-        peps=1e-4,
+        peps=peps,
         max_loop_inc=max_iteration * 10
     )
 
-    return _load_results('sceua-data')
+    return _load_results(dbname)
 
 
-def dds(hydro_model: BaseHydroModel, max_iteration: int) -> tuple[Sequence[float], float]:
-    sampler = spotpy.algorithms.dds(hydro_model, dbname='dds-data', dbformat='csv')
+def dds(hydro_model: BaseHydroModel,
+        max_iteration: int,
+        dbname: str = 'dds-data',
+        random_state: Optional[int] = None) -> tuple[Sequence[float], float]:
+    sampler = spotpy.algorithms.dds(hydro_model, dbname=dbname, dbformat='csv', random_state=random_state)
     sampler.sample(repetitions=max_iteration)
 
-    return _load_results('dds-data')
+    return _load_results(dbname)
+
+
+def nsgaii(hydro_model: BaseHydroModel,
+           n_obj: int,
+           n_pop: int,
+           max_iteration: int,
+           dbname: str = 'nsgaii-data',
+           random_state: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Multi-objective calibration (NSGA-II)
+
+    The objective function of the hydro model must return a list of `n_obj` costs.
+
+    Returns
+    -------
+    Pareto set
+        The non-dominated parameters (n_pareto, n_params) among all the evaluated ones
+        and their costs (n_pareto, n_obj).
+    """
+    sampler = spotpy.algorithms.NSGAII(hydro_model, dbname=dbname, dbformat='csv', random_state=random_state)
+    sampler.sample(
+        generations=max(2, max_iteration // n_pop),  # The population is evaluated once per generation
+        n_obj=n_obj,
+        n_pop=n_pop
+    )
+
+    results = spotpy.analyser.load_csv_results(dbname)
+    parameters = np.column_stack([results[name] for name in results.dtype.names if name.startswith('par')])
+    costs = np.column_stack([results[name] for name in results.dtype.names if name.startswith('like')])
+
+    # The same parameters can be evaluated more than once
+    parameters, indexes = np.unique(parameters, axis=0, return_index=True)
+    costs = costs[indexes]
+
+    front = pareto_front(costs)
+
+    return parameters[front], costs[front]
+
+
+def lbfgsb_refinement(hydro_model: BaseHydroModel,
+                      initial_parameters: Sequence[float],
+                      peps: float,
+                      max_iteration: int,
+                      parallelism: bool = False) -> tuple[Sequence[float], float]:
+    """Local refinement of the parameters found by a global optimization
+
+    Bounded quasi-Newton (L-BFGS-B) minimization of the objective function, starting from
+    `initial_parameters`. The parameters are scaled to [0, 1] by their boundaries and the
+    constant parameters are kept fixed. The gradient is computed by central finite differences:
+    at each iteration, the 2·n perturbed parameter sets and the current one are evaluated in
+    a single call, done on a process pool if `parallelism` (in process if the refinement already
+    runs in a pool worker, ex. when the models combinations are run in parallel).
+
+    Parameters
+    ----------
+    hydro_model
+        Hydro model set up for the calibration.
+    initial_parameters
+        Best parameters of the global optimization.
+    peps
+        The refinement stops when the relative improvement of the objective function
+        between two iterations falls below peps.
+    max_iteration
+        Maximum number of objective function evaluations (the L-BFGS-B iterations and line searches
+        are both limited to max_iteration // (2·n + 1) calls).
+    parallelism
+        Evaluate the perturbed parameter sets on a process pool.
+
+    Returns
+    -------
+    best_parameters, best_objective_function_value
+        The refined parameters, or `initial_parameters` if the refinement does not improve them. The
+        objective function value is the full precision one (the values of the spotpy results are rounded).
+    """
+    initial_parameters = np.array(initial_parameters, dtype=np.float64)
+    lower_bounds = np.array([p.minbound for p in hydro_model.model_params], dtype=np.float64)
+    upper_bounds = np.array([p.maxbound for p in hydro_model.model_params], dtype=np.float64)
+    free = upper_bounds > lower_bounds  # Constant parameters have the same lower and upper bounds
+    scale = upper_bounds[free] - lower_bounds[free]
+    n = np.sum(free)
+
+    def to_parameters(u: np.ndarray) -> np.ndarray:
+        parameters = np.repeat(initial_parameters[np.newaxis], len(u), axis=0)
+        parameters[:, free] = lower_bounds[free] + u * scale
+
+        return parameters
+
+    # Pools cannot be nested (ex. when the models combinations are run in parallel)
+    parallelism = parallelism and not multiprocessing.current_process().daemon
+    if parallelism:
+        pool = multiprocessing.Pool(initializer=_init_worker, initargs=(hydro_model,))
+        evaluate = pool.map
+    else:
+        _init_worker(hydro_model)
+        evaluate = map
+
+    initial_cost = hydro_model.objectivefunction(hydro_model.simulation(initial_parameters), hydro_model.evaluation())
+    max_calls = max(1, max_iteration // (2 * n + 1))
+    evaluated = []  # Cost and point of each call
+
+    def cost_and_gradient(u: np.ndarray) -> tuple[float, np.ndarray]:
+        # The line searches can go on past maxfun: the evaluations are also stopped here
+        if len(evaluated) == max_calls:
+            raise _EvaluationsExhausted
+
+        # Current point followed by the forward and backward perturbations (clipped to the boundaries)
+        perturbations = FINITE_DIFFERENCE_STEP * np.eye(n)
+        forward = np.clip(u + perturbations, 0, 1)
+        backward = np.clip(u - perturbations, 0, 1)
+        points = np.vstack([u, forward, backward])
+
+        costs = np.fromiter(evaluate(_objective_function, to_parameters(points)), dtype=np.float64)
+        gradient = (costs[1:n + 1] - costs[n + 1:]) / np.diag(forward - backward)
+        evaluated.append((costs[0], u.copy()))
+
+        return costs[0], gradient
+
+    try:
+        scipy.optimize.minimize(
+            fun=cost_and_gradient,
+            x0=(initial_parameters[free] - lower_bounds[free]) / scale,
+            jac=True,
+            method='L-BFGS-B',
+            bounds=[(0, 1)] * n,
+            options={'ftol': peps, 'maxiter': max_calls, 'maxfun': max_calls}
+        )
+    except _EvaluationsExhausted:
+        pass
+    finally:
+        if parallelism:
+            pool.close()
+            pool.join()
+
+    best_cost, best_u = min(evaluated, key=lambda point: point[0])
+    if best_cost >= initial_cost:
+        return tuple(initial_parameters), float(initial_cost)
+
+    return tuple(to_parameters(best_u[np.newaxis])[0]), float(best_cost)
 
 
 def _load_results(filename: str) -> tuple[Sequence[float], float]:
     results = spotpy.analyser.load_csv_results(filename)
 
     max_index = np.argmin(results['like1'])
-    best_param = results['par'][max_index], results['par_1'][max_index], results['par_2'][max_index], results['par_3'][max_index], results['par_4'][max_index], results['par_5'][max_index]
+    best_param = tuple(results[name][max_index] for name in results.dtype.names if name.startswith('par'))
     best_cost_function_value = results['like1'][max_index]
 
     return best_param, best_cost_function_value
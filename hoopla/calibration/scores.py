@@ -0,0 +1,199 @@
+import functools
+from typing import Callable, Sequence, Union
+
+import numpy as np
+
+# Scores for which the best value is the highest one
+MAXIMIZED_SCORES = {'NSE', 'NSEsqrt', 'NSElog', 'NSEinv', 'r', 'bKGE', 'gKGE', 'KGEm'}
+
+
+def mask_missing(evaluation: np.ndarray, simulation: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Broadcast evaluation and simulation together and set to NaN the time steps where either one is NaN"""
+    evaluation, simulation = np.broadcast_arrays(np.asarray(evaluation, dtype=float), np.asarray(simulation, dtype=float))
+    missing = np.isnan(evaluation) | np.isnan(simulation)
+
+    return np.where(missing, np.nan, evaluation), np.where(missing, np.nan, simulation)
+
+
+def rmse(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Root mean square error"""
+    return np.sqrt(mse(evaluation, simulation, axis=axis))
+
+
+def mse(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Mean square error"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+
+    return np.nanmean((evaluation - simulation) ** 2, axis=axis)
+
+
+def mae(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Mean absolute error"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+
+    return np.nanmean(np.abs(evaluation - simulation), axis=axis)
+
+
+def nse(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Nash-Sutcliffe efficiency"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+    mean_evaluation = np.nanmean(evaluation, axis=axis, keepdims=True)
+
+    return 1 - np.nansum((evaluation - simulation) ** 2, axis=axis) / np.nansum((evaluation - mean_evaluation) ** 2, axis=axis)
+
+
+def pve(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Percent volume error"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+
+    return 100 * (np.nansum(simulation, axis=axis) - np.nansum(evaluation, axis=axis)) / np.nansum(evaluation, axis=axis)
+
+
+def pve_abs(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Absolute percent volume error"""
+    return np.abs(pve(evaluation, simulation, axis=axis))
+
+
+def correlation(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Pearson correlation coefficient"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+    evaluation_anomaly = evaluation - np.nanmean(evaluation, axis=axis, keepdims=True)
+    simulation_anomaly = simulation - np.nanmean(simulation, axis=axis, keepdims=True)
+
+    return np.nansum(evaluation_anomaly * simulation_anomaly, axis=axis) / np.sqrt(
+        np.nansum(evaluation_anomaly ** 2, axis=axis) * np.nansum(simulation_anomaly ** 2, axis=axis)
+    )
+
+
+def kge(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Kling-Gupta efficiency (Gupta et al., 2009)"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+    r = correlation(evaluation, simulation, axis=axis)
+    alpha = np.nanstd(simulation, axis=axis) / np.nanstd(evaluation, axis=axis)
+    beta = np.nanmean(simulation, axis=axis) / np.nanmean(evaluation, axis=axis)
+
+    return 1 - np.sqrt((r - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2)
+
+
+def kge_modified(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Modified Kling-Gupta efficiency, using the ratio of the coefficients of variation (Kling et al., 2012)"""
+    evaluation, simulation = mask_missing(evaluation, simulation)
+    r = correlation(evaluation, simulation, axis=axis)
+    mean_evaluation, mean_simulation = np.nanmean(evaluation, axis=axis), np.nanmean(simulation, axis=axis)
+    beta = mean_simulation / mean_evaluation
+    gamma = (np.nanstd(simulation, axis=axis) / mean_simulation) / (np.nanstd(evaluation, axis=axis) / mean_evaluation)
+
+    return 1 - np.sqrt((r - 1) ** 2 + (gamma - 1) ** 2 + (beta - 1) ** 2)
+
+
+def kge_bounded(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Kling-Gupta efficiency bounded to ]-1, 1] (Mathevet et al., 2006)"""
+    score = kge(evaluation, simulation, axis=axis)
+
+    return score / (2 - score)
+
+
+def _transformed(score: Callable, transformation: str) -> Callable:
+    """Score computed on transformed streamflow
+
+    The epsilon added before the log and inverse transformations is 1/100 of the mean
+    observed streamflow (Pushpalatha et al., 2012).
+    """
+    def transformed_score(evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+        evaluation, simulation = mask_missing(evaluation, simulation)
+        epsilon = np.nanmean(evaluation, axis=axis, keepdims=True) / 100
+
+        if transformation == 'sqrt':
+            return score(np.sqrt(evaluation), np.sqrt(simulation), axis=axis)
+        if transformation == 'log':
+            return score(np.log(evaluation + epsilon), np.log(simulation + epsilon), axis=axis)
+        if transformation == 'inv':
+            return score(1 / (evaluation + epsilon), 1 / (simulation + epsilon), axis=axis)
+
+        raise ValueError(f'Unknown transformation: {transformation}')
+
+    return transformed_score
+
+
+SCORES = {
+    'RMSE': rmse,
+    'RMSEsqrt': _transformed(rmse, 'sqrt'),
+    'RMSElog': _transformed(rmse, 'log'),
+    'MSE': mse,
+    'MSEsqrt': _transformed(mse, 'sqrt'),
+    'MSElog': _transformed(mse, 'log'),
+    'MAE': mae,
+    'NSE': nse,
+    'NSEsqrt': _transformed(nse, 'sqrt'),
+    'NSElog': _transformed(nse, 'log'),
+    'NSEinv': _transformed(nse, 'inv'),
+    'PVE': pve,
+    'PVEabs': pve_abs,
+    'Balance': NotImplemented,
+    'r': correlation,
+    'bKGE': kge_bounded,
+    'gKGE': kge,
+    'KGEm': kge_modified
+}
+
+
+def validate_scores(score_names: Sequence[str]):
+    for score_name in score_names:
+        if score_name not in SCORES:
+            raise ValueError(f'Score must be one of: {list(SCORES)}')
+        if SCORES[score_name] == NotImplemented:
+            raise ValueError(f'Score function ({score_name}) is not implemented')
+
+
+def cost(score_name: str, evaluation: np.ndarray, simulation: np.ndarray, axis: int = -1) -> Union[float, np.ndarray]:
+    """Score converted to a cost to minimize, which is 0 for a perfect simulation
+    (1 - score for the maximized scores, absolute value for PVE).
+    """
+    score = SCORES[score_name](evaluation, simulation, axis=axis)
+
+    if score_name in MAXIMIZED_SCORES:
+        return 1 - score
+    if score_name == 'PVE':
+        return np.abs(score)
+
+    return score
+
+
+def score_from_cost(score_name: str, score_cost: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Inverse of `cost` (the PVE is returned as its absolute value)"""
+    if score_name in MAXIMIZED_SCORES:
+        return 1 - score_cost
+
+    return score_cost
+
+
+def make_objective_function(score_names: Sequence[str]) -> Callable:
+    """Objective function computing the costs of all the scores from the same simulation
+
+    Returns a callable (evaluation, simulation) -> cost, or list of costs if more than
+    one score is given (multi-objective calibration).
+    """
+    validate_scores(score_names)
+
+    if len(score_names) == 1:
+        return functools.partial(cost, score_names[0])
+
+    return functools.partial(_costs, tuple(score_names))
+
+
+def _costs(score_names: Sequence[str], evaluation: np.ndarray, simulation: np.ndarray) -> list[float]:
+    return [cost(score_name, evaluation, simulation) for score_name in score_names]
+
+
+def pareto_front(costs: np.ndarray) -> np.ndarray:
+    """Boolean mask of the non-dominated rows of a (n_samples, n_objectives) matrix of costs"""
+    costs = np.where(np.isnan(costs), np.inf, costs)
+    non_dominated = np.ones(len(costs), dtype=bool)
+
+    for i in range(len(costs)):
+        if non_dominated[i]:
+            # Samples dominated by the i-th one
+            dominated = np.all(costs >= costs[i], axis=1) & np.any(costs > costs[i], axis=1)
+            non_dominated[dominated] = False
+
+    return non_dominated
@@ -1,10 +1,8 @@
-import random
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict
 
 import toml
-import numpy as np
 
 DATA_PATH = './data'
 
@@ -14,6 +12,8 @@ class Operations:
     calibration: bool
     simulation: bool
     forecast: bool
+    update: bool
+    cross_validation: bool
 
 
 @dataclass
@@ -22,6 +22,24 @@ class TimeInterval:
     end: datetime
 
 
+@dataclass
+class Fold:
+    calibration: TimeInterval
+    validation: TimeInterval
+
+    def __post_init__(self):
+        self.calibration = TimeInterval(**self.calibration)
+        self.validation = TimeInterval(**self.validation)
+
+
+@dataclass
+class CrossValidation:
+    folds: list[Fold]
+
+    def __post_init__(self):
+        self.folds = [Fold(**fold) for fold in self.folds]
+
+
 @dataclass
 class Dates:
     calibration: TimeInterval
@@ -54,8 +72,12 @@ class Calibration:
     method: str
     remove_winter: bool
     score: str
+    scores: list[str]
     maxiter: int
+    refine: bool
+    peps: float
     SCE: Dict[str, int]
+    NSGAII: Dict[str, int]
 
 
 @dataclass
@@ -64,6 +86,7 @@ class Forecast:
     perfect_forecast: bool
     horizon: int
     meteo_ens: bool
+    shards: int
 
 
 @dataclass
@@ -82,6 +105,13 @@ class Data:
     PF: Dict
 
 
+@dataclass
+class Output:
+    ensemble: str
+    quantiles: list[float]
+    n_traces: int
+
+
 @dataclass
 class Models:
     hydro_models: list[str]
@@ -98,7 +128,9 @@ class Config:
     calibration: Calibration
     forecast: Forecast
     data: Data
+    output: Output
     models: Models
+    cross_validation: CrossValidation
 
     def __post_init__(self):
         self.operations = Operations(**self.operations)
@@ -107,17 +139,13 @@ class Config:
         self.calibration = Calibration(**self.calibration)
         self.forecast = Forecast(**self.forecast)
         self.data = Data(**self.data)
+        self.output = Output(**self.output)
         self.models = Models(**self.models)
+        self.cross_validation = CrossValidation(**self.cross_validation)
 
 
 def load_config(path: str) -> Config:
     configurations = toml.load(path)
 
-    config = Config(**configurations)
-
-    # Setting seeds
-    if config.general.seed != 'None':
-        random.seed(config.general.seed)
-        np.random.seed(config.general.seed)
-
-    return config
+    # The random streams are derived from config.general.seed (see hoopla.rng)
+    return Config(**configurations)
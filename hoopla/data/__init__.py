@@ -1,4 +1,4 @@
-from .loaders import load_forecast_data, load_model_parameters, load_observations, load_sar_model_parameters, load_calibrated_model_parameters, load_ens_met_data
+from .loaders import load_forecast_data, load_model_parameters, load_observations, load_sar_model_parameters, load_calibration_parameters, load_calibrated_model_parameters, load_ens_met_data
 from .croping import crop_data
 
 __all__ = [
@@ -6,6 +6,7 @@ __all__ = [
     'load_forecast_data',
     'load_model_parameters',
     'load_sar_model_parameters',
+    'load_calibration_parameters',
     'load_ens_met_data',
     'load_calibrated_model_parameters',
     'crop_data',
@@ -0,0 +1,152 @@
+"""Binary cache of the parsed data files
+
+The variables of a data file (ex. a MATLAB observation file) are parsed once, and saved as .npy arrays
+(one per variable, the dates as datetime64) in a `.cache` folder next to the file. The next loads
+memory-map the arrays: nothing is parsed, and only the values used are read from the disk.
+
+The cache of a file is rebuilt when the file changes: a different size, or a different modification
+time and content (SHA-256), so that copying or touching the file does not rebuild its cache.
+"""
+import hashlib
+import json
+import os
+import warnings
+from typing import Callable
+
+import numpy as np
+
+from hoopla.data.ensemble import EnsembleForecastVariable
+
+CACHE_DIRECTORY = '.cache'
+CACHE_VERSION = 1  # Incremented when the format of the cache changes
+
+
+def load(filepath: str, read: Callable[[str], dict]) -> dict:
+    """Variables of the data file `filepath`, read from its cache (created with `read(filepath)` if outdated)
+
+    `read` returns the variables of the file: numbers, numerical arrays or ensemble forecasts (see
+    `EnsembleForecastVariable`, cached as (issues, lead times, members) arrays, their files are closed once
+    cached). The arrays are returned as copy-on-write memory maps. Files with other variables (ex. strings)
+    are not cached.
+    """
+    cache_path = os.path.join(os.path.dirname(filepath), CACHE_DIRECTORY, os.path.basename(filepath))
+
+    metadata = _read_metadata(cache_path)
+    if metadata is None or not _is_up_to_date(filepath, cache_path, metadata):
+        variables = read(filepath)
+        if not all(_is_cacheable(value) for value in variables.values()):
+            return variables
+
+        try:
+            metadata = _write(filepath, cache_path, variables)
+        except OSError as error:
+            warnings.warn(f'Data:Cache, the cache of {filepath} cannot be written ({error}).')
+            return variables
+
+        # The parsed ensemble forecasts (ex. datasets of an open HDF5 file) are replaced by the cache
+        for value in variables.values():
+            if isinstance(value, EnsembleForecastVariable):
+                value.close()
+
+    variables = dict(metadata['scalars'])
+    for name in metadata['arrays']:
+        variables[name] = _load_array(os.path.join(cache_path, f'{name}.npy'))
+
+    return variables
+
+
+def _load_array(path: str) -> np.ndarray:
+    try:
+        return np.asarray(np.load(path, mmap_mode='c'))
+    except ValueError:
+        return np.load(path)  # Empty arrays cannot be memory-mapped
+
+
+def _is_cacheable(value) -> bool:
+    if isinstance(value, EnsembleForecastVariable):
+        return True
+
+    return np.asarray(value).dtype.kind in 'biufM'
+
+
+def _read_metadata(cache_path: str):
+    try:
+        with open(os.path.join(cache_path, 'metadata.json')) as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    return metadata if metadata.get('version') == CACHE_VERSION else None
+
+
+def _is_up_to_date(filepath: str, cache_path: str, metadata: dict) -> bool:
+    stat = os.stat(filepath)
+    if stat.st_size != metadata['size']:
+        return False
+    if stat.st_mtime_ns == metadata['mtime_ns']:
+        return True
+
+    # Modified, or only touched
+    if _sha256(filepath) != metadata['sha256']:
+        return False
+
+    metadata['mtime_ns'] = stat.st_mtime_ns
+    try:
+        _write_metadata(cache_path, metadata)
+    except OSError:
+        pass  # The content is hashed again at the next load
+
+    return True
+
+
+def _write(filepath: str, cache_path: str, variables: dict) -> dict:
+    os.makedirs(cache_path, exist_ok=True)
+    stat = os.stat(filepath)
+
+    metadata = {
+        'version': CACHE_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _sha256(filepath),
+        'scalars': {},
+        'arrays': []
+    }
+    for name, value in variables.items():
+        if np.ndim(value) == 0 and not isinstance(value, EnsembleForecastVariable):
+            metadata['scalars'][name] = np.asarray(value).item()
+            continue
+
+        # Written to a temporary file, the arrays being read by other processes are never changed
+        temporary_path = os.path.join(cache_path, f'{name}.{os.getpid()}.tmp.npy')
+        if isinstance(value, EnsembleForecastVariable):
+            # One issue at a time, the whole ensemble is never held in memory
+            array = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=float, shape=value.shape)
+            for row in range(len(value)):
+                array[row] = value[row]
+            array.flush()
+            del array
+        else:
+            np.save(temporary_path, np.asarray(value))
+        os.replace(temporary_path, os.path.join(cache_path, f'{name}.npy'))
+        metadata['arrays'].append(name)
+
+    # Written last: the cache is only used once all its arrays are written
+    _write_metadata(cache_path, metadata)
+
+    return metadata
+
+
+def _write_metadata(cache_path: str, metadata: dict):
+    temporary_path = os.path.join(cache_path, f'metadata.{os.getpid()}.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(metadata, file)
+    os.replace(temporary_path, os.path.join(cache_path, 'metadata.json'))
+
+
+def _sha256(filepath: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(2 ** 20), b''):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
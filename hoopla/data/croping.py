@@ -1,14 +1,22 @@
+import collections
 import datetime
 import warnings
 from typing import Optional, Tuple
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from hoopla.config import Config
 from hoopla.models.hydro_model import BaseHydroModel
 from hoopla.models.pet_model import BasePETModel
 from hoopla.models.sar_model import BaseSARModel
-from hoopla.util import find_day_of_year
+from hoopla.util import find_date_indexes, find_day_of_year, find_hour
+
+WARM_UP_YEARS_CACHE_SIZE = 16  # Number of warm up years kept (see `find_warm_up_year`)
+
+# Indexes of the warm up years (with the observations they are found in), by identity of the observations,
+# beginning date and time step. The least recently used are dropped beyond WARM_UP_YEARS_CACHE_SIZE.
+_warm_up_years = collections.OrderedDict()
 
 
 def crop_data(config: Config,
@@ -46,14 +54,17 @@ def crop_data(config: Config,
             f"Wrong ini value: {ini_type}. Should be one of ['ini_calibration', 'ini_simulation', 'ini_forecast']."
         )
 
+    date_begin, date_end = np.datetime64(date_begin, 's'), np.datetime64(date_end, 's')
+    forecast_begin, forecast_end = np.datetime64(config.dates.forecast.begin, 's'), np.datetime64(config.dates.forecast.end, 's')
+
     ## Numerical time
     time_step = float(config.general.time_step.replace('h', ''))
 
     ## Get indices of the dates of interest
     dates = observations['dates']
-    select = np.array([date_begin <= d <= date_end for d in dates])  # Array of True and False corresponding to the indexes to keep.
+    select = (date_begin <= dates) & (dates <= date_end)  # Array of True and False corresponding to the indexes to keep.
 
-    if date_begin < min(dates) or date_begin > max(dates) or date_end > max(dates) or date_end < min(dates):
+    if date_begin < dates.min() or date_begin > dates.max() or date_end > dates.max() or date_end < dates.min():
         raise ValueError(
             'Hydrology:Dates, The specified calibration/simulation/forecasting dates are out of the available period'
         )
@@ -62,15 +73,12 @@ def crop_data(config: Config,
     if ini_type == 'ini_forecast':
         if not config.forecast.perfect_forecast:
             # Forecast dates
-            select_forecast_1 = np.array([config.dates.forecast.begin <= d <= config.dates.forecast.end for d in forecast_data_tmp['dates']])  # Array of True and False corresponding to the indices of dates between forecast start and forecast end.
-            dates_without_hours = [datetime.datetime(year=d.year, month=d.month, day=d.day) for d in forecast_data_tmp['dates']]
+            select_forecast_1 = (forecast_begin <= forecast_data_tmp['dates']) & (forecast_data_tmp['dates'] <= forecast_end)  # Array of True and False corresponding to the indices of dates between forecast start and forecast end.
+            time_of_day = forecast_data_tmp['dates'] - forecast_data_tmp['dates'].astype('datetime64[D]')
 
             # issue_time can be a list of time, or an int
-            if isinstance(config.forecast.issue_time, list):
-                issue_time_deltas = [datetime.timedelta(hours=h) for h in config.forecast.issue_time]
-                select_forecast_2 = np.array([d in issue_time_deltas for d in (forecast_data_tmp['dates'] - dates_without_hours)])  # indices of dates corresponding to hydrological issue time
-            else:
-                select_forecast_2 = np.array([d == datetime.timedelta(hours=config.forecast.issue_time) for d in (forecast_data_tmp['dates'] - dates_without_hours)])  # indices of dates corresponding to hydrological issue time
+            issue_time_deltas = np.array(config.forecast.issue_time, ndmin=1) * np.timedelta64(1, 'h')
+            select_forecast_2 = np.isin(time_of_day, issue_time_deltas)  # indices of dates corresponding to hydrological issue time
 
             select_forecast = select_forecast_1 & select_forecast_2
 
@@ -80,59 +88,66 @@ def crop_data(config: Config,
             if len(forecast_dates) == 0:
                 raise ValueError(f'Hydrology:Forecast: There is no available meteorological forecast issued at config.forecast.issue_time : {config.forecast.issue_time}.')
             if time_step != 0:
-                if isinstance(config.forecast.issue_time, list):
-                    for h in config.forecast.issue_time:
-                        if not np.any([d.hour == h for d in forecast_dates]):
-                            warnings.warn(f'Hydrology:Forecast: There is no available meteorological forecast issued at {h}. No hydrological forecast will be issued at this time.')
-                else:
-                    if not np.any([d.hour == config.forecast.issue_time for d in forecast_dates]):
-                        warnings.warn(f'Hydrology:Forecast: There is no available meteorological forecast issued at {config.forecast.issue_time}. No hydrological forecast will be issued at this time.')
+                issued_hours = np.unique(find_hour(forecast_dates))
+                for h in np.array(config.forecast.issue_time, ndmin=1):
+                    if h not in issued_hours:
+                        warnings.warn(f'Hydrology:Forecast: There is no available meteorological forecast issued at {h}. No hydrological forecast will be issued at this time.')
 
             date_ref = observations['dates'][select]  # Array of dates containing all times steps during the forecasting period
-            select_ref = np.array([d in forecast_dates for d in date_ref])  # Find indices of dateRef that also belong to dateFcast
 
-            # Initialization
-            for obs in cropable_data_forecast:
-                forecast_data[obs] = np.empty(shape=(len(date_ref), config.forecast.horizon))
-                forecast_data[obs][:] = np.nan
+            # Index of the forecast issued at each date of dateRef (-1 if none)
+            issue_indexes = find_date_indexes(date_ref, forecast_dates)
+            select_ref = issue_indexes >= 0
+            issue_indexes[select_ref] = np.flatnonzero(select_forecast)[issue_indexes[select_ref]]
 
-            # Retrieve data
-            for obs in cropable_data_forecast:
-                forecast_data[obs][select_ref] = forecast_data_tmp[obs][select_forecast][:, :config.forecast.horizon]
+            if config.forecast.meteo_ens:
+                # The members are read when needed
+                for obs in cropable_data_forecast:
+                    forecast_data[obs] = forecast_data_tmp[obs].crop(issue_indexes, config.forecast.horizon)
+
+            else:
+                # Initialization
+                for obs in cropable_data_forecast:
+                    forecast_data[obs] = np.empty(shape=(len(date_ref), config.forecast.horizon))
+                    forecast_data[obs][:] = np.nan
+
+                # Retrieve data
+                for obs in cropable_data_forecast:
+                    forecast_data[obs][select_ref] = forecast_data_tmp[obs][issue_indexes[select_ref], :config.forecast.horizon]
 
             forecast_data['dates'] = date_ref
             forecast_data['leadTime'] = forecast_data_tmp['leadTime'][:config.forecast.horizon]
 
         if config.forecast.perfect_forecast:
-            select_forecast = np.array([config.dates.forecast.begin <= d <= config.dates.forecast.end for d in observations['dates']])  # Array of True and False corresponding to the indices of dates between forecast start and forecast end.
-            id_select_forecast = np.where(select_forecast == True)[0]
+            select_forecast = (forecast_begin <= observations['dates']) & (observations['dates'] <= forecast_end)  # Array of True and False corresponding to the indices of dates between forecast start and forecast end.
+            id_select_forecast = np.flatnonzero(select_forecast)
 
-            if config.dates.forecast.end + datetime.timedelta(days=config.forecast.horizon * time_step / 24) > observations['dates'][-1]:
+            if forecast_end + config.forecast.horizon * np.timedelta64(int(time_step), 'h') > observations['dates'][-1]:
                 raise ValueError(
                     'Hydrology:Dates: The specified forecasting dates are out of the available period. '
                     'When using perfect forecast, the last forecasting date plus the forecast horizon should not '
                     'exceed the last available day of observed data. Consider changing the end of the forecast period.'
                 )
 
-            # Initialization of matrices
-            for obs in cropable_data_forecast:
-                forecast_data[obs] = np.empty(shape=(np.size(id_select_forecast), config.forecast.horizon))
-                forecast_data[obs][:] = np.nan
+            forecast_data['dates'] = observations['dates'][select_forecast]
+            forecast_data['leadTime'] = (np.arange(1, config.forecast.horizon+1) * np.timedelta64(int(time_step), 'h')).astype('timedelta64[s]')  # Array that contains the forecast lead time
 
-            # Retrieve "forecast" data from observation data
+            # Retrieve "forecast" data from observation data: the row i holds the horizon following the issue i.
+            # The issues are consecutive, the rows are a read-only view of the observations (no copy, in the
+            # precision of the observations)
+            issues = slice(id_select_forecast[0], id_select_forecast[-1] + 1) if np.size(id_select_forecast) else slice(0, 0)
             for obs in cropable_data_forecast:
-                for i, index in enumerate(id_select_forecast):
-                    forecast_data[obs][i] = observations[obs][index+1:index+config.forecast.horizon+1]
-
-            forecast_data['dates'] = observations['dates'][select_forecast]
-            forecast_data['leadTime'] = np.arange(1, config.forecast.horizon+1) * time_step / 24
-            forecast_data['leadTime'] = np.array([datetime.timedelta(days=d) for d in forecast_data['leadTime']])  # Array that contains the forecast lead time in day unit
+                forecast_data[obs] = sliding_window_view(observations[obs][1:], config.forecast.horizon)[issues]
 
             if time_step % 24 != 0:  # Set to NaN values that corresponds to a date that isn't a date when a hydrological forecast is issued
                                      # (only when modeling time step is smaller than 24 hours, otherwise 1 forecast per day is issued)
-                id_nan = np.array([d.hour != config.forecast.issue_time for d in forecast_data['dates']])
+                # The rows of the issues are copied into (issues, horizon) arrays filled with NaN: at sub-daily
+                # time steps, the forecasts are not a view of the observations
+                id_issue = find_hour(forecast_data['dates']) == config.forecast.issue_time
                 for obs in cropable_data_forecast:
-                    forecast_data[obs][id_nan] = np.nan
+                    values = np.full(forecast_data[obs].shape, np.nan, dtype=np.result_type(forecast_data[obs], np.float32))
+                    values[id_issue] = forecast_data[obs][id_issue]
+                    forecast_data[obs] = values
 
     ## Croping data for warm up
     if config.general.compute_warm_up:
@@ -140,9 +155,9 @@ def crop_data(config: Config,
         # date_begin_warm_up = datetime.datetime.fromordinal(int(date_begin.toordinal() - time_step / 3 * 365))
         # date_end_warm_up = datetime.datetime.fromordinal(int(date_begin.toordinal() - time_step / 24))
 
-        date_begin_warm_up = date_begin - datetime.timedelta(days=time_step / 3 * 365)
-        date_end_warm_up = date_begin - datetime.timedelta(days=time_step / 24)
-        select_warm = np.array([date_begin_warm_up <= d <= date_end_warm_up for d in dates])  # Array of True and False corresponding to the indexes to keep.
+        date_begin_warm_up = date_begin - np.timedelta64(datetime.timedelta(days=time_step / 3 * 365))
+        date_end_warm_up = date_begin - np.timedelta64(datetime.timedelta(days=time_step / 24))
+        select_warm = (date_begin_warm_up <= dates) & (dates <= date_end_warm_up)  # Array of True and False corresponding to the indexes to keep.
 
         # Check if one year (3h time step) or 8 years (24h time step) is available prior to date -- case YES
         if np.sum(select_warm) == 365 * 8:
@@ -160,26 +175,7 @@ def crop_data(config: Config,
                 'the beginning of forecast period.'
             )
 
-            # Creation of sliding years which ends by the day of the year that just precedes the beginning of the simulation
-            days_of_year = np.array([find_day_of_year(date) for date in observations['dates']])  # days of the year of the entire period where catchment data are available.
-            day_of_year_start = (date_begin - datetime.datetime(year=date_begin.year, month=1, day=1)).seconds / 60 / 60 / 24  # Days of the year of the first day of simulation
-            day_of_year_end_warm_up = (day_of_year_start - time_step / 24) % 365  # Day of the year of the last timestep of the warm up.
-
-            index_warmup_end = np.argwhere(days_of_year == day_of_year_end_warm_up).flatten()  # Indices of the end of each sliding year.
-            index_warmup_start = index_warmup_end - 365 * 24 / time_step + 1  # indices of the start of each sliding year.
-            index_warmup_start = index_warmup_start.astype(int)
-
-            index_warmup_end = index_warmup_end[1:]  # Removes the 1rst year last timestep index as there is no corresponding first timestep
-            index_warmup_start = index_warmup_start[1:]  # Removes the 1rst year last timestep index as there is no corresponding first timestep
-
-            # Find the average sliding year in terms of precipitation
-            yearly_P = np.empty(shape=(np.size(index_warmup_start)))
-            yearly_P[:] = np.nan
-            for i_year in range(np.size(index_warmup_start)):
-                yearly_P[i_year] = np.sum(observations['P'][index_warmup_start[i_year]:index_warmup_end[i_year]])  # Compute the total precipitation of each sliding year
-
-            i_min_year_P = np.argmin(np.abs(yearly_P - np.mean(yearly_P)))
-            index_warmup = np.arange(index_warmup_start[i_min_year_P], index_warmup_end[i_min_year_P])
+            index_warmup = find_warm_up_year(observations['dates'], observations['P'], date_begin, time_step)
 
             # Retrieve the data of the sliding average warm up year
             for obs in cropable_data_obs:
@@ -200,3 +196,47 @@ def crop_data(config: Config,
             raise ValueError('All streamflow are NaN. The calibration is not possible. Please, change calibration dates')
 
     return observations, forecast_data, observations_for_warm_up
+
+
+def find_warm_up_year(dates: np.ndarray, P: np.ndarray, date_begin: np.datetime64, time_step: float) -> np.ndarray:
+    """Indexes of the sliding year of observations whose total precipitation is the closest to the mean of the sliding years
+
+    The sliding years end by the day of the year that just precedes `date_begin`. Their totals are differences of the
+    cumulative precipitation (NaN for the years with missing precipitation). The indexes are kept for the next crops of
+    the same observations (ex. the calibration, simulation and forecast of several models of a catchment): they are
+    found by identity of the `dates` and `P` arrays, which must not be modified in place.
+    """
+    # The cache holds the arrays, so that their identities are not reused while their indexes are kept
+    key = (id(dates), id(P), date_begin, time_step)
+    if key in _warm_up_years:
+        _warm_up_years.move_to_end(key)
+        return _warm_up_years[key][-1]
+    observations = (dates, P)
+
+    # Creation of sliding years which ends by the day of the year that just precedes the beginning of the simulation
+    days_of_year = find_day_of_year(dates)  # days of the year of the entire period where catchment data are available.
+    day_of_year_start = (date_begin - date_begin.astype('datetime64[Y]')).astype(np.int64) % (24 * 60 * 60) / 60 / 60 / 24  # Days of the year of the first day of simulation
+    day_of_year_end_warm_up = (day_of_year_start - time_step / 24) % 365  # Day of the year of the last timestep of the warm up.
+
+    index_warmup_end = np.flatnonzero(days_of_year == day_of_year_end_warm_up)[1:]  # Indices of the end of each sliding year (the 1rst year has no corresponding first timestep)
+    index_warmup_start = (index_warmup_end - 365 * 24 / time_step + 1).astype(int)  # indices of the start of each sliding year.
+
+    # Total precipitation of each sliding year
+    P = np.asarray(P, dtype=float)
+    missing = np.isnan(P)
+    cumulative_P = np.concatenate([[0.], np.cumsum(np.where(missing, 0., P))])
+    cumulative_missing = np.concatenate([[0], np.cumsum(missing)])
+
+    yearly_P = cumulative_P[index_warmup_end] - cumulative_P[index_warmup_start]
+    yearly_P[cumulative_missing[index_warmup_end] > cumulative_missing[index_warmup_start]] = np.nan
+
+    # Find the average sliding year in terms of precipitation
+    i_min_year_P = np.argmin(np.abs(yearly_P - np.mean(yearly_P)))
+    index_warmup = np.arange(index_warmup_start[i_min_year_P], index_warmup_end[i_min_year_P])
+    index_warmup.flags.writeable = False
+
+    _warm_up_years[key] = (*observations, index_warmup)
+    if len(_warm_up_years) > WARM_UP_YEARS_CACHE_SIZE:
+        _warm_up_years.popitem(last=False)
+
+    return index_warmup
@@ -0,0 +1,67 @@
+from typing import Optional
+
+import numpy as np
+
+
+class EnsembleForecastVariable:
+    """Meteorological ensemble forecast of one variable (ex. P, T), read one issue at a time
+
+    The members of an issue are only read from the source (a numpy array or an HDF5 dataset of a
+    MATLAB v7.3 file) when the issue is requested, so that the whole ensemble never has to be
+    held in memory.
+
+    Parameters
+    ----------
+    source
+        Forecast of shape (issues, lead times, members), or (members, lead times, issues) if `transposed`
+        (MATLAB v7.3 files store the arrays in column-major order).
+    transposed
+        Whether the axes of the source are reversed.
+    issue_indexes
+        Index, in the source, of the issue of each row (-1 if no forecast is issued). All the issues by default.
+    horizon
+        Number of lead times read. All the lead times by default.
+    """
+
+    def __init__(self,
+                 source,
+                 transposed: bool = False,
+                 issue_indexes: Optional[np.ndarray] = None,
+                 horizon: Optional[int] = None):
+        self.source = source
+        self.transposed = transposed
+
+        source_shape = source.shape[::-1] if transposed else source.shape
+        self.issue_indexes = np.arange(source_shape[0]) if issue_indexes is None else np.asarray(issue_indexes)
+        self.horizon = source_shape[1] if horizon is None else horizon
+        self.nbr_members = source_shape[2]
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return len(self.issue_indexes), self.horizon, self.nbr_members
+
+    def __len__(self) -> int:
+        return len(self.issue_indexes)
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        """(horizon, members) forecast of the row (filled with nan if no forecast is issued)"""
+        issue_index = self.issue_indexes[row]
+        if issue_index < 0:
+            return np.full((self.horizon, self.nbr_members), np.nan)
+
+        if self.transposed:
+            return np.asarray(self.source[:, :self.horizon, issue_index], dtype=float).T
+
+        return np.asarray(self.source[issue_index, :self.horizon], dtype=float)
+
+    def crop(self, issue_indexes: np.ndarray, horizon: int) -> 'EnsembleForecastVariable':
+        """Forecast of the rows `issue_indexes` (indexes of the issues of this forecast, -1 if none is issued)"""
+        issue_indexes = np.asarray(issue_indexes)
+        source_indexes = np.where(issue_indexes < 0, -1, self.issue_indexes[issue_indexes])
+
+        return EnsembleForecastVariable(self.source, self.transposed, source_indexes, horizon)
+
+    def close(self):
+        """Close the file of the source (HDF5 dataset), the forecast cannot be read anymore"""
+        if hasattr(self.source, 'file'):
+            self.source.file.close()
@@ -1,32 +1,22 @@
 import json
-from datetime import datetime, timedelta
 
+import h5py
 import numpy as np
 import mat73
 import spotpy.parameter
 from scipy.io import loadmat
 
-from hoopla.config import Config
-from hoopla.data import validation
+from hoopla.config import Config, DATA_PATH
+from hoopla.data import cache, validation
+from hoopla.data.ensemble import EnsembleForecastVariable
+from hoopla.models.hydro_model import BaseHydroModel
 from hoopla.models.pet_model import BasePETModel
 from hoopla.models.sar_model import BaseSARModel
 
 
 def load_observations(path: str, file_format: str, config: Config, pet_model: BasePETModel, sar_model: BaseSARModel) -> dict:
     if file_format == 'mat':
-        try:
-            observation_dict = loadmat(file_name=path, simplify_cells=True)
-        except NotImplementedError:
-            observation_dict = mat73.loadmat(filename=path)
-
-        observation_dict = {k: v for k, v in observation_dict.items() if '__' not in k}
-
-        # Transformation specific to the .mat files
-        observation_dict['P'] = observation_dict.pop('Pt')
-        observation_dict['latitude'] = observation_dict.pop('Lat')
-        observation_dict['dates'] = np.array(
-            [datetime(year=d[0], month=d[1], day=d[2], hour=d[3], minute=d[4], second=d[5]) for d in observation_dict.pop('Date')]
-        )
+        observation_dict = cache.load(path, _read_observations_mat)
 
     else:
         raise ValueError(f'"{file_format}" file_format not supported/not found.')
@@ -44,19 +34,8 @@ def load_observations(path: str, file_format: str, config: Config, pet_model: Ba
 
 def load_forecast_data(filepath: str, file_format: str, config: Config, sar_model: BaseSARModel) -> dict:
     if file_format == 'mat':
-        try:
-            forecast_data = loadmat(file_name=filepath, simplify_cells=True)
-        except NotImplementedError:
-            forecast_data = mat73.loadmat(filename=filepath)
-
-        forecast_data['P'] = forecast_data.pop('Pt')
-        forecast_data['dates'] = np.array(
-            [datetime(year=d[0], month=d[1], day=d[2], hour=d[3], minute=d[4], second=d[5]) for d in forecast_data.pop('Date')]
-        )
-
-        if forecast_data['leadTime'].dtype != float:
-            forecast_data['leadTime'] = forecast_data['leadTime'].astype(float)
-        forecast_data['leadTime'] = np.array([timedelta(days=d) for d in forecast_data['leadTime']])  # Array that contains the forecast lead time in day unit
+        forecast_data = cache.load(filepath, _read_forecast_data_mat)
+        forecast_data['leadTime'] = timedelta64_from_days(forecast_data['leadTime'])  # Array that contains the forecast lead time
 
     else:
         raise ValueError(f'"{file_format}" file_format not supported/not found.')
@@ -66,6 +45,75 @@ def load_forecast_data(filepath: str, file_format: str, config: Config, sar_mode
     return forecast_data
 
 
+def _read_observations_mat(path: str) -> dict:
+    try:
+        observation_dict = loadmat(file_name=path, simplify_cells=True)
+    except NotImplementedError:
+        observation_dict = mat73.loadmat(filename=path)
+
+    observation_dict = {k: v for k, v in observation_dict.items() if '__' not in k}
+
+    # Transformation specific to the .mat files
+    observation_dict['P'] = observation_dict.pop('Pt')
+    observation_dict['latitude'] = observation_dict.pop('Lat')
+    observation_dict['dates'] = datetime64_from_rows(observation_dict.pop('Date'))
+
+    return observation_dict
+
+
+def _read_forecast_data_mat(filepath: str) -> dict:
+    try:
+        forecast_data = loadmat(file_name=filepath, simplify_cells=True)
+    except NotImplementedError:
+        forecast_data = mat73.loadmat(filename=filepath)
+
+    forecast_data = {k: v for k, v in forecast_data.items() if '__' not in k}
+
+    forecast_data['P'] = forecast_data.pop('Pt')
+    forecast_data['dates'] = datetime64_from_rows(forecast_data.pop('Date'))
+    forecast_data['leadTime'] = np.asarray(forecast_data['leadTime'], dtype=float)
+
+    return forecast_data
+
+
+def _read_ens_met_data_mat(filepath: str) -> dict:
+    if h5py.is_hdf5(filepath):
+        file = h5py.File(filepath, 'r')
+        forecast_data = {key: (file[key] if np.ndim(file[key]) == 3 else file[key][()].T) for key in file if '#' not in key}
+        transposed = True
+    else:
+        forecast_data = loadmat(file_name=filepath, simplify_cells=True)
+        forecast_data = {k: v for k, v in forecast_data.items() if '__' not in k}
+        transposed = False
+
+    for key in ['Pt', 'T', 'Tmin', 'Tmax']:
+        if key in forecast_data:
+            source = forecast_data[key] if transposed else np.atleast_3d(forecast_data[key])
+            forecast_data[key] = EnsembleForecastVariable(source, transposed=transposed)
+
+    forecast_data['P'] = forecast_data.pop('Pt')
+    forecast_data['dates'] = datetime64_from_rows(np.atleast_2d(forecast_data.pop('Date')))
+    forecast_data['leadTime'] = np.ravel(forecast_data['leadTime']).astype(float)
+
+    return forecast_data
+
+
+def datetime64_from_rows(date_rows: np.ndarray) -> np.ndarray:
+    """datetime64 dates of the rows [year, month, day, hour, minute, second] of a MATLAB date matrix"""
+    date_rows = np.asarray(date_rows).astype(np.int64)
+
+    months = (date_rows[:, 0] - 1970) * 12 + date_rows[:, 1] - 1
+    days = np.array(months, dtype='datetime64[M]').astype('datetime64[D]') + (date_rows[:, 2] - 1)
+    seconds = date_rows[:, 3] * 3600 + date_rows[:, 4] * 60 + date_rows[:, 5]
+
+    return days.astype('datetime64[s]') + seconds
+
+
+def timedelta64_from_days(days: np.ndarray) -> np.ndarray:
+    """timedelta64[s] durations of fractional days (ex. MATLAB lead times)"""
+    return np.round(np.asarray(days, dtype=float) * 24 * 60 * 60).astype(np.int64).astype('timedelta64[s]')
+
+
 def load_model_parameters(filepath: str, model_name: str, file_format: str) -> list[spotpy.parameter.Base]:
     """The models boundaries correspond to the initial value and the min and max values of each model parameters."""
     if file_format == 'mat':
@@ -139,6 +187,26 @@ def load_sar_model_parameters(
     return parameters
 
 
+def load_calibration_parameters(config: Config, hydro_model: BaseHydroModel, sar_model: BaseSARModel) -> list[spotpy.parameter.Base]:
+    """Parameters to calibrate: the hydrological model parameters, followed by the SAR model ones if the snowmelt is computed"""
+    model_parameters = load_model_parameters(
+        filepath=f'{DATA_PATH}/{config.general.time_step}/Model_parameters/model_param_boundaries.mat',
+        model_name=hydro_model.name(),
+        file_format='mat',
+    )
+
+    if config.general.compute_snowmelt:
+        # Add the SAR model's parameters at the end of the parameters to calibrate
+        model_parameters += load_sar_model_parameters(
+            filepath=f'{DATA_PATH}/{config.general.time_step}/Model_parameters/snow_model_param_boundaries.mat',
+            model_name=sar_model.name(),
+            file_format='mat',
+            calibrate_snow=config.calibration.calibrate_snow
+        )
+
+    return model_parameters
+
+
 def load_calibrated_model_parameters(filepath: str, file_format: str = 'json') -> list[float]:
     """The calibrated models parameters."""
     if file_format == 'json':
@@ -152,19 +220,20 @@ def load_calibrated_model_parameters(filepath: str, file_format: str = 'json') -
 
 
 def load_ens_met_data(filepath: str, file_format: str, config: Config, sar_model: BaseSARModel) -> dict:
-    if file_format == 'mat':
-        try:
-            forecast_data = loadmat(file_name=filepath, simplify_cells=True)
-        except NotImplementedError:
-            forecast_data = mat73.loadmat(filename=filepath)
+    """Meteorological ensemble forecast
 
-        forecast_data['dates'] = np.array(
-            [datetime(year=int(d[0]), month=int(d[1]), day=int(d[2]), hour=int(d[3]), minute=int(d[4]), second=int(d[5])) for d in forecast_data.pop('Date')]
-        )
+    The forecasts (Pt, T, Tmin, Tmax) are (issues, lead times, members) arrays (see `EnsembleForecastVariable`).
+    The first load copies them, one issue at a time, from the MATLAB file into the .npy cache of the file
+    (see hoopla.data.cache): the next loads memory-map the cache, and only the issues used are read from the
+    disk. The MATLAB v7.3 (HDF5) file itself is only read lazily if its cache cannot be written.
+    """
+    if file_format == 'mat':
+        forecast_data = cache.load(filepath, _read_ens_met_data_mat)
+        for key in ['P', 'T', 'Tmin', 'Tmax']:
+            if key in forecast_data and not isinstance(forecast_data[key], EnsembleForecastVariable):
+                forecast_data[key] = EnsembleForecastVariable(forecast_data[key])
 
-        if forecast_data['leadTime'].dtype != float:
-            forecast_data['leadTime'] = forecast_data['leadTime'].astype(float)
-        forecast_data['leadTime'] = np.array([timedelta(days=d) for d in forecast_data['leadTime']])  # Array that contains the ens_met lead time in day unit
+        forecast_data['leadTime'] = timedelta64_from_days(forecast_data['leadTime'])  # Array that contains the ens_met lead time
 
     else:
         raise ValueError(f'"{file_format}" file_format not supported/not found.')
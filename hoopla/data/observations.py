@@ -1,12 +1,11 @@
 from dataclasses import dataclass
-from datetime import datetime
 
 import numpy as np
 
 
 @dataclass
 class Observations:
-    dates: np.ndarray[1, datetime]
+    dates: np.ndarray[1, np.datetime64]
     P: np.ndarray[1, float]
     latitude: float
     Q: np.ndarray[1, float]  # Streamflow
@@ -3,6 +3,7 @@ import warnings
 import numpy
 
 from hoopla.config import Config
+from hoopla.data.ensemble import EnsembleForecastVariable
 from hoopla.models.pet_model import BasePETModel
 from hoopla.models.sar_model import BaseSARModel
 
@@ -68,13 +69,6 @@ def validate_snow_accounting(data_obs: dict, sar_model: BaseSARModel) -> dict:
 
 def validate_meteorological_forecast(config: Config, data_meteo_forecast: dict, sar_model: BaseSARModel) -> dict:
     if config.forecast.perfect_forecast == 0:
-        if config.forecast.meteo_ens:
-            raise NotImplementedError(
-                """Implement this: if Switches.forecast.metEns.on == 1
-                    metFile=matfile(DataPath.dataMetFcast);
-                    DataMetFcast=metFile.Met_fcast(1,DataPath.dataMetFcastEnsMb);"""
-            )
-
         if 'dates' not in data_meteo_forecast:
             raise ValueError('Hydrology:Data, Meteorological date matrix not provided.')
 
@@ -89,8 +83,7 @@ def validate_meteorological_forecast(config: Config, data_meteo_forecast: dict,
 
         if 'Tmin' not in data_meteo_forecast:
             warnings.warn('Hydrology:Data, Tmin meteorological forecast not provided. Tmin set to NaN.')
-            data_meteo_forecast['Tmin'] = numpy.empty(len(data_meteo_forecast['T']))
-            data_meteo_forecast['Tmin'][:] = numpy.NaN
+            data_meteo_forecast['Tmin'] = _missing_forecast(config, data_meteo_forecast['T'])
 
             if config.general.compute_snowmelt and 'CemaNeige' == sar_model.name:
                 warnings.warn('Hydrology:Data, because the meteorological forecast for Tmin is missing, '
@@ -100,8 +93,7 @@ def validate_meteorological_forecast(config: Config, data_meteo_forecast: dict,
 
         if 'Tmax' not in data_meteo_forecast:
             warnings.warn('Hydrology:Data, Tmax meteorological forecast not provided. Tmin set to NaN.')
-            data_meteo_forecast['Tmax'] = numpy.empty(len(data_meteo_forecast['T']))
-            data_meteo_forecast['Tmax'][:] = numpy.NaN
+            data_meteo_forecast['Tmax'] = _missing_forecast(config, data_meteo_forecast['T'])
 
             if config.general.compute_snowmelt and 'CemaNeige' == sar_model.name:
                 warnings.warn('Hydrology:Data, because the meteorological forecast for Tmax is missing, '
@@ -109,7 +101,7 @@ def validate_meteorological_forecast(config: Config, data_meteo_forecast: dict,
                               'This may result in a decrease of performance, especially if the '
                               'Hydrodel function was used during calibration')
 
-        if config.forecast.horizon > len(data_meteo_forecast['P']):
+        if config.forecast.horizon > len(data_meteo_forecast['leadTime']):
             raise ValueError('Hydrology:Data, The specified forecast horizon is longer '
                              'than the meteorological forecast horizon')
 
@@ -118,3 +110,11 @@ def validate_meteorological_forecast(config: Config, data_meteo_forecast: dict,
     elif config.forecast.perfect_forecast:
         return {}
 
+
+def _missing_forecast(config: Config, forecast):
+    """Forecast filled with NaN, of the shape of `forecast`"""
+    if config.forecast.meteo_ens:
+        # Broadcast view, so that the missing members do not take memory
+        return EnsembleForecastVariable(numpy.broadcast_to(numpy.NaN, forecast.shape))
+
+    return numpy.full(numpy.shape(forecast), numpy.NaN)
@@ -1,10 +1,14 @@
 import json
 import os
+from typing import Optional
+
+import numpy as np
 
 from scipy.io import loadmat
 
 from hoopla.config import Config
-from hoopla import util
+from hoopla import util, verification
+from hoopla.state_store import StoredStates
 from hoopla.models.da_model import BaseDAModel
 from hoopla.models.hydro_model import BaseHydroModel
 from hoopla.models.pet_model import BasePETModel
@@ -21,31 +25,48 @@ def make_forecast(
         sar_model: BaseSARModel,
         da_model: BaseDAModel,
         parameters: list[float],
-        filepath_results: str):
+        filepath_results: str,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        initial_states: Optional[StoredStates] = None):
     # Run forecast
-    if config.forecast.meteo_ens:  # Meteorological ensemble prediction system
-        raise NotImplementedError
-    else:
-        simulated_streamflow = forecast(
-            config=config,
-            observations=observations,
-            observations_for_warm_up=observations_for_warm_up,
-            observations_for_forecast=observations_for_forecast,
-            hydro_model=hydro_model,
-            pet_model=pet_model,
-            sar_model=sar_model,
-            da_model=da_model,
-            parameters=parameters
-        )
+    simulated_streamflow, forecast_streamflow = forecast(
+        config=config,
+        observations=observations,
+        observations_for_warm_up=observations_for_warm_up,
+        observations_for_forecast=observations_for_forecast,
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        da_model=da_model,
+        parameters=parameters,
+        seed_sequence=seed_sequence,
+        initial_states=initial_states
+    )
 
     # Save Results
     results = {
         'hydro_model': hydro_model.name(),
         'PET_model': pet_model.name(),
         'SAR_model': sar_model.name(),
-        'Qsim': list(simulated_streamflow),
         'observations': util.serialize_data(observations)
     }
+    if config.data.do_data_assimilation:
+        # With data assimilation, Qsim holds the ensemble summary (see hoopla.summary.EnsembleSummary)
+        results['Qsim'] = util.serialize_data(simulated_streamflow)
+    else:
+        results['Qsim'] = simulated_streamflow.tolist()
+
+    if config.data.do_data_assimilation or config.forecast.meteo_ens:
+        # Summary of the forecast members (data assimilation and/or meteorological ensemble members)
+        results['Qforecast'] = util.serialize_data(forecast_streamflow)
+        results['quantiles'] = config.output.quantiles
+    else:
+        results['Qforecast'] = forecast_streamflow.tolist()
+
+    # Scores of each lead time (see hoopla.verification)
+    results['verification'] = util.serialize_data(
+        verification.verify(observations['Q'], forecast_streamflow, config.output.quantiles)
+    )
 
     if os.path.exists(filepath_results):
         if config.general.overwrite:
@@ -68,7 +89,9 @@ def forecast(
         pet_model: BasePETModel,
         sar_model: BaseSARModel,
         da_model: BaseDAModel,
-        parameters: list[float]):
+        parameters: list[float],
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        initial_states: Optional[StoredStates] = None):
     # Reservoirs to update
     if config.data.do_data_assimilation:
         all_model_updated_res = loadmat(
@@ -86,7 +109,9 @@ def forecast(
         observations_for_forecast=observations_for_forecast,
         pet_model=pet_model,
         sar_model=sar_model,
-        da_model=da_model
+        da_model=da_model,
+        seed_sequence=seed_sequence,
+        initial_states=initial_states
     )
 
     return hydro_model.simulation(parameters)
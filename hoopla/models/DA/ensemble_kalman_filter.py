@@ -1,9 +1,11 @@
 from typing import Iterable
 
 import numpy as np
+import scipy.linalg
 
 from hoopla import config
 from hoopla.models.da_model import BaseDAModel
+from hoopla.models.states import EnsembleStates
 
 
 class DAModel(BaseDAModel):
@@ -15,47 +17,65 @@ class DAModel(BaseDAModel):
         return 'EnsembleKalmanFilter'
 
     def run(self,
-            state_variables: list,
+            state_variables: EnsembleStates,
             Qsim: np.ndarray,
             Q: np.ndarray,
             QRP: np.ndarray,
             eQ: np.ndarray,
             DA_config: config.Data,
-            weights: Iterable) -> tuple[list, Iterable]:
-        # Number members
-        N = DA_config.N
-
-        # Reshaping to get appropriate shape for the following matrix operations
-        Qsim = Qsim.reshape(1, N)
-        QRP = QRP.reshape(1, N)
-        eQ = eQ.reshape(1, N)
-
-        # Initialization of states matrix
-        X = np.empty(shape=(len(DA_config.updated_res), N))
-        X[:] = np.nan
-
-        # Assignment of states
-        for i, res in enumerate(DA_config.updated_res):
-            X[i, :] = np.array([j[res] for j in state_variables])
-
-        # Observation matrix
-        z = np.dot(Qsim, np.ones(shape=(N, 1)))
-
-        # EnKF computation
-        HA = Qsim - np.dot(z, np.ones(shape=(1, N))) / N
-        Y = QRP - Qsim
-        L = np.dot(eQ, eQ.T) / N
-        P = L + np.dot(HA, HA.T) / (N - 1)
-        M = np.dot(np.linalg.inv(P), Y)
-        Z = np.dot(HA.T, M)
-        A = X - 1 / N * X
-        Xa = X + np.dot(A, Z) / (N - 1)
+            weights: Iterable) -> tuple[EnsembleStates, Iterable]:
+        # States matrix (one column per member)
+        X = state_variables.get(DA_config.updated_res).T
+
+        Xa = update(X, HX=Qsim, D=QRP, E=eQ)
 
         # Correction of nonsense state values
-        Xa = np.clip(Xa, 0, np.inf)
+        np.clip(Xa, 0, np.inf, out=Xa)
 
-        for i in range(N):
-            for j, res in enumerate(DA_config.updated_res):
-                state_variables[i][res] = Xa[j][i]
+        state_variables.set(DA_config.updated_res, Xa.T)
 
         return state_variables, weights
+
+
+def update(X: np.ndarray, HX: np.ndarray, D: np.ndarray, E: np.ndarray) -> np.ndarray:
+    """Ensemble Kalman filter analysis (Evensen, 2003)
+
+    The gain is computed from the (n_states, n_obs) cross-covariance of the states and the
+    simulated observations, so no (N, N) matrix is built. With one observation, the
+    innovation covariance is a scalar; with several, it is solved by Cholesky factorization.
+
+    Parameters
+    ----------
+    X
+        (n_states, N) matrix of the states of the N members (updated in place).
+    HX
+        (n_obs, N) or (N,) simulated observations of the members.
+    D
+        (n_obs, N) or (N,) perturbed observations.
+    E
+        (n_obs, N) or (N,) perturbations of the observations.
+
+    Returns
+    -------
+    Analysed states matrix
+    """
+    N = X.shape[1]
+    HX, D, E = np.atleast_2d(HX), np.atleast_2d(D), np.atleast_2d(E)
+
+    # Anomalies (deviations from the ensemble mean)
+    A = X - X.mean(axis=1, keepdims=True)
+    HA = HX - HX.mean(axis=1, keepdims=True)
+
+    # Innovations and their covariance
+    Y = D - HX
+    P = E @ E.T / N + HA @ HA.T / (N - 1)
+
+    # Cross-covariance of the states and the simulated observations
+    C = A @ HA.T / (N - 1)
+
+    if P.shape == (1, 1):
+        X += (C / P[0, 0]) @ Y
+    else:
+        X += C @ scipy.linalg.cho_solve(scipy.linalg.cho_factor(P), Y)
+
+    return X
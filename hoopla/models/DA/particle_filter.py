@@ -0,0 +1,94 @@
+from typing import Iterable
+
+import numpy as np
+
+from hoopla import config
+from hoopla.models.da_model import BaseDAModel
+from hoopla.models.states import EnsembleStates
+
+
+class DAModel(BaseDAModel):
+
+    def __init__(self):
+        super().__init__()
+
+    def name(self) -> str:
+        return 'ParticleFilter'
+
+    def run(self,
+            state_variables: EnsembleStates,
+            Qsim: np.ndarray,
+            Q: np.ndarray,
+            QRP: np.ndarray,
+            eQ: np.ndarray,
+            DA_config: config.Data,
+            weights: Iterable) -> tuple[EnsembleStates, Iterable]:
+        """Sequential importance resampling particle filter
+
+        The weights of the particles are multiplied by the gaussian likelihood of the observed
+        streamflow (standard deviation: Uc_Q * Q), and the particles are resampled when the
+        effective sample size falls below `DA_config.PF['resample_thresh']`.
+        """
+        weights = update_weights(np.ravel(weights), Qsim=np.ravel(Qsim), Q=Q, sigma=DA_config.Uc_Q * Q)
+
+        if effective_sample_size(weights) < DA_config.PF['resample_thresh']:
+            indexes = resample(weights, DA_config.PF['resample_tech'], self.rng)
+            state_variables.select(indexes)
+            weights = np.full(weights.shape, 1 / len(weights))
+
+        return state_variables, weights
+
+
+def update_weights(weights: np.ndarray, Qsim: np.ndarray, Q: float, sigma: float) -> np.ndarray:
+    """Normalized weights multiplied by the gaussian likelihood of the observation
+
+    The weights are kept unchanged if the likelihood cannot be computed (ex. null standard deviation).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_weights = np.log(weights) - 0.5 * ((Q - Qsim) / sigma) ** 2
+
+    if not np.any(np.isfinite(log_weights)):
+        return weights
+
+    # Normalizing in log space avoids the underflow of the likelihoods
+    updated_weights = np.exp(log_weights - np.nanmax(log_weights))
+    updated_weights[np.isnan(updated_weights)] = 0
+
+    return updated_weights / updated_weights.sum()
+
+
+def effective_sample_size(weights: np.ndarray) -> float:
+    return 1 / np.sum(weights ** 2)
+
+
+def systematic_resampling(weights: np.ndarray, generator: np.random.Generator) -> np.ndarray:
+    """Indexes of the resampled particles, drawn at the positions (u + k) / N, u ~ U[0, 1)"""
+    N = len(weights)
+    positions = (generator.random() + np.arange(N)) / N
+
+    return _select(weights, positions)
+
+
+def multinomial_resampling(weights: np.ndarray, generator: np.random.Generator) -> np.ndarray:
+    """Indexes of the resampled particles, drawn independently"""
+    return _select(weights, generator.random(len(weights)))
+
+
+def _select(weights: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    cumulative_weights = np.cumsum(weights)
+    cumulative_weights[-1] = 1  # Avoid rounding errors
+
+    return np.searchsorted(cumulative_weights, positions, side='right')
+
+
+RESAMPLING_TECHNIQUES = {
+    'systematic_resampling': systematic_resampling,
+    'multinomial_resampling': multinomial_resampling,
+}
+
+
+def resample(weights: np.ndarray, technique: str, generator: np.random.Generator) -> np.ndarray:
+    if technique not in RESAMPLING_TECHNIQUES:
+        raise ValueError(f'Resampling technique must be one of: {list(RESAMPLING_TECHNIQUES)}')
+
+    return RESAMPLING_TECHNIQUES[technique](weights, generator)
@@ -0,0 +1,30 @@
+from typing import Iterable
+
+import numpy as np
+
+from hoopla import config
+from hoopla.models.da_model import BaseDAModel
+from hoopla.models.states import EnsembleStates
+
+
+class DAModel(BaseDAModel):
+    """Perturbation of the inputs only
+
+    The members are only driven by their perturbed inputs, their states are never corrected.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    def name(self) -> str:
+        return 'PertOnly'
+
+    def run(self,
+            state_variables: EnsembleStates,
+            Qsim: np.ndarray,
+            Q: np.ndarray,
+            QRP: np.ndarray,
+            eQ: np.ndarray,
+            DA_config: config.Data,
+            weights: Iterable) -> tuple[EnsembleStates, Iterable]:
+        return state_variables, weights
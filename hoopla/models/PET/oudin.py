@@ -1,7 +1,7 @@
 import numpy as np
 
 from hoopla.models.pet_model import BasePETModel
-from hoopla.util import find_day_of_year
+from hoopla.util import find_day_of_year, find_hour
 
 GSC = 0.082  # (MJ / m2 / min)
 RHO = 1000  # (kg / L)
@@ -40,8 +40,9 @@ class PETModel(BasePETModel):
             The time step (3h or 24h).
         model_inputs
             Dictionary containing the following data.
-            dates (Sequence[datetime)): Sequence of the dates.
-            T (Sequence[float]): Sequence of the daily temperature (Celsius).
+            dates (np.ndarray[datetime64]): Sequence of the dates.
+            T (Sequence[float]): Sequence of the daily temperature (Celsius), or (dates, members) array of the
+                temperatures of an ensemble (the radiation of the dates is shared by the members).
         hyper_parameters
             Dictionary containing the following data.
             latitude (float): Station latitude.
@@ -57,7 +58,7 @@ class PETModel(BasePETModel):
         dates, T = model_inputs['dates'], model_inputs['T']
         latitude = hyper_parameters['latitude']
 
-        days_of_year = np.array([find_day_of_year(date) for date in dates])
+        days_of_year = find_day_of_year(dates)
 
         lambda_constant = 2.501 - 0.002361 * T  # (MJ / kg)
 
@@ -70,7 +71,7 @@ class PETModel(BasePETModel):
         if time_step == '3h':
             b = 2. * np.pi * (days_of_year - 81) / 364  # component of the seasonal correction.
             Sc = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)  # seasonal correction
-            t = np.array([d.hour + 0.5 for d in dates])  # standard clock time at the midpoint of the period [hour]
+            t = find_hour(dates) + 0.5  # standard clock time at the midpoint of the period [hour]
             Lz = 75  # longitude of the centre of the local time zone[degrees west of Greenwich]
             Lm = 72.0  # longitude of the measurement site[degrees west of Greenwich]
             omega0 = np.pi / 12. * (t + 0.06667 * (Lz - Lm) + Sc - 12)  # solar time angle at midpoint of the period
@@ -90,6 +91,9 @@ class PETModel(BasePETModel):
         else:
             raise ValueError('Bad time step.')
 
+        # Broadcast the radiation of each date against the members
+        Re = np.reshape(Re, np.shape(Re) + (1,) * (np.ndim(T) - 1))
+
         return {'Re': Re, 'lambda_constant': lambda_constant, 'T': T}
 
     def run(self, params: dict) -> np.ndarray:
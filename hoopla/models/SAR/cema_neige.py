@@ -2,9 +2,9 @@ import calendar
 from typing import Tuple
 
 import numpy as np
-from spotpy.parameter import ParameterSet
 
 from hoopla.models.sar_model import BaseSARModel
+from hoopla.models.states import EnsembleStates
 
 
 class SARModel(BaseSARModel):
@@ -19,7 +19,29 @@ class SARModel(BaseSARModel):
     def hyper_parameters(self) -> list:
         return ['Beta', 'gradT', 'T, Zz5']
 
-    def prepare(self, params: ParameterSet, hyper_parameters: dict) -> dict:
+    def state_names(self) -> list[str]:
+        return ['G', 'eTg']
+
+    def precompute_parameters(self, params: np.ndarray) -> np.ndarray:
+        """Parameters vector given to `run`
+
+        Parameters
+        ----------
+        params
+            Parameters vector. The SAR model uses the last parameters (CTg, Kf).
+
+        Returns
+        -------
+        Parameters vector
+            0. CTg: snow cover thermal coefficient
+            1. Kf: snowmelt factor (mm/°C)
+            2. 1 - CTg
+        """
+        CTg, Kf = params[-2], params[-1]
+
+        return np.array([CTg, Kf, 1 - CTg])
+
+    def prepare(self, params: np.ndarray, hyper_parameters: dict) -> dict:
         """Setup state variables
 
         Parameters
@@ -45,22 +67,23 @@ class SARModel(BaseSARModel):
             'Vmin': hyper_parameters['Vmin'],
         }
 
-    def run(self, model_inputs: dict, params: ParameterSet, state_variables: dict) -> Tuple[float, dict]:
+    def run(self, model_inputs: dict, params: np.ndarray, state_variables: dict) -> Tuple[float, dict]:
         """Snow accounting routine. Compute accumulation and snow melt.
 
         Parameters
         ----------
         model_inputs
             Dict of the model inputs
-            P (float): total precipitation (solid + liquid)
-            T (float): mean temperature (°C)
-            Tmax (float) = max temperature (°C)
-            Tmin (float) = min temperature (°C)
-            Date (datetime): (1x6 matrix)
+            P (float or array): total precipitation (solid + liquid)
+            T (float or array): mean temperature (°C)
+            Tmax (float or array) = max temperature (°C)
+            Tmin (float or array) = min temperature (°C)
+            Date (datetime64 or array of datetime64): date (one per member if the inputs are arrays of members)
         params
-            Set of the model parameters. The SAR model uses the last parameters
+            Parameters vector (see `precompute_parameters`)
             0. CTg: snow cover thermal coefficient (calibrated paramter)
             1. Kf: snowmelt factor (mm/°C) (calibrated paramter)
+            2. 1 - CTg
         state_variables
             Dictionary of the following state variables:
             G: snow stock
@@ -104,7 +127,7 @@ class SARModel(BaseSARModel):
         Tmax = model_inputs['Tmax']
 
         # Parameters
-        CTg, Kf = params[-2], params[-1]
+        CTg, Kf, one_minus_CTg = params[0], params[1], params[2]
 
         # Variables
         G = state_variables['G']
@@ -121,37 +144,40 @@ class SARModel(BaseSARModel):
         nbzalt = 5
 
         # If it is a leap year, julian days after the 29/02 are shifted by one day for gradT
-        day_of_year = date.timetuple().tm_yday
-        if calendar.isleap(date.year) and day_of_year > 59:
-            day_of_year -= 1
-        theta = gradT[day_of_year-1]
-
-        # Effective temperature
-        Tz = T + theta * (Zz - ZmedBV) / 100
-        Tzmax = Tmax + theta * (Zz - ZmedBV) / 100
-        Tzmin = Tmin + theta * (Zz - ZmedBV) / 100
-        Pdis = P / nbzalt  # Distribution of precipitation over the nbzalt bands
+        if np.ndim(date) == 0:
+            # A single date (time loops): converted once, the datetime fields are faster than numpy scalars
+            date = np.datetime64(date, 's').item()
+            day_of_year = date.timetuple().tm_yday
+            if calendar.isleap(date.year) and day_of_year > 59:
+                day_of_year -= 1
+            theta = gradT[day_of_year-1]
+        else:
+            # One date per member (ex. forecasts of several issues)
+            dates = np.asarray(date, dtype='datetime64[D]')
+            years = dates.astype('datetime64[Y]')
+            day_of_year = (dates - years).astype(int) + 1
+            year = years.astype(int) + 1970
+            is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+            day_of_year = np.where(is_leap & (day_of_year > 59), day_of_year - 1, day_of_year)
+            theta = np.expand_dims(gradT[day_of_year-1], -1)
+
+        # Effective temperature (the inputs of the members of an ensemble are along the first axis)
+        Tz = np.expand_dims(T, -1) + theta * (Zz - ZmedBV) / 100
+        Tzmax = np.expand_dims(Tmax, -1) + theta * (Zz - ZmedBV) / 100
+        Tzmin = np.expand_dims(Tmin, -1) + theta * (Zz - ZmedBV) / 100
+        Pdis = np.expand_dims(np.asarray(P, dtype=float), -1) / nbzalt  # Distribution of precipitation over the nbzalt bands (in double precision, as the scalar inputs)
         modc = np.exp(Beta * (Zz - ZmedBV))
         c = np.sum(modc) / nbzalt
         Pz = (1 / c) * Pdis * np.exp(Beta * (Zz - ZmedBV))
 
         # Snow fraction
-        fracneige = np.zeros(nbzalt)
-        for i in range(nbzalt):
-            if Zz[i] < 1500 and not (np.isnan(Tzmin).any() or np.isnan(Tzmax).any()):
-                if Tzmax[i] <= 0:
-                    fracneige[i] = 1
-                elif Tzmin[i] >= 0:
-                    fracneige[i] = 0
-                else:
-                    fracneige[i] = 1 - Tzmax[i] / (Tzmax[i] - Tzmin[i])
-            else:  # USGS function (USGS is chosen if Tmax and Tmin are not defined)
-                if Tz[i] > 3:
-                    fracneige[i] = 0
-                elif Tz[i] < -1:
-                    fracneige[i] = 1
-                else:
-                    fracneige[i] = 1 - (Tz[i] + 1) / (3 + 1)
+        # The Tmin/Tmax function is used for the bands below 1500 m if Tmax and Tmin are defined,
+        # the USGS function otherwise
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fracneige_min_max = np.where(Tzmax <= 0, 1.0, np.where(Tzmin >= 0, 0.0, 1 - Tzmax / (Tzmax - Tzmin)))
+        fracneige_usgs = np.where(Tz > 3, 0.0, np.where(Tz < -1, 1.0, 1 - (Tz + 1) / (3 + 1)))
+        min_max_defined = ~(np.isnan(Tzmin).any(axis=-1) | np.isnan(Tzmax).any(axis=-1))
+        fracneige = np.where((Zz < 1500) & min_max_defined[..., np.newaxis], fracneige_min_max, fracneige_usgs)
 
         fracneige = np.clip(fracneige, a_min=0.0, a_max=1.0)
 
@@ -163,7 +189,7 @@ class SARModel(BaseSARModel):
         G = G + Pg
 
         # Snow pack thermal state
-        eTg = CTg * eTg + (1 - CTg) * Tz
+        eTg = CTg * eTg + one_minus_CTg * Tz
         eTg = np.clip(eTg, a_max=0.0, a_min=None)
 
         # Melting factor according to snowpack thermal state
@@ -183,10 +209,26 @@ class SARModel(BaseSARModel):
         G = G - snow_melt
 
         # Depth total of runoff (sent to the hydrological model)
-        runoff_d = np.sum(Pl) + np.sum(snow_melt)
+        runoff_d = np.sum(Pl, axis=-1) + np.sum(snow_melt, axis=-1)
 
         # Updating state variables
         state_variables['G'] = G
         state_variables['eTg'] = eTg
 
         return runoff_d, state_variables
+
+    def run_ensemble(self, model_inputs: dict, params: np.ndarray, state_variables: EnsembleStates) -> Tuple[np.ndarray, EnsembleStates]:
+        """Snow accounting routine (see `run`) applied to all the members of an ensemble at once
+
+        The snow stock and thermal state of the members are (N, 5) matrices, so `run` handles
+        them directly with the inputs given as arrays of N values.
+        """
+        runoff_d, updated_state_variables = self.run(
+            model_inputs=model_inputs,
+            params=params,
+            state_variables={**state_variables.constants, **state_variables.buffers}
+        )
+        state_variables.buffers['G'][:] = updated_state_variables['G']
+        state_variables.buffers['eTg'][:] = updated_state_variables['eTg']
+
+        return runoff_d, state_variables
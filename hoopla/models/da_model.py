@@ -1,15 +1,28 @@
 import abc
-from typing import Iterable
+from typing import Iterable, Optional
 
 import numpy as np
 
-from .. import config
+from .. import config, rng
+from .states import EnsembleStates
 
 
 class BaseDAModel:
 
     def __init__(self):
-        pass
+        self._rng: Optional[np.random.Generator] = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        """Random stream of the stochastic DA models, drawn from the seed sequence of the run (see `seed`)"""
+        if self._rng is None:
+            raise ValueError(f'{self.name()}: the random stream is used before being seeded (see BaseDAModel.seed).')
+
+        return self._rng
+
+    def seed(self, seed_sequence: np.random.SeedSequence):
+        """Seed the random stream from the seed sequence of the models combination (see hoopla.rng)"""
+        self._rng = rng.generator(seed_sequence, rng.DA_MODEL)
 
     @abc.abstractmethod
     def name(self) -> str:
@@ -17,11 +30,11 @@ class BaseDAModel:
 
     @abc.abstractmethod
     def run(self,
-            state_variables: list,
+            state_variables: EnsembleStates,
             Qsim: np.ndarray,
             Q: np.ndarray,
             QRP: np.ndarray,
             eQ: np.ndarray,
             DA_config: config.Data,
-            weights: Iterable) -> tuple[list, Iterable]:
+            weights: Iterable) -> tuple[EnsembleStates, Iterable]:
         raise NotImplementedError
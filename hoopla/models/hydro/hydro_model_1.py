@@ -1,9 +1,9 @@
 from typing import Dict, Tuple
 
 import numpy as np
-from spotpy.parameter import ParameterSet
 
 from hoopla.models.hydro_model import BaseHydroModel
+from hoopla.models.states import EnsembleStates
 
 
 class HydroModel(BaseHydroModel):
@@ -27,7 +27,28 @@ class HydroModel(BaseHydroModel):
     def inputs(self) -> list:
         return ['P', 'E']
 
-    def prepare(self, params: ParameterSet) -> Dict:
+    def state_names(self) -> list[str]:
+        return ['S', 'R', 'T', 'HY']
+
+    def precompute_parameters(self, params: np.ndarray) -> np.ndarray:
+        """Parameters vector given to `run`
+
+        Parameters
+        ----------
+        params
+            Parameters vector, starting with the 6 model parameters.
+
+        Returns
+        -------
+        Parameters vector
+            The 6 model parameters (see `run`) followed by
+            6. 1 - Rainfall partitioning coefficient
+            7. 1 - Soil reservoir overflow dissociation constant R
+            8. Routing reservoir emptying constant * Routing reservoir emptying constant R T
+        """
+        return np.array([*params[:6], 1 - params[4], 1 - params[1], params[2] * params[5]])
+
+    def prepare(self, params: np.ndarray) -> Dict:
         """Setup state variables
 
         Parameters
@@ -60,7 +81,7 @@ class HydroModel(BaseHydroModel):
 
         return {'S': S, 'R': R, 'T': T, 'DL': DL, 'HY': HY}
 
-    def run(self, model_inputs: Dict, params: ParameterSet, state_variables: Dict) -> Tuple[float, Dict]:
+    def run(self, model_inputs: Dict, params: np.ndarray, state_variables: Dict) -> Tuple[float, Dict]:
         """The model logic
 
         Parameters
@@ -77,6 +98,7 @@ class HydroModel(BaseHydroModel):
             3. Delay
             4. Rainfall partitioning coefficient
             5. Routing reservoir emptying constant R T
+            6-8. Derived constants (see `precompute_parameters`)
         state_variables
             Dict of the state variables
             S: Soil reservoir state
@@ -101,7 +123,7 @@ class HydroModel(BaseHydroModel):
         S, R, T = state_variables['S'], state_variables['R'], state_variables['T']
         DL, HY = state_variables['DL'], state_variables['HY']
 
-        Ps = (1 - params[4]) * P
+        Ps = params[6] * P
         Pr = P - Ps
 
         # Soil moisture accounting(S)
@@ -116,8 +138,8 @@ class HydroModel(BaseHydroModel):
         # Routing part
         # ------------
         # # Slow Routing (R)
-        R = R + Is * (1 - params[1])
-        Qr = R / (params[2] * params[5])
+        R = R + Is * params[7]
+        Qr = R / params[8]
         R = R - Qr
 
         # # Fast routing (T)
@@ -137,3 +159,57 @@ class HydroModel(BaseHydroModel):
 
         return Qsim, updated_state_variables
 
+    def run_ensemble(self, model_inputs: Dict, params: np.ndarray, state_variables: EnsembleStates) -> Tuple[np.ndarray, EnsembleStates]:
+        """The model logic (see `run`) applied to all the members of an ensemble at once
+
+        Parameters
+        ----------
+        model_inputs
+            Dict of the model inputs, arrays of N values or scalars shared by all the members
+            P: Mean areal rainfall (mm)
+            E: Mean areal evapotranspiration (mm)
+        params
+            Set of the model parameters (see `run`)
+        state_variables
+            State variables of the N members (updated in place)
+
+        Returns
+        -------
+        Simulated streamflow of the members, State variables
+        """
+        P, E = model_inputs['P'], model_inputs['E']
+        S, R, T = state_variables.get(['S', 'R', 'T']).T
+        DL, HY = state_variables.constants['DL'], state_variables.buffers['HY']
+
+        Ps = params[6] * P
+        Pr = P - Ps
+
+        # Soil moisture accounting(S)
+        wet = Ps >= E
+        S_wet = S + Ps - E
+        Is = np.where(wet, np.maximum(0.0, S_wet - params[0]), 0.0)
+        S = np.where(wet, S_wet - Is, S * np.exp(np.minimum(Ps - E, 0.0) / params[0]))
+
+        # Routing part
+        # ------------
+        # # Slow Routing (R)
+        R = R + Is * params[7]
+        Qr = R / params[8]
+        R = R - Qr
+
+        # # Fast routing (T)
+        T = T + Pr + Is * params[1]
+        Qt = T / params[5]
+        T = T - Qt
+
+        # Shift HY values of one step (losing the first one) and set last value to 0
+        HY[:, :-1] = HY[:, 1:]
+        HY[:, -1] = 0
+
+        # Total Flow calculation
+        HY += DL * (Qt + Qr)[:, np.newaxis]
+        Qsim = np.maximum(0, HY[:, 0])
+
+        state_variables.set(['S', 'R', 'T'], np.column_stack((S, R, T)))
+
+        return Qsim, state_variables
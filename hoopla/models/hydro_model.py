@@ -1,17 +1,26 @@
 import abc
-from typing import Callable, Optional, Sequence, Union
+import multiprocessing
+from typing import Callable, Iterator, Optional, Sequence, Union
 
 import numpy as np
 import spotpy
 from spotpy.parameter import ParameterSet
 
-from hoopla import assimilation
+from hoopla import assimilation, rng, state_store
+from hoopla.summary import EnsembleSummary
 from hoopla.models.da_model import BaseDAModel
 from hoopla.models.sar_model import BaseSARModel
+from hoopla.models import states
+from hoopla.models.states import EnsembleStates
 from hoopla.util import find_non_winter_indexes
 from hoopla.config import Config
 from hoopla.models.pet_model import BasePETModel
 
+FORECAST_BATCH_SIZE = 2 ** 16  # Number of members (of all the issues of a batch) advanced together by the forecasts
+
+# Hydro model of the worker processes (forecast shards, calibration refinement)
+_worker_hydro_model: Optional['BaseHydroModel'] = None
+
 
 class BaseHydroModel:
 
@@ -32,6 +41,11 @@ class BaseHydroModel:
         self.model_params: Sequence[spotpy.parameter.Base] = []
 
         self.operation = None
+        self.seed_sequence: Optional[np.random.SeedSequence] = None
+
+        # States the forecast starts from (operational update) and states at its end
+        self.initial_states: Optional[state_store.StoredStates] = None
+        self.final_states: Optional[state_store.StoredStates] = None
 
     def setup(self,
               config: Config,
@@ -41,7 +55,9 @@ class BaseHydroModel:
               sar_model: BaseSARModel,
               observations_for_warmup: dict,
               observations_for_forecast: dict = None,
-              da_model: BaseDAModel = None):
+              da_model: BaseDAModel = None,
+              seed_sequence: Optional[np.random.SeedSequence] = None,
+              initial_states: Optional[state_store.StoredStates] = None):
         self.config = config
 
         if operation not in ('calibration', 'simulation', 'forecast'):
@@ -57,6 +73,12 @@ class BaseHydroModel:
         self.sar_model = sar_model
         self.da_model = da_model
 
+        # Root of the random streams of the data assimilation (see hoopla.rng)
+        self.seed_sequence = seed_sequence if seed_sequence is not None else rng.seed_sequence(config)
+
+        self.initial_states = initial_states
+        self.final_states = None
+
     def setup_for_calibration(
             self,
             config: Config,
@@ -83,7 +105,7 @@ class BaseHydroModel:
         self.model_params = model_parameters
 
     @abc.abstractmethod
-    def prepare(self, params: ParameterSet):
+    def prepare(self, params: np.ndarray):
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -95,9 +117,45 @@ class BaseHydroModel:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def run(self, model_inputs: dict, params: ParameterSet, state_variables: dict):
+    def state_names(self) -> list[str]:
+        """Names of the state variables evolving with time (the other ones are constants)"""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def run(self, model_inputs: dict, params: np.ndarray, state_variables: dict):
+        raise NotImplementedError
+
+    def run_ensemble(self, model_inputs: dict, params: np.ndarray, state_variables: EnsembleStates):
+        """Advance all the members of an ensemble by one time step
+
+        The model inputs are arrays of N values (one per member) or scalars shared by all
+        the members. This default implementation calls `run` once per member; models can
+        override it to advance the members at once as arrays.
+
+        Returns
+        -------
+        Array of N outputs, State variables (updated in place)
+        """
+        outputs = np.empty(state_variables.N)
+
+        for j in range(state_variables.N):
+            outputs[j], member_state_variables = self.run(
+                model_inputs={name: value if np.ndim(value) == 0 else value[j] for name, value in model_inputs.items()},
+                params=params,
+                state_variables=state_variables.member(j)
+            )
+            state_variables.set_member(j, member_state_variables)
+
+        return outputs, state_variables
+
+    def precompute_parameters(self, params: np.ndarray) -> np.ndarray:
+        """Parameters vector given to `run`
+
+        Called once per simulation, before the time loop. Models can override it to
+        append constants derived from their parameters, so `run` only reads them.
+        """
+        return params
+
     def parameters(self):
         return spotpy.parameter.generate(self.model_params)
 
@@ -105,22 +163,29 @@ class BaseHydroModel:
         return self.observed_streamflow
 
     def simulation(self, params: Union[ParameterSet, Sequence[float]]) -> np.ndarray:
+        # The parameters (spotpy ParameterSet, with its constant parameters, or sequence of floats)
+        # are converted once, so that the time loops only read plain float64 arrays.
+        params = np.array(list(params), dtype=np.float64)
+        sar_params = self.sar_model.precompute_parameters(params) if self.config.general.compute_snowmelt else None
+        params = self.precompute_parameters(params)
+
         if self.config.general.compute_warm_up:
-            state_variables_warmup, sar_state_variables_warmup = self._warmup(params)
+            state_variables_warmup, sar_state_variables_warmup = self._warmup(params, sar_params)
         else:
             state_variables_warmup, sar_state_variables_warmup = None, None
 
         if self.operation == 'calibration':
-            return self._calibration(params, state_variables_warmup, sar_state_variables_warmup)
+            return self._calibration(params, sar_params, state_variables_warmup, sar_state_variables_warmup)
 
         if self.operation == 'simulation':
-            return self._simulation(params, state_variables_warmup, sar_state_variables_warmup)
+            return self._simulation(params, sar_params, state_variables_warmup, sar_state_variables_warmup)
 
         if self.operation == 'forecast':
-            return self._forecast(params, state_variables_warmup, sar_state_variables_warmup)
+            return self._forecast(params, sar_params, state_variables_warmup, sar_state_variables_warmup)
 
     def _calibration(self,
-                     params: Union[ParameterSet, Sequence[float]],
+                     params: np.ndarray,
+                     sar_params: Optional[np.ndarray],
                      state_variables_warmup: dict = None,
                      sar_state_variables_warmup: dict = None) -> np.ndarray:
         # Compute E or get the one from the observations data
@@ -128,7 +193,7 @@ class BaseHydroModel:
 
         # Init SAR model
         if self.config.general.compute_snowmelt:
-            sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations)
+            sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations)
         else:
             sar_state_variables = None
 
@@ -157,7 +222,7 @@ class BaseHydroModel:
                         'Tmax': self.observations['Tmax'][i],
                         'Date': self.observations['dates'][i]
                     },
-                    params=params,
+                    params=sar_params,
                     state_variables=sar_state_variables
                 )
                 Qsim, state_variables = self.run(
@@ -179,37 +244,21 @@ class BaseHydroModel:
         return np.array(simulated_streamflow)
 
     def _simulation(self,
-                    params: Union[ParameterSet, Sequence[float]],
+                    params: np.ndarray,
+                    sar_params: Optional[np.ndarray],
                     state_variables_warmup: dict = None,
-                    sar_state_variables_warmup: dict = None) -> np.ndarray:
-        # Data assimilation initialization
-        if self.config.data.do_data_assimilation:
-            self.observations, weights = assimilation.initialize(self.observations, self.config)
-
+                    sar_state_variables_warmup: dict = None) -> Union[np.ndarray, dict]:
         # Simulation with Data Assimilation
         if self.config.data.do_data_assimilation:
-            # Compute potential evapotranspiration
-            if self.config.general.compute_pet:
-                ERP = np.empty(shape=(len(self.observations['dates']), self.config.data.N))
-                ERP[:] = np.nan
-
-                for t in range(self.config.data.N):
-                    pet_params = self.pet_model.prepare(
-                        time_step=self.config.general.time_step,
-                        model_inputs={
-                            'P': self.observations['P'][t],
-                            'T': self.observations['TpetRP'][:, t],
-                            'Tmin': self.observations['TminRP'][:, t],
-                            'Tmax': self.observations['TmaxRP'][:, t],
-                            'dates': self.observations['dates']
-                        },
-                        hyper_parameters={'latitude': self.observations['latitude']}
-                    )
-                    ERP[:, t] = self.pet_model.run(pet_params)
+            # Perturbations of the inputs, drawn on demand in the time loop
+            perturbations, weights = assimilation.initialize(
+                self.observations, self.config, self.pet_model, rng.spawn(self.seed_sequence, rng.PERTURBATIONS)
+            )
+            self.da_model.seed(self.seed_sequence)
 
             # Snow accounting model initialization
             if self.config.general.compute_snowmelt:
-                sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations)
+                sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations)
             else:
                 sar_state_variables = None
 
@@ -225,74 +274,79 @@ class BaseHydroModel:
                     for key, value in sar_state_variables_warmup.items():
                         sar_state_variables[key] = value
 
-            # Setting state variables for the data assimilation process
-            state_variables = [state_variables for _ in range(self.config.data.N)]
+            # Setting state variables for the data assimilation process (each member owns its states)
+            state_variables = EnsembleStates.from_state_variables(state_variables, self.state_names(), self.config.data.N)
             if self.config.general.compute_snowmelt:
-                sar_state_variables = [sar_state_variables for _ in range(self.config.data.N)]
+                sar_state_variables = EnsembleStates.from_state_variables(
+                    sar_state_variables, self.sar_model.state_names(), self.config.data.N
+                )
 
             # Run simulation
-            simulated_streamflow = []
+            simulated_streamflow = EnsembleSummary(
+                shape=(len(self.observations['dates']),),
+                N=self.config.data.N,
+                output_config=self.config.output,
+                generator=rng.generator(self.seed_sequence, rng.OUTPUT)
+            )
 
             if self.config.general.compute_snowmelt:
                 for t, _ in enumerate(self.observations['dates']):
-                    simulated_streamflow.append([])
-
-                    for j in range(self.config.data.N):
-                        runoff_d, sar_state_variables[j] = self.sar_model.run(
-                            model_inputs={
-                                'P': self.observations['PtRP'][t][j],
-                                'T': self.observations['TsnowRP'][t][j],
-                                'Tmin': self.observations['TminRP'][t][j],
-                                'Tmax': self.observations['TmaxRP'][t][j],
-                                'Date': self.observations['dates'][t]
-                            },
-                            params=params,
-                            state_variables=sar_state_variables[j]
-                        )
-                        Qsim, state_variables[j] = self.run(
-                            model_inputs={'P': self.observations['PtRP'][t][j], 'E': ERP[t][j]},
-                            params=params,
-                            state_variables=state_variables[j]
-                        )
-                        simulated_streamflow[-1].append(Qsim)
+                    perturbed = perturbations[t]
+
+                    runoff_d, sar_state_variables = self.sar_model.run_ensemble(
+                        model_inputs={
+                            'P': perturbed['PtRP'],
+                            'T': perturbed['TsnowRP'],
+                            'Tmin': perturbed['TminRP'],
+                            'Tmax': perturbed['TmaxRP'],
+                            'Date': self.observations['dates'][t]
+                        },
+                        params=sar_params,
+                        state_variables=sar_state_variables
+                    )
+                    Qsim, state_variables = self.run_ensemble(
+                        model_inputs={'P': runoff_d, 'E': perturbed['ERP']},
+                        params=params,
+                        state_variables=state_variables
+                    )
+                    simulated_streamflow.add(t, Qsim)
 
                     if np.remainder(t, self.config.data.dt) == 0:
-                        if not np.any(np.isnan(self.observations['QRP'][t])):
+                        if not np.any(np.isnan(perturbed['QRP'])):
                             state_variables, weights = self.da_model.run(
                                 state_variables=state_variables,
-                                Qsim=np.array(simulated_streamflow[-1]),
+                                Qsim=Qsim,
                                 Q=self.observations['Q'][t],
-                                QRP=self.observations['QRP'][t],
-                                eQ=self.observations['eQRP'][t],
+                                QRP=perturbed['QRP'],
+                                eQ=perturbed['eQRP'],
                                 DA_config=self.config.data,
                                 weights=weights
                             )
 
             else:
                 for t, _ in enumerate(self.observations['dates']):
-                    simulated_streamflow.append([])
+                    perturbed = perturbations[t]
 
-                    for j in range(self.config.data.N):
-                        Qsim, state_variables[j] = self.run(
-                            model_inputs={'P': self.observations['PtRP'][t][j], 'E': ERP[t][j]},
-                            params=params,
-                            state_variables=state_variables[j]
-                        )
-                        simulated_streamflow[-1].append(Qsim)
+                    Qsim, state_variables = self.run_ensemble(
+                        model_inputs={'P': perturbed['PtRP'], 'E': perturbed['ERP']},
+                        params=params,
+                        state_variables=state_variables
+                    )
+                    simulated_streamflow.add(t, Qsim)
 
                     if np.remainder(t, self.config.data.dt) == 0:
-                        if not np.any(np.isnan(self.observations['QRP'][t])):
+                        if not np.any(np.isnan(perturbed['QRP'])):
                             state_variables, weights = self.da_model.run(
                                 state_variables=state_variables,
-                                Qsim=np.array(simulated_streamflow[-1]),
+                                Qsim=Qsim,
                                 Q=self.observations['Q'][t],
-                                QRP=self.observations['QRP'][t],
-                                eQ=self.observations['eQRP'][t],
+                                QRP=perturbed['QRP'],
+                                eQ=perturbed['eQRP'],
                                 DA_config=self.config.data,
                                 weights=weights
                             )
 
-            return np.array(simulated_streamflow)
+            return simulated_streamflow.results()
 
         else:
             # Compute E or get the one from the observations data
@@ -300,7 +354,7 @@ class BaseHydroModel:
 
             # Init SAR model
             if self.config.general.compute_snowmelt:
-                sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations)
+                sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations)
             else:
                 sar_state_variables = None
 
@@ -327,7 +381,7 @@ class BaseHydroModel:
                             'Tmax': self.observations['Tmax'][i],
                             'Date': self.observations['dates'][i]
                         },
-                        params=params,
+                        params=sar_params,
                         state_variables=sar_state_variables
                     )
                     Qsim, state_variables = self.run(
@@ -348,43 +402,35 @@ class BaseHydroModel:
 
             return np.array(simulated_streamflow)
 
-    def _forecast(self, params: Union[ParameterSet, Sequence[float]], state_variables_warmup: dict = None, sar_state_variables_warmup: dict = None) -> np.ndarray:
+    def _forecast(self,
+                  params: np.ndarray,
+                  sar_params: Optional[np.ndarray],
+                  state_variables_warmup: dict = None,
+                  sar_state_variables_warmup: dict = None) -> tuple:
         if self.config.data.do_data_assimilation:
-            self.observations, weights = assimilation.initialize(self.observations, self.config)
+            perturbations, weights = assimilation.initialize(
+                self.observations, self.config, self.pet_model, rng.spawn(self.seed_sequence, rng.PERTURBATIONS)
+            )
+            self.da_model.seed(self.seed_sequence)
 
-            return self._forecast_with_data_assimilation(params, weights, state_variables_warmup, sar_state_variables_warmup)
+            return self._forecast_with_data_assimilation(
+                params, sar_params, perturbations, weights, state_variables_warmup, sar_state_variables_warmup
+            )
 
         else:
-            return self._forecast_without_data_assimilation(params, state_variables_warmup, sar_state_variables_warmup)
+            return self._forecast_without_data_assimilation(params, sar_params, state_variables_warmup, sar_state_variables_warmup)
 
     def _forecast_with_data_assimilation(
             self,
-            params: Union[ParameterSet, Sequence[float]],
+            params: np.ndarray,
+            sar_params: Optional[np.ndarray],
+            perturbations: assimilation.Perturbations,
             weights: np.ndarray,
             state_variables_warmup: dict = None,
-            sar_state_variables_warmup: dict = None) -> np.ndarray:
-        # Compute potential evapotranspiration
-        if self.config.general.compute_pet:
-            ERP = np.empty(shape=(len(self.observations['dates']), self.config.data.N))
-            ERP[:] = np.nan
-
-            for t in range(self.config.data.N):
-                pet_params = self.pet_model.prepare(
-                    time_step=self.config.general.time_step,
-                    model_inputs={
-                        'P': self.observations['P'][t],
-                        'T': self.observations['TpetRP'][:, t],
-                        'Tmin': self.observations['TminRP'][:, t],
-                        'Tmax': self.observations['TmaxRP'][:, t],
-                        'dates': self.observations['dates']
-                    },
-                    hyper_parameters={'latitude': self.observations['latitude']}
-                )
-                ERP[:, t] = self.pet_model.run(pet_params)
-
+            sar_state_variables_warmup: dict = None) -> tuple[dict, dict]:
         # Snow accounting model initialization
         if self.config.general.compute_snowmelt:
-            sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations)
+            sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations)
         else:
             sar_state_variables = None
 
@@ -402,171 +448,134 @@ class BaseHydroModel:
 
         # Initialization matrices forecast
         nbr_forecast_issue = len(self.observations_for_forecast['dates'])
-        self.observations_for_forecast['E'] = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon))
-        self.observations_for_forecast['E'][:] = np.nan
-        Q_forecast = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon, self.config.data.N))
-        Q_forecast[:] = np.nan
-
-        # if self.config.general.compute_snowmelt:
-        #     sar_results_forecast['runOff_d'] = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon, self.config.data.N))
+        self.observations_for_forecast['E'] = self._setup_forecast_pet_data()
+        nbr_meteo_members = self.observations_for_forecast['P'].nbr_members if self.config.forecast.meteo_ens else 1
+        Q_forecast = EnsembleSummary(
+            shape=(nbr_forecast_issue, self.config.forecast.horizon),
+            N=self.config.data.N * nbr_meteo_members,
+            output_config=self.config.output,
+            generator=rng.generator(self.seed_sequence, rng.OUTPUT)
+        )
 
-        # Setting state variables for the data assimilation process
-        state_variables = [state_variables for _ in range(self.config.data.N)]
+        # Setting state variables for the data assimilation process (each member owns its states)
+        state_variables = EnsembleStates.from_state_variables(state_variables, self.state_names(), self.config.data.N)
         if self.config.general.compute_snowmelt:
-            sar_state_variables = [sar_state_variables for _ in range(self.config.data.N)]
+            sar_state_variables = EnsembleStates.from_state_variables(
+                sar_state_variables, self.sar_model.state_names(), self.config.data.N
+            )
+
+        # Initialization of states with the stored states (operational update)
+        if self.initial_states is not None:
+            state_variables = state_store.restore(state_variables, self.initial_states.state_variables)
+            if self.config.general.compute_snowmelt:
+                sar_state_variables = state_store.restore(sar_state_variables, self.initial_states.sar_state_variables)
+            weights = self.initial_states.weights
 
         # Run simulation
-        simulated_streamflow = []
+        simulated_streamflow = EnsembleSummary(
+            shape=(len(self.observations['dates']),),
+            N=self.config.data.N,
+            output_config=self.config.output,
+            generator=rng.generator(self.seed_sequence, rng.OUTPUT)
+        )
+        # Issues of the forecasts, and snapshots of their initial states
+        issues, snapshots, sar_snapshots = [], [], []
 
         if self.config.general.compute_snowmelt:
             for t, _ in enumerate(self.observations['dates']):
-                simulated_streamflow.append([])
+                perturbed = perturbations[t]
 
-                for j in range(self.config.data.N):
-                    runoff_d, sar_state_variables[j] = self.sar_model.run(
-                        model_inputs={
-                            'P': self.observations['PtRP'][t][j],
-                            'T': self.observations['TsnowRP'][t][j],
-                            'Tmin': self.observations['TminRP'][t][j],
-                            'Tmax': self.observations['TmaxRP'][t][j],
-                            'Date': self.observations['dates'][t]
-                        },
-                        params=params,
-                        state_variables=sar_state_variables[j]
-                    )
-                    Qsim, state_variables[j] = self.run(
-                        model_inputs={'P': self.observations['PtRP'][t][j], 'E': ERP[t][j]},
-                        params=params,
-                        state_variables=state_variables[j]
-                    )
-                    simulated_streamflow[-1].append(Qsim)
+                runoff_d, sar_state_variables = self.sar_model.run_ensemble(
+                    model_inputs={
+                        'P': perturbed['PtRP'],
+                        'T': perturbed['TsnowRP'],
+                        'Tmin': perturbed['TminRP'],
+                        'Tmax': perturbed['TmaxRP'],
+                        'Date': self.observations['dates'][t]
+                    },
+                    params=sar_params,
+                    state_variables=sar_state_variables
+                )
+                Qsim, state_variables = self.run_ensemble(
+                    model_inputs={'P': runoff_d, 'E': perturbed['ERP']},
+                    params=params,
+                    state_variables=state_variables
+                )
+                simulated_streamflow.add(t, Qsim)
 
-                if np.remainder(t, self.config.data.dt) == 0:
-                    if not np.any(np.isnan(self.observations['QRP'][t])):
+                # Correction steps aligned on the dates (as the perturbations), so that the operational updates
+                # continue the corrections of the previous ones
+                if np.remainder(perturbations.offset + t, self.config.data.dt) == 0:
+                    if not np.any(np.isnan(perturbed['QRP'])):
                         state_variables, weights = self.da_model.run(
                             state_variables=state_variables,
-                            Qsim=np.array(simulated_streamflow[-1]),
+                            Qsim=Qsim,
                             Q=self.observations['Q'][t],
-                            QRP=self.observations['QRP'][t],
-                            eQ=self.observations['eQRP'][t],
+                            QRP=perturbed['QRP'],
+                            eQ=perturbed['eQRP'],
                             DA_config=self.config.data,
                             weights=weights
                         )
 
-                # Hydrological Forecast
-                if not np.any(np.isnan(self.observations_for_forecast['P'][t])):
-                    if self.config.general.compute_pet:
-                        data_forecast_pet = {}
-                        data_forecast_pet['dates'] = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime']
-                        data_forecast_pet['T'] = self.observations_for_forecast['T'][t]
-                        data_forecast_pet['Tmin'] = self.observations_for_forecast['Tmin'][t]
-                        data_forecast_pet['Tmax'] = self.observations_for_forecast['Tmax'][t]
-                        data_forecast_pet = {**self.observations, **data_forecast_pet}
-
-                        pet_params = self.pet_model.prepare(
-                            time_step=self.config.general.time_step,
-                            model_inputs={'dates': data_forecast_pet['dates'], 'T': data_forecast_pet['T']},
-                            hyper_parameters={'latitude': data_forecast_pet['latitude']}
-                        )
-                        self.observations_for_forecast['E'][t] = self.pet_model.run(pet_params)
-
-                    # Set the initial forecast states with the ones obtained from simulation
-                    sar_state_variables_forecast = sar_state_variables
-                    state_variables_forecast = state_variables
-
-                    # Loop over lead times
-                    for j in range(self.config.data.N):
-                        for i in range(self.config.forecast.horizon):
-                            # Snow
-                            i_date = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime'][i]
-                            runoff_d, sar_state_variables_forecast[j] = self.sar_model.run(
-                                model_inputs={
-                                    'P': self.observations_for_forecast['P'][t, i],
-                                    'T': self.observations_for_forecast['T'][t, i],
-                                    'Tmin': self.observations_for_forecast['Tmin'][t, i],
-                                    'Tmax': self.observations_for_forecast['Tmax'][t, i],
-                                    'Date': i_date,
-                                },
-                                params=params,
-                                state_variables=sar_state_variables_forecast[j]
-                            )
-                            Q_forecast[t, i], state_variables_forecast[j] = self.run(
-                                model_inputs={
-                                    'P': runoff_d,
-                                    'E': self.observations_for_forecast['E'][t, i],
-                                },
-                                params=params,
-                                state_variables=state_variables_forecast[j]
-                            )
+                # Hydrological Forecast (run from the snapshots once the simulation is done)
+                if self._is_forecast_issued(t):
+                    issues.append(t)
+                    snapshots.append(state_variables.snapshot())
+                    sar_snapshots.append(sar_state_variables.snapshot())
 
         else:
             for t, _ in enumerate(self.observations['dates']):
-                simulated_streamflow.append([])
+                perturbed = perturbations[t]
 
-                for j in range(self.config.data.N):
-                    Qsim, state_variables[j] = self.run(
-                        model_inputs={'P': self.observations['PtRP'][t][j], 'E': ERP[t][j]},
-                        params=params,
-                        state_variables=state_variables[j]
-                    )
-                    simulated_streamflow[-1].append(Qsim)
+                Qsim, state_variables = self.run_ensemble(
+                    model_inputs={'P': perturbed['PtRP'], 'E': perturbed['ERP']},
+                    params=params,
+                    state_variables=state_variables
+                )
+                simulated_streamflow.add(t, Qsim)
 
-                # Perform DA
-                if np.remainder(t, self.config.data.dt) == 0:
-                    if not np.any(np.isnan(self.observations['QRP'][t])):
+                # Perform DA (correction steps aligned on the dates)
+                if np.remainder(perturbations.offset + t, self.config.data.dt) == 0:
+                    if not np.any(np.isnan(perturbed['QRP'])):
                         state_variables, weights = self.da_model.run(
                             state_variables=state_variables,
-                            Qsim=np.array(simulated_streamflow[-1]),
+                            Qsim=Qsim,
                             Q=self.observations['Q'][t],
-                            QRP=self.observations['QRP'][t],
-                            eQ=self.observations['eQRP'][t],
+                            QRP=perturbed['QRP'],
+                            eQ=perturbed['eQRP'],
                             DA_config=self.config.data,
                             weights=weights
                         )
 
-                # Hydrological Forecast
-                if not np.any(np.isnan(self.observations_for_forecast['P'][t])):
-                    if self.config.general.compute_pet:
-                        data_forecast_pet = {}
-                        data_forecast_pet['dates'] = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime']
-                        data_forecast_pet['T'] = self.observations_for_forecast['T'][t]
-                        data_forecast_pet['Tmin'] = self.observations_for_forecast['Tmin'][t]
-                        data_forecast_pet['Tmax'] = self.observations_for_forecast['Tmax'][t]
-                        data_forecast_pet = {**self.observations, **data_forecast_pet}
-
-                        pet_params = self.pet_model.prepare(
-                            time_step=self.config.general.time_step,
-                            model_inputs={'dates': data_forecast_pet['dates'], 'T': data_forecast_pet['T']},
-                            hyper_parameters={'latitude': data_forecast_pet['latitude']}
-                        )
-                        self.observations_for_forecast['E'][t] = self.pet_model.run(pet_params)
-
-                    # Set the initial forecast states with the ones obtained from simulation
-                    state_variables_forecast = state_variables
-                    for j in range(self.config.data.N):
-                        for i in range(self.config.forecast.horizon):
-                            Q_forecast[t, i, j], state_variables_forecast[j] = self.run(
-                                model_inputs={
-                                    'P': self.observations_for_forecast['P'][t, i, j],
-                                    'E': self.observations_for_forecast['E'][t, i, j],
-                                },
-                                params=params,
-                                state_variables=state_variables_forecast[j]
-                            )
+                # Hydrological Forecast (run from the snapshots once the simulation is done)
+                if self._is_forecast_issued(t):
+                    issues.append(t)
+                    snapshots.append(state_variables.snapshot())
 
-        return np.array(simulated_streamflow)
+        self.final_states = state_store.StoredStates(
+            last_date=self.observations['dates'][-1],
+            state_variables=state_variables.snapshot().data,
+            sar_state_variables=sar_state_variables.snapshot().data if self.config.general.compute_snowmelt else None,
+            weights=np.asarray(weights, dtype=float)
+        )
+
+        for t, Q_issue in self._forecast_issues(issues, snapshots, sar_snapshots, params, sar_params):
+            Q_forecast.add(t, Q_issue)
+
+        return simulated_streamflow.results(), Q_forecast.results()
 
     def _forecast_without_data_assimilation(
             self,
-            params: Union[ParameterSet, Sequence[float]],
+            params: np.ndarray,
+            sar_params: Optional[np.ndarray],
             state_variables_warmup: dict = None,
-            sar_state_variables_warmup: dict = None) -> np.ndarray:
+            sar_state_variables_warmup: dict = None) -> tuple[np.ndarray, Union[np.ndarray, dict]]:
         # Compute potential evapotranspiration
         E = self._setup_pet_data(self.observations)
 
         # Snow accounting model initialization
         if self.config.general.compute_snowmelt:
-            sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations)
+            sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations)
         else:
             sar_state_variables = None
 
@@ -581,18 +590,35 @@ class BaseHydroModel:
                 for key, value in sar_state_variables_warmup.items():
                     sar_state_variables[key] = value
 
+        # Initialization of states with the stored states (operational update)
+        if self.initial_states is not None:
+            state_variables = state_store.restore(
+                states.snapshot(state_variables, self.state_names()), self.initial_states.state_variables
+            ).member(0)
+            if self.config.general.compute_snowmelt:
+                sar_state_variables = state_store.restore(
+                    states.snapshot(sar_state_variables, self.sar_model.state_names()),
+                    self.initial_states.sar_state_variables
+                ).member(0)
+
         # Initialization matrices forecast
         nbr_forecast_issue = len(self.observations_for_forecast['dates'])
-        self.observations_for_forecast['E'] = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon))
-        self.observations_for_forecast['E'][:] = np.nan
-        Q_forecast = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon))
-        Q_forecast[:] = np.nan
-
-        # if self.config.general.compute_snowmelt:
-        #     sar_results_forecast['runOff_d'] = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon))
+        self.observations_for_forecast['E'] = self._setup_forecast_pet_data()
+        if self.config.forecast.meteo_ens:
+            Q_forecast = EnsembleSummary(
+                shape=(nbr_forecast_issue, self.config.forecast.horizon),
+                N=self.observations_for_forecast['P'].nbr_members,
+                output_config=self.config.output,
+                generator=rng.generator(self.seed_sequence, rng.OUTPUT)
+            )
+        else:
+            Q_forecast = np.empty(shape=(nbr_forecast_issue, self.config.forecast.horizon))
+            Q_forecast[:] = np.nan
 
         # Run simulation
         simulated_streamflow = []  # Container for results
+        # Issues of the forecasts, and snapshots of their initial states
+        issues, snapshots, sar_snapshots = [], [], []
 
         if self.config.general.compute_snowmelt:
             # With snow accounting
@@ -605,7 +631,7 @@ class BaseHydroModel:
                         'Tmax': self.observations['Tmax'][t],
                         'Date': self.observations['dates'][t]
                     },
-                    params=params,
+                    params=sar_params,
                     state_variables=sar_state_variables
                 )
                 Qsim, state_variables = self.run(
@@ -615,49 +641,11 @@ class BaseHydroModel:
                 )
                 simulated_streamflow.append(Qsim)
 
-                # Hydrological Forecast
-                if not np.any(np.isnan(self.observations_for_forecast['P'][t])):
-                    if self.config.general.compute_pet:
-                        data_forecast_pet = {}
-                        data_forecast_pet['dates'] = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime']
-                        data_forecast_pet['T'] = self.observations_for_forecast['T'][t]
-                        data_forecast_pet['Tmin'] = self.observations_for_forecast['Tmin'][t]
-                        data_forecast_pet['Tmax'] = self.observations_for_forecast['Tmax'][t]
-                        data_forecast_pet = {**self.observations, **data_forecast_pet}
-
-                        pet_params = self.pet_model.prepare(
-                            time_step=self.config.general.time_step,
-                            model_inputs={'dates': data_forecast_pet['dates'], 'T': data_forecast_pet['T']},
-                            hyper_parameters={'latitude': data_forecast_pet['latitude']}
-                        )
-                        self.observations_for_forecast['E'][t] = self.pet_model.run(pet_params)
-
-                    # Set the initial forecast states with the ones obtained from simulation
-                    sar_state_variables_forecast = sar_state_variables
-                    state_variables_forecast = state_variables
-                    # Loop over lead times
-                    for i in range(self.config.forecast.horizon):
-                        # Snow
-                        i_date = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime'][i]
-                        runoff_d, sar_state_variables_forecast = self.sar_model.run(
-                            model_inputs={
-                                'P': self.observations_for_forecast['P'][t, i],
-                                'T': self.observations_for_forecast['T'][t, i],
-                                'Tmin': self.observations_for_forecast['Tmin'][t, i],
-                                'Tmax': self.observations_for_forecast['Tmax'][t, i],
-                                'Date': i_date,
-                            },
-                            params=params,
-                            state_variables=sar_state_variables_forecast
-                        )
-                        Q_forecast[t, i], state_variables = self.run(
-                            model_inputs={
-                                'P': runoff_d,
-                                'E': self.observations_for_forecast['E'][t, i],
-                            },
-                            params=params,
-                            state_variables=state_variables
-                        )
+                # Hydrological Forecast (run from the snapshots once the simulation is done)
+                if self._is_forecast_issued(t):
+                    issues.append(t)
+                    snapshots.append(states.snapshot(state_variables, self.state_names()))
+                    sar_snapshots.append(states.snapshot(sar_state_variables, self.sar_model.state_names()))
 
         else:
             for t, _ in enumerate(self.observations['dates']):
@@ -668,47 +656,243 @@ class BaseHydroModel:
                 )
                 simulated_streamflow.append(Qsim)
 
-                # Hydrological Forecast
-                if not np.any(np.isnan(self.observations_for_forecast['P'][t])):
-                    if self.config.general.compute_pet:
-                        data_forecast_pet = {}
-                        data_forecast_pet['dates'] = self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime']
-                        data_forecast_pet['T'] = self.observations_for_forecast['T'][t]
-                        data_forecast_pet['Tmin'] = self.observations_for_forecast['Tmin'][t]
-                        data_forecast_pet['Tmax'] = self.observations_for_forecast['Tmax'][t]
-                        data_forecast_pet = {**self.observations, **data_forecast_pet}
-
-                        pet_params = self.pet_model.prepare(
-                            time_step=self.config.general.time_step,
-                            model_inputs={'dates': data_forecast_pet['dates'], 'T': data_forecast_pet['T']},
-                            hyper_parameters={'latitude': data_forecast_pet['latitude']}
-                        )
-                        self.observations_for_forecast['E'][t] = self.pet_model.run(pet_params)
-
-                    # Set the initial forecast states with the ones obtained from simulation
-                    state_variables_forecast = state_variables
-                    for i in range(self.config.forecast.horizon):
-                        Q_forecast[t, i], state_variables_forecast[i] = self.run(
-                            model_inputs={
-                                'P': self.observations_for_forecast['P'][t, i],
-                                'E': self.observations_for_forecast['E'][t, i],
-                            },
-                            params=params,
-                            state_variables=state_variables_forecast[i]
-                        )
+                # Hydrological Forecast (run from the snapshots once the simulation is done)
+                if self._is_forecast_issued(t):
+                    issues.append(t)
+                    snapshots.append(states.snapshot(state_variables, self.state_names()))
 
-        return np.array(simulated_streamflow)
+        self.final_states = state_store.StoredStates(
+            last_date=self.observations['dates'][-1],
+            state_variables=states.snapshot(state_variables, self.state_names()).data,
+            sar_state_variables=states.snapshot(sar_state_variables, self.sar_model.state_names()).data
+            if self.config.general.compute_snowmelt else None
+        )
+
+        for t, Q_issue in self._forecast_issues(issues, snapshots, sar_snapshots, params, sar_params):
+            if self.config.forecast.meteo_ens:
+                Q_forecast.add(t, Q_issue)
+            else:
+                Q_forecast[t] = Q_issue[:, 0]
+
+        if self.config.forecast.meteo_ens:
+            Q_forecast = Q_forecast.results()
+
+        return np.array(simulated_streamflow), Q_forecast
+
+    def _is_forecast_issued(self, t: int) -> bool:
+        """Whether a meteorological forecast is issued at the time step t"""
+        if self.config.forecast.meteo_ens:
+            return self.observations_for_forecast['P'].issue_indexes[t] >= 0
+
+        return not np.any(np.isnan(self.observations_for_forecast['P'][t]))
+
+    def _forecast_inputs(self, t: int) -> dict:
+        """Meteorological forecast issued at the time step t, and its PET
+
+        Returns
+        -------
+        (horizon, meteorological members) arrays P, T, Tmin, Tmax and E (a single member for a deterministic forecast)
+        """
+        horizon = self.config.forecast.horizon
+        # In double precision (the perfect forecasts are views of the observations, in their precision)
+        meteo_forecast = {
+            name: np.reshape(np.asarray(self.observations_for_forecast[name][t], dtype=float), (horizon, -1))
+            for name in ['P', 'T', 'Tmin', 'Tmax']
+        }
+
+        if self.config.general.compute_pet and self.config.forecast.meteo_ens:
+            # All the members at once, the PET model broadcasts the (horizon, members) temperatures
+            pet_params = self.pet_model.prepare(
+                time_step=self.config.general.time_step,
+                model_inputs={
+                    'dates': self.observations_for_forecast['dates'][t] + self.observations_for_forecast['leadTime'],
+                    'T': meteo_forecast['T']
+                },
+                hyper_parameters={'latitude': self.observations['latitude']}
+            )
+            meteo_forecast['E'] = self.pet_model.run(pet_params)
+        else:
+            # Computed beforehand for all the issues (see `_setup_forecast_pet_data`)
+            meteo_forecast['E'] = np.broadcast_to(
+                np.reshape(self.observations_for_forecast['E'][t], (horizon, 1)), meteo_forecast['T'].shape
+            )
+
+        return meteo_forecast
+
+    def _forecast_batch_inputs(self, issues: Sequence[int]) -> dict:
+        """Meteorological forecasts of several issues, and their PET (see `_forecast_inputs`)
+
+        Returns
+        -------
+        (horizon, issues, meteorological members) arrays P, T, Tmin, Tmax and E, and the (horizon, issues) valid
+        dates of the lead times
+        """
+        batch_inputs = [self._forecast_inputs(t) for t in issues]
+        batch_inputs = {name: np.stack([inputs[name] for inputs in batch_inputs], axis=1) for name in batch_inputs[0]}
+        batch_inputs['dates'] = (
+            self.observations_for_forecast['dates'][issues][np.newaxis] + self.observations_for_forecast['leadTime'][:, np.newaxis]
+        )
+
+        return batch_inputs
+
+    def _forecast_model(self) -> 'BaseHydroModel':
+        """Model without the observations, with what the workers of `_forecast_issues` need to run the shards"""
+        forecast_model = type(self)()
+        forecast_model.config = self.config
+        forecast_model.sar_model = self.sar_model
+
+        return forecast_model
+
+    def _forecast_issues(self,
+                         issues: Sequence[int],
+                         snapshots: Sequence[EnsembleStates],
+                         sar_snapshots: Sequence[EnsembleStates],
+                         params: np.ndarray,
+                         sar_params: Optional[np.ndarray]) -> Iterator[tuple[int, np.ndarray]]:
+        """Forecasts of the issues, advanced together from the snapshots of their initial states
+
+        The snapshots taken during the continuous simulation are the checkpoints of the forecasts: the
+        issues are split into `config.forecast.shards` time shards, run on a process pool (if there are
+        several shards), each from the snapshots of its issues. The results do not depend on the shards.
+        The workers only receive the model (without its observations, see `_forecast_model`) and the shards,
+        with the parameters, the snapshots and the meteorological forecasts of their issues.
+
+        Parameters
+        ----------
+        issues
+            Time steps at which the forecasts are issued.
+        snapshots, sar_snapshots
+            Snapshots of the states (and of the snow accounting states) at the issues.
+
+        Yields
+        ------
+        The time step of the issue, and its (horizon, snapshot members * meteorological members) forecast
+        streamflow (see `_forecast_shard`), in issue order.
+        """
+        if not issues:
+            return
+
+        initial_states = EnsembleStates.concatenate(snapshots)
+        if self.config.general.compute_snowmelt:
+            initial_sar_states = EnsembleStates.concatenate(sar_snapshots)
+        nbr_members = snapshots[0].N
+        nbr_meteo_members = self.observations_for_forecast['P'].nbr_members if self.config.forecast.meteo_ens else 1
+
+        shards = []
+        for shard_issues in np.array_split(np.arange(len(issues)), min(self.config.forecast.shards, len(issues))):
+            rows = np.arange(shard_issues[0] * nbr_members, (shard_issues[-1] + 1) * nbr_members)
+            shards.append({
+                'issues': [issues[k] for k in shard_issues],
+                'state_variables': initial_states.fork(rows),
+                'sar_state_variables': initial_sar_states.fork(rows) if self.config.general.compute_snowmelt else None,
+                'params': params,
+                'sar_params': sar_params,
+                'nbr_meteo_members': nbr_meteo_members,
+            })
+
+        # Pools cannot be nested (ex. when the models combinations are run in parallel)
+        if len(shards) > 1 and not multiprocessing.current_process().daemon:
+            for shard in shards:
+                shard['inputs'] = self._forecast_batch_inputs(shard['issues'])
+
+            with multiprocessing.Pool(processes=len(shards), initializer=_init_worker, initargs=(self._forecast_model(),)) as pool:
+                for shard, Q_forecast in zip(shards, pool.imap(_forecast_shard, shards)):
+                    yield from zip(shard['issues'], np.moveaxis(Q_forecast, 1, 0))
+        else:
+            for shard in shards:
+                yield from zip(shard['issues'], np.moveaxis(self._forecast_shard(shard), 1, 0))
+
+    def _forecast_shard(self, shard: dict) -> np.ndarray:
+        """Forecasts of the issues of a shard, advanced together from the snapshots of their initial states
+
+        The members of the forecasts of several issues (the members of the snapshot, forked for each
+        meteorological member) are the rows of one ensemble, so that the horizon of a whole batch of
+        issues is run with `horizon` vectorized steps. The issues are run by batches of about
+        FORECAST_BATCH_SIZE members, so that the memory does not grow with the number of issues.
+
+        Parameters
+        ----------
+        shard
+            issues: time steps at which the forecasts are issued
+            state_variables, sar_state_variables: initial states of the issues (the snapshots concatenated)
+            params, sar_params: parameters of the models
+            nbr_meteo_members: number of meteorological members of the forecasts
+            inputs (optional): meteorological forecasts of the issues (see `_forecast_batch_inputs`), read from the
+            observations by batches if absent
+
+        Returns
+        -------
+        The (horizon, issues, snapshot members * meteorological members) forecast streamflow. The member k
+        runs the meteorological member k % (meteorological members) from the member k // (meteorological
+        members) of the snapshot.
+        """
+        issues = shard['issues']
+        nbr_members = shard['state_variables'].N // len(issues)
+        nbr_meteo_members = shard['nbr_meteo_members']
+        nbr_forks = nbr_members * nbr_meteo_members  # Members of the forecast of an issue
+        batch_size = max(1, FORECAST_BATCH_SIZE // nbr_forks)
+
+        Q_forecast = np.empty(shape=(self.config.forecast.horizon, len(issues), nbr_forks))
+        for begin in range(0, len(issues), batch_size):
+            batch = issues[begin:begin + batch_size]
+
+            # (horizon, issues, meteorological members) inputs of the batch
+            if 'inputs' in shard:
+                batch_inputs = {name: values[:, begin:begin + len(batch)] for name, values in shard['inputs'].items()}
+            else:
+                batch_inputs = self._forecast_batch_inputs(batch)
+
+            # Forks of the members of the snapshots of the batch, repeated for each meteorological member
+            forks = np.repeat(np.arange(begin * nbr_members, (begin + len(batch)) * nbr_members), nbr_meteo_members)
+            state_variables = shard['state_variables'].fork(forks)
+            if self.config.general.compute_snowmelt:
+                sar_state_variables = shard['sar_state_variables'].fork(forks)
+
+            def forked(values: np.ndarray) -> np.ndarray:
+                """(issues, meteorological members) values of the members of the forks"""
+                return np.tile(values, (1, nbr_members)).ravel()
+
+            for i in range(self.config.forecast.horizon):
+                if self.config.general.compute_snowmelt:
+                    runoff_d, sar_state_variables = self.sar_model.run_ensemble(
+                        model_inputs={
+                            'P': forked(batch_inputs['P'][i]),
+                            'T': forked(batch_inputs['T'][i]),
+                            'Tmin': forked(batch_inputs['Tmin'][i]),
+                            'Tmax': forked(batch_inputs['Tmax'][i]),
+                            'Date': np.repeat(batch_inputs['dates'][i], nbr_forks),
+                        },
+                        params=shard['sar_params'],
+                        state_variables=sar_state_variables
+                    )
+                else:
+                    runoff_d = forked(batch_inputs['P'][i])
+
+                Qsim, state_variables = self.run_ensemble(
+                    model_inputs={'P': runoff_d, 'E': forked(batch_inputs['E'][i])},
+                    params=shard['params'],
+                    state_variables=state_variables
+                )
+                Q_forecast[i, begin:begin + len(batch)] = Qsim.reshape((len(batch), nbr_forks))
+
+        return Q_forecast
 
     def objectivefunction(self, simulation: np.array, evaluation: np.array):
+        evaluation, simulation = self.remove_winter(evaluation, simulation)
+
+        return self.objective_function(evaluation, simulation)
+
+    def remove_winter(self, evaluation: np.ndarray, simulation: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Remove the winter time steps from the series, if the configuration asks for it"""
         if self.config.calibration.remove_winter:
             non_winter_indexes = find_non_winter_indexes(dates=self.observations['dates'])
 
             evaluation = evaluation.take(non_winter_indexes)
             simulation = simulation.take(non_winter_indexes)
 
-        return abs(self.objective_function(evaluation, simulation))
+        return evaluation, simulation
 
-    def _warmup(self, params: Union[ParameterSet, Sequence[float]]):
+    def _warmup(self, params: np.ndarray, sar_params: Optional[np.ndarray]):
         """Warm up
 
         The warm-up initialize the state variables of the Hydro and SAR models, if applicable.
@@ -724,7 +908,7 @@ class BaseHydroModel:
 
         # Running the model while considering the SAR model or not.
         if self.config.general.compute_snowmelt:
-            sar_state_variables = self.sar_model.prepare(params=params, hyper_parameters=self.observations_for_warmup)
+            sar_state_variables = self.sar_model.prepare(params=sar_params, hyper_parameters=self.observations_for_warmup)
 
             # Running simulation
             for i, _ in enumerate(self.observations_for_warmup['dates']):
@@ -736,7 +920,7 @@ class BaseHydroModel:
                         'Tmax': self.observations_for_warmup['Tmax'][i],
                         'Date': self.observations_for_warmup['dates'][i]
                     },
-                    params=params,
+                    params=sar_params,
                     state_variables=sar_state_variables
                 )
                 _, state_variables = self.run(
@@ -765,4 +949,41 @@ class BaseHydroModel:
 
             return self.pet_model.run(pet_params)
 
-        return self.observations['E']
+        return observations['E']
+
+    def _setup_forecast_pet_data(self) -> Optional[np.ndarray]:
+        """(issues, horizon) PET of the deterministic forecasts, computed at once for all the issues
+
+        The PET of the meteorological ensemble forecasts is computed with the members of each issue (see `_forecast_inputs`).
+        """
+        nbr_forecast_issue = len(self.observations_for_forecast['dates'])
+        E = np.full((nbr_forecast_issue, self.config.forecast.horizon), np.nan)
+
+        if self.config.general.compute_pet and not self.config.forecast.meteo_ens:
+            issued = ~np.isnan(self.observations_for_forecast['P']).any(axis=1)
+            # Valid time of each lead time of the issues
+            dates = self.observations_for_forecast['dates'][issued, np.newaxis] + self.observations_for_forecast['leadTime']
+
+            pet_params = self.pet_model.prepare(
+                time_step=self.config.general.time_step,
+                model_inputs={'dates': dates.ravel(), 'T': np.asarray(self.observations_for_forecast['T'][issued], dtype=float).ravel()},
+                hyper_parameters={'latitude': self.observations['latitude']}
+            )
+            E[issued] = np.reshape(self.pet_model.run(pet_params), dates.shape)
+
+        return E
+
+
+def _init_worker(hydro_model: BaseHydroModel):
+    global _worker_hydro_model
+    _worker_hydro_model = hydro_model
+
+
+def _forecast_shard(shard: dict) -> np.ndarray:
+    return _worker_hydro_model._forecast_shard(shard)
+
+
+def _objective_function(parameters: np.ndarray) -> float:
+    simulated_streamflow = _worker_hydro_model.simulation(parameters)
+
+    return _worker_hydro_model.objectivefunction(simulated_streamflow, _worker_hydro_model.evaluation())
@@ -115,6 +115,13 @@ def list_da_models() -> dict[str, BaseDAModel]:
 
 
 def _load_module_form_path(path: str) -> ModuleType:
+    # Modules of the hoopla package are imported by name, so that their models
+    # can be pickled (ex. to be sent to worker processes).
+    package_path = Path(__file__).parents[1].resolve()
+    filepath = Path(path).resolve()
+    if package_path in filepath.parents:
+        return importlib.import_module('.'.join(filepath.relative_to(package_path.parent).with_suffix('').parts))
+
     spec = importlib.util.spec_from_file_location('_module', path)
     module = importlib.util.module_from_spec(spec)
     sys.modules['_module'] = module
@@ -1,6 +1,8 @@
 import abc
 
-from spotpy.parameter import ParameterSet
+import numpy as np
+
+from .states import EnsembleStates
 
 
 class BaseSARModel:
@@ -21,9 +23,45 @@ class BaseSARModel:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def prepare(self, params: ParameterSet, hyper_parameters: dict) -> dict:
+    def state_names(self) -> list[str]:
+        """Names of the state variables evolving with time (the other ones are constants)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def prepare(self, params: np.ndarray, hyper_parameters: dict) -> dict:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def run(self, model_inputs: dict, params: ParameterSet, state_variables: dict):
+    def run(self, model_inputs: dict, params: np.ndarray, state_variables: dict):
         raise NotImplementedError
+
+    def run_ensemble(self, model_inputs: dict, params: np.ndarray, state_variables: EnsembleStates):
+        """Advance all the members of an ensemble by one time step
+
+        The model inputs are arrays of N values (one per member) or scalars shared by all
+        the members. This default implementation calls `run` once per member; models can
+        override it to advance the members at once as arrays.
+
+        Returns
+        -------
+        Array of N outputs, State variables (updated in place)
+        """
+        outputs = np.empty(state_variables.N)
+
+        for j in range(state_variables.N):
+            outputs[j], member_state_variables = self.run(
+                model_inputs={name: value if np.ndim(value) == 0 else value[j] for name, value in model_inputs.items()},
+                params=params,
+                state_variables=state_variables.member(j)
+            )
+            state_variables.set_member(j, member_state_variables)
+
+        return outputs, state_variables
+
+    def precompute_parameters(self, params: np.ndarray) -> np.ndarray:
+        """Parameters vector given to `run`
+
+        Called once per simulation, before the time loop, with the whole parameters
+        vector (hydro model parameters followed by the SAR model parameters).
+        """
+        return params
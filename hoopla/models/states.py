@@ -0,0 +1,133 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class EnsembleStates:
+    """State variables of the N members of an ensemble, stored as arrays
+
+    The evolving state variables are packed in one (N, width) matrix `data`: the scalar state
+    variables (ex. reservoir levels) are its first columns (`values`), followed by the columns of
+    the vector state variables (ex. routing buffers, `buffers`). `values` and `buffers` are views of
+    `data`, so copying the states of the ensemble (see `snapshot` and `fork`) is a single array copy.
+    The other entries of the state variables dictionary of a model (ex. routing weights,
+    catchment hyper-parameters) are constants shared by all the members.
+
+    Every member owns its states, so that updating a member never changes the other ones.
+    """
+
+    def __init__(self, names: Sequence[str], data: np.ndarray, buffer_sizes: dict, constants: dict):
+        self.names = list(names)
+        self.buffer_sizes = dict(buffer_sizes)
+        self.constants = constants
+
+        self._columns = {name: i for i, name in enumerate(self.names)}
+        self._set_data(data)
+
+    @classmethod
+    def from_state_variables(cls, state_variables: dict, state_names: Sequence[str], N: int) -> 'EnsembleStates':
+        """Ensemble of N members starting from the same state variables
+
+        Parameters
+        ----------
+        state_variables
+            State variables dictionary of a model (as returned by its `prepare` method).
+        state_names
+            Names of the state variables evolving with time (see the model's `state_names` method).
+        N
+            Number of members.
+        """
+        names = [name for name in state_names if np.ndim(state_variables[name]) == 0]
+        buffer_sizes = {name: np.size(state_variables[name]) for name in state_names if np.ndim(state_variables[name]) > 0}
+
+        row = np.concatenate([
+            np.array([state_variables[name] for name in names], dtype=float),
+            *[np.ravel(state_variables[name]).astype(float) for name in buffer_sizes]
+        ])
+        data = np.tile(row, (N, 1))
+        constants = {name: value for name, value in state_variables.items() if name not in state_names}
+
+        return cls(names, data, buffer_sizes, constants)
+
+    @classmethod
+    def concatenate(cls, ensembles: Sequence['EnsembleStates']) -> 'EnsembleStates':
+        """Ensemble of the members of all the `ensembles` (of the same model), in order"""
+        first = ensembles[0]
+
+        return cls(first.names, np.concatenate([ensemble.data for ensemble in ensembles]), first.buffer_sizes, first.constants)
+
+    def _set_data(self, data: np.ndarray):
+        self.data = data
+        self.values = data[:, :len(self.names)]
+
+        self.buffers = {}
+        begin = len(self.names)
+        for name, size in self.buffer_sizes.items():
+            self.buffers[name] = data[:, begin:begin + size]
+            begin += size
+
+    @property
+    def N(self) -> int:
+        return self.values.shape[0]
+
+    def get(self, names: Sequence[str]) -> np.ndarray:
+        """(N, len(names)) matrix of the scalar state variables `names`"""
+        return self.values[:, [self._columns[name] for name in names]]
+
+    def set(self, names: Sequence[str], values: np.ndarray):
+        """Assign the (N, len(names)) matrix `values` to the scalar state variables `names`"""
+        self.values[:, [self._columns[name] for name in names]] = values
+
+    def snapshot(self) -> 'EnsembleStates':
+        """Read-only copy of the states (ex. the initial states of the forecasts of an issue)
+
+        A snapshot can be shared (between issues, lead time batches or worker processes) and forked
+        as many times as needed, it never changes.
+        """
+        data = self.data.copy()
+        data.flags.writeable = False
+
+        return EnsembleStates(self.names, data, self.buffer_sizes, self.constants)
+
+    def fork(self, indexes: Optional[np.ndarray] = None) -> 'EnsembleStates':
+        """Writable copy of the states of the members `indexes` (all the members by default)
+
+        The members can be repeated (ex. one fork of each member for each meteorological member).
+        """
+        data = np.array(self.data) if indexes is None else self.data[indexes]
+
+        return EnsembleStates(self.names, data, self.buffer_sizes, self.constants)
+
+    def copy(self) -> 'EnsembleStates':
+        """Copy of the states (the constants are shared)"""
+        return self.fork()
+
+    def select(self, indexes: np.ndarray):
+        """Replace the members by the members `indexes` (ex. resampled particles)"""
+        self._set_data(self.data[indexes])
+
+    def member(self, j: int) -> dict:
+        """State variables dictionary of the j-th member (a copy)"""
+        state_variables = dict(self.constants)
+        state_variables.update({name: self.values[j, i] for i, name in enumerate(self.names)})
+        state_variables.update({name: buffer[j].copy() for name, buffer in self.buffers.items()})
+
+        return state_variables
+
+    def set_member(self, j: int, state_variables: dict):
+        """Assign the state variables dictionary of the j-th member"""
+        for i, name in enumerate(self.names):
+            self.values[j, i] = state_variables[name]
+        for name, buffer in self.buffers.items():
+            buffer[j] = state_variables[name]
+
+
+def snapshot(state_variables: dict, state_names: Sequence[str]) -> EnsembleStates:
+    """Read-only snapshot of the state variables dictionary of a deterministic run (single member ensemble)
+
+    `snapshot(...).member(0)` forks a state variables dictionary that can be run without changing the snapshot.
+    """
+    states = EnsembleStates.from_state_variables(state_variables, state_names, 1)
+    states.data.flags.writeable = False
+
+    return states
@@ -0,0 +1,55 @@
+"""Random number streams
+
+Every stochastic part of hoopla draws from its own stream, derived from the configured seed
+with `SeedSequence` spawn keys: (catchment, models combination) for a run, followed by the
+key of the part of the run (ex. PERTURBATIONS, then the block number). A stream only depends
+on its keys, so the results do not depend on the number of worker processes nor on the order
+in which the tasks are run.
+"""
+import random
+from typing import Optional
+
+import numpy as np
+
+from hoopla.config import Config
+
+# Keys of the streams of a run
+CALIBRATION = 0
+PERTURBATIONS = 1
+DA_MODEL = 2
+CROSS_VALIDATION = 3
+OUTPUT = 4
+UPDATE = 5
+
+
+def seed_sequence(config: Config, *keys: int) -> np.random.SeedSequence:
+    """Seed sequence of the configured seed (random if the seed is 'None') spawned with `keys`"""
+    entropy = None if config.general.seed == 'None' else config.general.seed
+
+    return np.random.SeedSequence(entropy, spawn_key=keys)
+
+
+def spawn(parent: np.random.SeedSequence, *keys: int) -> np.random.SeedSequence:
+    """Seed sequence of the stream `keys` of the parent sequence"""
+    return np.random.SeedSequence(parent.entropy, spawn_key=(*parent.spawn_key, *keys))
+
+
+def generator(parent: np.random.SeedSequence, *keys: int) -> np.random.Generator:
+    return np.random.default_rng(spawn(parent, *keys))
+
+
+def seed_global_state(parent: Optional[np.random.SeedSequence], *keys: int) -> Optional[int]:
+    """Seed the global `random` and `np.random` states, for the libraries using them (ex. spotpy)
+
+    Returns
+    -------
+    The seed (as accepted by `np.random.seed`), or None if `parent` is None
+    """
+    if parent is None:
+        return None
+
+    seed = int(spawn(parent, *keys).generate_state(1)[0] >> 2)  # spotpy expects seeds below 2**30
+    random.seed(seed)
+    np.random.seed(seed)
+
+    return seed
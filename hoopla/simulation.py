@@ -1,5 +1,8 @@
 import json
 import os
+from typing import Optional
+
+import numpy as np
 
 from scipy.io import loadmat
 
@@ -19,7 +22,8 @@ def make_simulation(config: Config,
                     sar_model: BaseSARModel,
                     da_model: BaseDAModel,
                     parameters: list[float],
-                    filepath_results: str):
+                    filepath_results: str,
+                    seed_sequence: Optional[np.random.SeedSequence] = None):
     # Run simulation
     simulated_streamflow = simulate(
         config=config,
@@ -30,6 +34,7 @@ def make_simulation(config: Config,
         sar_model=sar_model,
         da_model=da_model,
         parameters=parameters,
+        seed_sequence=seed_sequence
     )
 
     # Save results
@@ -38,9 +43,14 @@ def make_simulation(config: Config,
         'hydro_model': hydro_model.name(),
         'PET_model': pet_model.name(),
         'SAR_model': sar_model.name(),
-        'Qsim': list(simulated_streamflow),
         'observations': util.serialize_data(observations)
     }
+    if config.data.do_data_assimilation:
+        # With data assimilation, Qsim holds the ensemble summary (see hoopla.summary.EnsembleSummary)
+        results['Qsim'] = util.serialize_data(simulated_streamflow)
+        results['quantiles'] = config.output.quantiles
+    else:
+        results['Qsim'] = simulated_streamflow.tolist()
 
     if os.path.exists(filepath_results):
         if config.general.overwrite:
@@ -61,7 +71,8 @@ def simulate(config: Config,
              pet_model: BasePETModel,
              sar_model: BaseSARModel,
              da_model: BaseDAModel,
-             parameters: list[float]):
+             parameters: list[float],
+             seed_sequence: Optional[np.random.SeedSequence] = None):
     # Reservoirs to update
     if config.data.do_data_assimilation:
         all_model_updated_res = loadmat(
@@ -78,6 +89,7 @@ def simulate(config: Config,
         observations_for_warmup=observations_for_warm_up,
         pet_model=pet_model,
         sar_model=sar_model,
-        da_model=da_model
+        da_model=da_model,
+        seed_sequence=seed_sequence
     )
     return hydro_model.simulation(parameters)
@@ -0,0 +1,63 @@
+"""Model states persisted between the operational updates (see hoopla.update)
+
+The store of a catchment and models combination holds the states at the end of the last update:
+the hydrological and snow accounting states (packed as in hoopla.models.states.EnsembleStates, one
+row per member of the data assimilation ensemble, or a single row), the weights of the members and
+the date of the last observation used.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from hoopla.models.states import EnsembleStates
+
+
+@dataclass
+class StoredStates:
+    last_date: np.datetime64
+    state_variables: np.ndarray
+    sar_state_variables: Optional[np.ndarray] = None
+    weights: Optional[np.ndarray] = None
+
+
+def save_states(filepath: str, stored_states: StoredStates):
+    """Save the states (the previous store is only replaced once the new one is written)"""
+    arrays = {
+        'last_date': np.array(stored_states.last_date, dtype='datetime64[s]'),
+        'state_variables': stored_states.state_variables
+    }
+    if stored_states.sar_state_variables is not None:
+        arrays['sar_state_variables'] = stored_states.sar_state_variables
+    if stored_states.weights is not None:
+        arrays['weights'] = stored_states.weights
+
+    with open(f'{filepath}.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(f'{filepath}.tmp', filepath)
+
+
+def load_states(filepath: str) -> Optional[StoredStates]:
+    """Stored states, or None if no update was run yet"""
+    if not os.path.exists(filepath):
+        return None
+
+    with np.load(filepath) as file:
+        return StoredStates(
+            last_date=file['last_date'][()],
+            state_variables=file['state_variables'],
+            sar_state_variables=file['sar_state_variables'] if 'sar_state_variables' in file else None,
+            weights=file['weights'] if 'weights' in file else None
+        )
+
+
+def restore(state_variables: EnsembleStates, data: np.ndarray) -> EnsembleStates:
+    """Ensemble of the model states `state_variables` (names, buffers, constants) holding the stored `data`"""
+    if np.shape(data) != state_variables.data.shape:
+        raise ValueError(
+            f'The stored states (shape {np.shape(data)}) do not match the states of the model '
+            f'(shape {state_variables.data.shape}). Delete the state store to restart from a warm up.'
+        )
+
+    return EnsembleStates(state_variables.names, np.array(data, dtype=float), state_variables.buffer_sizes, state_variables.constants)
@@ -0,0 +1,99 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from hoopla.config import Output
+
+BUFFER_SIZE = 2 ** 20  # Number of member values buffered before their statistics are computed at once
+ENSEMBLE_MODES = ('summary', 'members')
+
+
+class EnsembleSummary:
+    """Ensemble streamflow of a run, added one row (time step or forecast issue) at a time
+
+    With `output_config.ensemble == 'summary'`, only the mean, the variance and the quantiles of
+    the members are kept for each value of `shape` (ex. (time steps,) or (issues, horizon)).
+    The rows are buffered by blocks (of about BUFFER_SIZE values), so that the statistics are computed
+    with a few vectorized calls instead of one per time step. With 'members', every member is kept.
+
+    The full traces of `output_config.n_traces` members, drawn once at random with `generator`,
+    are also kept.
+    """
+
+    def __init__(self,
+                 shape: Sequence[int],
+                 N: int,
+                 output_config: Output,
+                 generator: Optional[np.random.Generator] = None,
+                 block_size: Optional[int] = None):
+        if output_config.ensemble not in ENSEMBLE_MODES:
+            raise ValueError(f'Ensemble output must be one of: {ENSEMBLE_MODES}')
+
+        self.shape = tuple(shape)
+        self.N = N
+        self.ensemble = output_config.ensemble
+        self.quantiles = np.asarray(output_config.quantiles, dtype=float)
+
+        if self.ensemble == 'members':
+            self.members = np.full((*self.shape, N), np.nan)
+        else:
+            self.mean = np.full(self.shape, np.nan)
+            self.variance = np.full(self.shape, np.nan)
+            self.quantile_values = np.full((*self.shape, len(self.quantiles)), np.nan)
+
+            if block_size is None:
+                block_size = max(1, BUFFER_SIZE // (int(np.prod(self.shape[1:])) * N))
+            self._buffer = np.empty((block_size, *self.shape[1:], N))
+            self._filled = np.zeros(block_size, dtype=bool)
+            self._block_begin = 0
+
+        # Members whose traces are kept (the number of members is known, so the reservoir is drawn at once)
+        generator = np.random.default_rng() if generator is None else generator
+        self.trace_members = np.sort(generator.choice(N, size=min(output_config.n_traces, N), replace=False))
+        self.traces = np.full((*self.shape, len(self.trace_members)), np.nan)
+
+    def add(self, index: int, values: np.ndarray):
+        """Members values (array of shape (*shape[1:], N)) of the row `index`"""
+        values = np.asarray(values, dtype=float)
+        self.traces[index] = values[..., self.trace_members]
+
+        if self.ensemble == 'members':
+            self.members[index] = values
+            return
+
+        block_size = len(self._buffer)
+        block_begin = index - index % block_size
+        if block_begin != self._block_begin:
+            self._flush()
+            self._block_begin = block_begin
+
+        self._buffer[index - block_begin] = values
+        self._filled[index - block_begin] = True
+
+    def results(self) -> dict:
+        """Summary of the ensemble, as a dictionary of arrays"""
+        if self.ensemble == 'members':
+            results = {'members': self.members}
+        else:
+            self._flush()
+            results = {'mean': self.mean, 'variance': self.variance, 'quantiles': self.quantile_values}
+
+        if len(self.trace_members):
+            results['trace_members'] = self.trace_members
+            results['traces'] = self.traces
+
+        return results
+
+    def _flush(self):
+        rows = np.flatnonzero(self._filled)
+        if not len(rows):
+            return
+
+        values = self._buffer[rows]
+        indexes = self._block_begin + rows
+
+        self.mean[indexes] = values.mean(axis=-1)
+        self.variance[indexes] = values.var(axis=-1, ddof=1 if self.N > 1 else 0)
+        self.quantile_values[indexes] = np.moveaxis(np.quantile(values, self.quantiles, axis=-1), 0, -1)
+
+        self._filled[:] = False
@@ -0,0 +1,96 @@
+import copy
+from typing import Optional
+
+import numpy as np
+
+from hoopla import data, rng, state_store
+from hoopla.config import Config
+from hoopla.forecast import make_forecast
+from hoopla.models.da_model import BaseDAModel
+from hoopla.models.hydro_model import BaseHydroModel
+from hoopla.models.pet_model import BasePETModel
+from hoopla.models.sar_model import BaseSARModel
+
+
+def make_update(
+        config: Config,
+        observations: dict,
+        forecast_data: dict,
+        hydro_model: BaseHydroModel,
+        pet_model: BasePETModel,
+        sar_model: BaseSARModel,
+        da_model: BaseDAModel,
+        parameters: list[float],
+        filepath_states: str,
+        filepath_results: str,
+        seed_sequence: Optional[np.random.SeedSequence] = None):
+    """Advance the stored model states with the new observations and issue their forecasts (operational hot start)
+
+    Only the observations following the last date of the state store (see hoopla.state_store) are run,
+    starting from the stored states. Without state store (first update), the states are initialized with
+    the warm up and the run of the observations from the beginning of the forecast period.
+    With perfect forecasts, the observations of the last horizon are the forecasts: the states are
+    advanced up to the horizon preceding the last observation.
+
+    `filepath_results` is formatted with the date of the last observation run (ex. '...-{date:%Y%m%dT%H}.json').
+    """
+    time_step = np.timedelta64(int(config.general.time_step.replace('h', '')), 'h')
+    stored_states = state_store.load_states(filepath_states)
+
+    # Period of the update
+    dates = observations['dates']
+    if stored_states is None:
+        date_begin = np.datetime64(config.dates.forecast.begin, 's')
+    else:
+        date_begin = stored_states.last_date + time_step
+
+    if config.forecast.perfect_forecast:
+        date_end = dates[-1] - config.forecast.horizon * time_step
+    else:
+        date_end = dates[-1]
+
+    if date_begin > date_end:
+        if stored_states is None:
+            print(f'No observations to run from the beginning of the forecast period ({date_begin}), no states stored.')
+        else:
+            print(f'No new observations since {stored_states.last_date}, the states are up to date.')
+        return
+
+    config = copy.deepcopy(config)
+    config.dates.forecast.begin = date_begin.item()
+    config.dates.forecast.end = date_end.item()
+    if stored_states is not None:
+        config.general.compute_warm_up = False  # The run continues from the stored states
+
+    # Random streams of the updates: the perturbations are keyed by their dates (see hoopla.assimilation.Perturbations),
+    # so that each update continues the perturbations of the previous one
+    seed_sequence = seed_sequence if seed_sequence is not None else rng.seed_sequence(config)
+    seed_sequence = rng.spawn(seed_sequence, rng.UPDATE)
+
+    # Crop the new observations
+    observations, observations_for_forecast, observations_for_warm_up = data.crop_data(
+        config=config,
+        observations=observations.copy(),
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        ini_type='ini_forecast',
+        forecast_data=forecast_data
+    )
+
+    make_forecast(
+        config=config,
+        observations=observations,
+        observations_for_warm_up=observations_for_warm_up,
+        observations_for_forecast=observations_for_forecast,
+        hydro_model=hydro_model,
+        pet_model=pet_model,
+        sar_model=sar_model,
+        da_model=da_model,
+        parameters=parameters,
+        filepath_results=filepath_results.format(date=date_end.item()),
+        seed_sequence=seed_sequence,
+        initial_states=stored_states
+    )
+
+    state_store.save_states(filepath_states, hydro_model.final_states)
@@ -1,24 +1,52 @@
 from datetime import datetime
-from typing import Sequence
+from typing import Union
 
 import numpy as np
 
 from hoopla.config import Config
 
+SECONDS_PER_DAY = 24 * 60 * 60
 
-def find_day_of_year(date: datetime) -> float:
-    """Compute day of the year (1st jan = 1, 31 dec = 365)"""
-    date_interval = date - datetime(year=date.year, month=1, day=1)
+
+def find_day_of_year(dates: Union[datetime, np.datetime64, np.ndarray]) -> Union[float, np.ndarray]:
+    """Compute day of the year (1st jan = 1, 31 dec = 365) of a date or an array of dates"""
+    dates = np.asarray(dates, dtype='datetime64[s]')
+    seconds = (dates - dates.astype('datetime64[Y]')).astype(np.int64)
 
     # In the original HOOPLA implementation, it returns fractional days
     # 1 day = 24h = 24 * 60 minutes = 24 * 60 * 60 seconds
-    return date_interval.days + date_interval.seconds / (60*60*24)
+    return seconds // SECONDS_PER_DAY + seconds % SECONDS_PER_DAY / SECONDS_PER_DAY
+
+
+def find_hour(dates: Union[datetime, np.datetime64, np.ndarray]) -> Union[int, np.ndarray]:
+    """Hour of the day (0 to 23) of a date or an array of dates"""
+    dates = np.asarray(dates, dtype='datetime64[s]')
+
+    return (dates - dates.astype('datetime64[D]')).astype(np.int64) // 3600
+
+
+def find_month(dates: Union[datetime, np.datetime64, np.ndarray]) -> Union[int, np.ndarray]:
+    """Month (1 to 12) of a date or an array of dates"""
+    return np.asarray(dates, dtype='datetime64[M]').astype(np.int64) % 12 + 1
+
+
+def find_date_indexes(dates: np.ndarray, reference_dates: np.ndarray) -> np.ndarray:
+    """Index of each of `dates` in `reference_dates` (-1 if absent), joined on the sorted dates"""
+    dates, reference_dates = np.asarray(dates, dtype='datetime64[s]'), np.asarray(reference_dates, dtype='datetime64[s]')
+    if len(reference_dates) == 0:
+        return np.full(np.shape(dates), -1)
+
+    order = np.argsort(reference_dates, kind='stable')
+    positions = np.minimum(np.searchsorted(reference_dates, dates, sorter=order), len(reference_dates) - 1)
+    indexes = order[positions]
+
+    return np.where(reference_dates[indexes] == dates, indexes, -1)
 
 
-def find_non_winter_indexes(dates: Sequence[datetime]):
+def find_non_winter_indexes(dates: np.ndarray) -> np.ndarray:
     JAN, FEB, MARS, DEC = 1, 2, 3, 12
 
-    return [i for i, date in enumerate(dates) if date.month not in (JAN, FEB, MARS, DEC)]
+    return np.flatnonzero(~np.isin(find_month(dates), (JAN, FEB, MARS, DEC)))
 
 
 def serialize_data(data: dict) -> dict:
@@ -30,6 +58,8 @@ def serialize_data(data: dict) -> dict:
             result[k] = v.tolist()
         elif isinstance(v, datetime):
             result[k] = v.strftime('%Y-%m-%d %H:%M:%S')
+        elif isinstance(v, np.datetime64):
+            result[k] = np.datetime64(v, 's').item().strftime('%Y-%m-%d %H:%M:%S')
 
         else:
             result[k] = v
@@ -46,6 +76,7 @@ def make_combinations(config: Config) -> list[dict]:
                 for da_model_name in config.models.da_models:
                     models_combination.append({
                         'config': config,
+                        'combination_number': len(models_combination),
                         'hydro_model_name': hydro_model_name,
                         'pet_model_name': pet_model_name,
                         'sar_model_name': sar_model_name,
@@ -0,0 +1,121 @@
+"""Verification of the streamflow forecasts, for each lead time
+
+The forecasts are (issues, horizon) matrices (deterministic forecasts) or (issues, horizon, members)
+ensembles, compared to the observations of their valid times. The rows of the time steps where no
+forecast is issued (NaN), and the missing observations, are ignored.
+"""
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from hoopla.calibration.scores import SCORES, mask_missing
+
+VERIFICATION_SCORES = ('NSE', 'gKGE', 'RMSE')  # Scores of the deterministic forecasts (and ensemble means)
+
+
+def observed_at_lead_times(observed: np.ndarray, horizon: int) -> np.ndarray:
+    """(time steps, horizon) observations of the valid times of the forecasts issued at each time step
+
+    The lead time l (1 to horizon) of the forecast issued at t is valid at t + l (NaN after the last observation).
+    """
+    observed = np.concatenate([np.asarray(observed, dtype=float), np.full(horizon, np.nan)])
+    valid_times = np.arange(len(observed) - horizon)[:, np.newaxis] + np.arange(1, horizon + 1)
+
+    return observed[valid_times]
+
+
+def lead_time_scores(observed: np.ndarray,
+                     forecast: np.ndarray,
+                     score_names: Sequence[str] = VERIFICATION_SCORES) -> dict:
+    """Scores (ex. NSE, KGE) of each lead time of the (issues, horizon) forecasts, over the issues"""
+    return {score_name: SCORES[score_name](observed, forecast, axis=0) for score_name in score_names}
+
+
+def crps(observed: np.ndarray, members: np.ndarray) -> np.ndarray:
+    """Continuous ranked probability score of the ensembles (members on the last axis)
+
+    Computed from the sorted members x_(1) <= ... <= x_(N), in O(N log N):
+    CRPS = mean |x_i - y| - sum (2i - N - 1) x_(i) / N^2
+    """
+    members = np.sort(members, axis=-1)
+    N = members.shape[-1]
+    weights = (2 * np.arange(1, N + 1) - N - 1) / N ** 2
+
+    return np.mean(np.abs(members - observed[..., np.newaxis]), axis=-1) - np.sum(members * weights, axis=-1)
+
+
+def rank_histogram(observed: np.ndarray, members: np.ndarray) -> np.ndarray:
+    """(horizon, N + 1) counts of the ranks of the observations among the members, for each lead time
+
+    The rank is the number of members below the observation.
+    """
+    observed, members = _mask_ensemble(observed, members)
+    N = members.shape[-1]
+    valid = ~np.isnan(observed)
+
+    ranks = np.sum(members < observed[..., np.newaxis], axis=-1)
+    lead_times = np.broadcast_to(np.arange(observed.shape[1]), observed.shape)
+
+    return np.bincount(lead_times[valid] * (N + 1) + ranks[valid], minlength=observed.shape[1] * (N + 1)).reshape(-1, N + 1)
+
+
+def reliability(observed: np.ndarray, quantile_values: np.ndarray) -> np.ndarray:
+    """(horizon, quantiles) observed frequency of the observations below the forecast quantiles, for each lead time
+
+    A reliable forecast has observed frequencies equal to the nominal probabilities of the quantiles.
+    """
+    observed, quantile_values = _mask_ensemble(observed, quantile_values)
+    below = np.where(np.isnan(observed[..., np.newaxis]), np.nan, observed[..., np.newaxis] <= quantile_values)
+
+    return np.nanmean(below, axis=0)
+
+
+def verify(observed: np.ndarray,
+           forecast: Union[np.ndarray, dict],
+           quantiles: Optional[Sequence[float]] = None) -> dict:
+    """Scores of each lead time of the forecasts issued at each time step of `observed`
+
+    Parameters
+    ----------
+    observed
+        Observed streamflow of the forecast period.
+    forecast
+        (issues, horizon) deterministic forecasts, or summary of the ensemble forecasts (see hoopla.summary.EnsembleSummary).
+        The CRPS and the rank histograms are only computed when the members are kept.
+    quantiles
+        Probabilities of the quantiles of the ensemble summary.
+
+    Returns
+    -------
+    Dictionary of (horizon,) arrays of scores (and the (horizon, N + 1) rank histograms and (horizon, quantiles)
+    reliability of the ensemble forecasts).
+    """
+    if not isinstance(forecast, dict):
+        return lead_time_scores(observed_at_lead_times(observed, forecast.shape[1]), forecast)
+
+    if 'members' in forecast:
+        members = np.asarray(forecast['members'], dtype=float)
+        observed = observed_at_lead_times(observed, members.shape[1])
+        observed, members = _mask_ensemble(observed, members)
+
+        scores = lead_time_scores(observed, members.mean(axis=-1))
+        scores['CRPS'] = np.nanmean(crps(observed, members), axis=0)
+        scores['rank_histogram'] = rank_histogram(observed, members)
+        if quantiles is not None:
+            scores['reliability'] = reliability(observed, np.moveaxis(np.quantile(members, quantiles, axis=-1), 0, -1))
+
+        return scores
+
+    observed = observed_at_lead_times(observed, forecast['mean'].shape[1])
+    scores = lead_time_scores(observed, forecast['mean'])
+    scores['reliability'] = reliability(observed, forecast['quantiles'])
+
+    return scores
+
+
+def _mask_ensemble(observed: np.ndarray, members: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Set to NaN the observations and members of the ensembles where the observation or any member is NaN"""
+    observed, _ = mask_missing(observed, np.where(np.isnan(members).any(axis=-1), np.nan, 0))
+    members = np.where(np.isnan(observed)[..., np.newaxis], np.nan, members)
+
+    return observed, members
@@ -1,12 +1,15 @@
 import multiprocessing
 
 import hoopla
-from hoopla import data, models
+from hoopla import data, models, rng
 from hoopla.calibration.calibration import make_calibration
-from hoopla.config import DATA_PATH
+from hoopla.calibration.cross_validation import make_cross_validation
+from hoopla.config import Config, DATA_PATH
 from hoopla.initialization import list_catchments
+from hoopla.models.sar_model import BaseSARModel
 from hoopla.simulation import make_simulation
 from hoopla.forecast import make_forecast
+from hoopla.update import make_update
 
 
 def run_hoopla(combinations: dict):
@@ -22,6 +25,9 @@ def run_hoopla(combinations: dict):
     sar_model = models.load_sar_model(combinations['sar_model_name'])
     da_model = models.load_da_model(combinations['da_model_name'])
 
+    # Random streams of the catchment and models combination, independent of the worker running them
+    seed_sequence = rng.seed_sequence(config, catchment_names.index(catchment_name), combinations['combination_number'])
+
     # Load observations
     print('Loading data ...')
     observations = data.load_observations(
@@ -35,25 +41,15 @@ def run_hoopla(combinations: dict):
     calibration_file_results = f'./results/calibration-C={catchment_name}-H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}.json'
     simulation_file_results = f'./results/simulation-C={catchment_name}-H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}.json'
     forecast_file_results = f'./results/forecast-C={catchment_name}-H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}.json'
+    # Operational updates: the model states (per data assimilation model), and the forecasts of each update
+    da_model_name = da_model.name() if config.data.do_data_assimilation else 'None'
+    states_file = f'./results/states-C={catchment_name}-H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}-D={da_model_name}.npz'
+    update_file_results = f'./results/update-C={catchment_name}-H={hydro_model.name()}-E={pet_model.name()}-S={sar_model.name()}-{{date:%Y%m%dT%H}}.json'
 
     # Calibration
     # -----------
     if config.operations.calibration:
-        model_parameters = data.load_model_parameters(
-            filepath=f'{DATA_PATH}/{config.general.time_step}/Model_parameters/model_param_boundaries.mat',
-            model_name=hydro_model.name(),
-            file_format='mat',
-        )
-
-        if config.general.compute_snowmelt:
-            sar_model_parameters = data.load_sar_model_parameters(
-                filepath=f'{DATA_PATH}/{config.general.time_step}/Model_parameters/snow_model_param_boundaries.mat',
-                model_name=sar_model.name(),
-                file_format='mat',
-                calibrate_snow=config.calibration.calibrate_snow
-            )
-            # Add the SAR model's parameters at the end of the parameters to calibrate
-            model_parameters += sar_model_parameters
+        model_parameters = data.load_calibration_parameters(config, hydro_model, sar_model)
 
         # Crop observed data according to specified dates and warm up
         print('Removing unused data ...')
@@ -75,7 +71,8 @@ def run_hoopla(combinations: dict):
             pet_model=pet_model,
             sar_model=sar_model,
             model_parameters=model_parameters,
-            filepath_results=calibration_file_results
+            filepath_results=calibration_file_results,
+            seed_sequence=seed_sequence
         )
 
     # Simulation
@@ -106,27 +103,14 @@ def run_hoopla(combinations: dict):
             sar_model=sar_model,
             da_model=da_model,
             parameters=calibrated_params,
-            filepath_results=simulation_file_results
+            filepath_results=simulation_file_results,
+            seed_sequence=seed_sequence
         )
 
     # Forecast
     if config.operations.forecast:
         # Load meteo forecast data
-        if config.forecast.meteo_ens:
-            # Meteorological ensemble prediction data
-            forecast_data = data.load_ens_met_data(
-                filepath=f'{DATA_PATH}/{config.general.time_step}/Ens_met_fcast/Met_fcast_{catchment_name}.mat',
-                file_format='mat',
-                config=config,
-                sar_model=sar_model
-            )
-        else:
-            forecast_data = data.load_forecast_data(
-                filepath=f'{DATA_PATH}/{config.general.time_step}/Det_met_fcast/Met_fcast_{catchment_name}.mat',
-                file_format='mat',
-                config=config,
-                sar_model=sar_model
-            )
+        forecast_data = load_forecast_data(config, catchment_name, sar_model)
 
         # Load calibrated model parameters
         calibrated_params = data.load_calibrated_model_parameters(
@@ -135,7 +119,7 @@ def run_hoopla(combinations: dict):
 
         # Crop data for the simulation
         print('Removing unused data ...')
-        observations, observations_for_forecast, observations_for_warm_up = data.crop_data(
+        observations_for_forecast_period, observations_for_forecast, observations_for_warm_up = data.crop_data(
             config=config,
             observations=observations.copy(),
             hydro_model=hydro_model,
@@ -147,7 +131,7 @@ def run_hoopla(combinations: dict):
 
         print('Starting forecast')
         make_forecast(
-            observations=observations,
+            observations=observations_for_forecast_period,
             observations_for_warm_up=observations_for_warm_up,
             observations_for_forecast=observations_for_forecast,
             config=config,
@@ -156,9 +140,69 @@ def run_hoopla(combinations: dict):
             sar_model=sar_model,
             da_model=da_model,
             parameters=calibrated_params,
-            filepath_results=forecast_file_results
+            filepath_results=forecast_file_results,
+            seed_sequence=seed_sequence
         )
 
+    # Operational update
+    # ------------------
+    if config.operations.update:
+        print('Starting update ...')
+        make_update(
+            config=config,
+            observations=observations,
+            forecast_data=load_forecast_data(config, catchment_name, sar_model),
+            hydro_model=hydro_model,
+            pet_model=pet_model,
+            sar_model=sar_model,
+            da_model=da_model,
+            parameters=data.load_calibrated_model_parameters(filepath=calibration_file_results),
+            filepath_states=states_file,
+            filepath_results=update_file_results,
+            seed_sequence=seed_sequence
+        )
+
+
+def load_forecast_data(config: Config, catchment_name: str, sar_model: BaseSARModel) -> dict:
+    if config.forecast.meteo_ens:
+        # Meteorological ensemble prediction data
+        return data.load_ens_met_data(
+            filepath=f'{DATA_PATH}/{config.general.time_step}/Ens_met_fcast/Met_fcast_{catchment_name}.mat',
+            file_format='mat',
+            config=config,
+            sar_model=sar_model
+        )
+
+    return data.load_forecast_data(
+        filepath=f'{DATA_PATH}/{config.general.time_step}/Det_met_fcast/Met_fcast_{catchment_name}.mat',
+        file_format='mat',
+        config=config,
+        sar_model=sar_model
+    )
+
+
+def run_cross_validation(config: Config):
+    catchment_names = list_catchments(config.general.time_step)
+    catchment_name = catchment_names[0]
+
+    # Load observations once, they are shared by every fold and models combination
+    print('Loading data ...')
+    observations = data.load_observations(
+        path=f'{DATA_PATH}/{config.general.time_step}/Hydromet_obs/Hydromet_obs_{catchment_name}.mat',
+        file_format='mat',
+        config=config,
+        pet_model=models.load_pet_model(config.models.pet_models[0]),
+        sar_model=models.load_sar_model(config.models.sar_models[0])
+    )
+
+    print('Starting cross-validation ...')
+    make_cross_validation(
+        config=config,
+        observations=observations,
+        filepath_results=f'./results/cross_validation-C={catchment_name}.json',
+        seed_sequence=rng.seed_sequence(config, catchment_names.index(catchment_name))
+    )
+
 
 if __name__ == '__main__':
     config = hoopla.load_config('./config.toml')
@@ -170,6 +214,9 @@ if __name__ == '__main__':
     print('snow_models', models.list_sar_models())
     print('da_models', models.list_da_models())
 
+    if config.operations.cross_validation:
+        run_cross_validation(config)
+
     models_combination = hoopla.util.make_combinations(config)
 
     if config.general.parallelism:
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from hoopla import models
+from hoopla.calibration.cross_validation import _crop_fold, _score
+from hoopla.config import Fold
+
+DAY = np.timedelta64(1, 'D')
+
+
+def _fold(calibration: tuple, validation: tuple) -> Fold:
+    return Fold(
+        calibration={'begin': datetime(*calibration[0]), 'end': datetime(*calibration[1])},
+        validation={'begin': datetime(*validation[0]), 'end': datetime(*validation[1])}
+    )
+
+
+@pytest.fixture
+def fold_config(config):
+    config.general.time_step = '24h'
+    config.general.compute_warm_up = True
+    config.cross_validation.folds = [
+        _fold(((2000, 1, 1), (2001, 12, 31)), ((2002, 1, 1), (2003, 12, 31))),
+        _fold(((2002, 1, 1), (2003, 12, 31)), ((2000, 1, 1), (2001, 12, 31))),
+    ]
+
+    return config
+
+
+@pytest.mark.parametrize('i_fold', [0, 1])
+def test_crop_fold(fold_config, make_observations, i_fold):
+    observations = make_observations('1990-01-01', '2004-12-31')
+    fold = fold_config.cross_validation.folds[i_fold]
+
+    config, fold_data = _crop_fold(
+        fold_config, fold, observations, models.load_hydro_model('HydroMod1'),
+        models.load_pet_model('Oudin'), models.load_sar_model('CemaNeige')
+    )
+    calibration_dates = fold_data['observations_for_calibration']['dates']
+    validation_dates = fold_data['observations_for_validation']['dates']
+
+    # Contiguous periods, from the beginning to the end of the fold periods
+    for dates, period in [(calibration_dates, fold.calibration), (validation_dates, fold.validation)]:
+        np.testing.assert_array_equal(np.diff(dates), DAY)
+        assert dates[0] == np.datetime64(period.begin) and dates[-1] == np.datetime64(period.end)
+
+    # No overlap, and all the dates of the folds covered
+    assert not np.any(np.isin(calibration_dates, validation_dates))
+    np.testing.assert_array_equal(
+        np.sort(np.concatenate([calibration_dates, validation_dates])),
+        np.arange(np.datetime64('2000-01-01', 's'), np.datetime64('2004-01-01', 's'), DAY)
+    )
+
+    # Warm up just before the calibration, and the PET computed as in the calibration
+    assert fold_data['observations_for_calibration_warm_up']['dates'][-1] + DAY == calibration_dates[0]
+    assert config.general.compute_pet == fold_config.general.compute_pet
+
+
+@pytest.mark.parametrize('remove_winter', [False, True])
+def test_score(config, make_observations, remove_winter):
+    observations = make_observations('2000-01-01', '2001-12-31')
+    config.calibration.score = 'NSE'
+    config.calibration.remove_winter = remove_winter
+
+    hydro_model = models.load_hydro_model('HydroMod1')
+    hydro_model.config = config
+    hydro_model.observations = observations
+    hydro_model.observed_streamflow = observations['Q']
+
+    simulated_streamflow = observations['Q'] + np.random.default_rng(1).normal(0, 0.5, len(observations['Q']))
+    months = observations['dates'].astype('datetime64[M]').astype(int) % 12 + 1
+    kept = ~np.isin(months, [12, 1, 2, 3]) if remove_winter else np.ones(len(months), dtype=bool)
+    observed, simulated = observations['Q'][kept], simulated_streamflow[kept]
+
+    expected = 1 - np.sum((observed - simulated) ** 2) / np.sum((observed - np.mean(observed)) ** 2)
+    assert _score(config, hydro_model, simulated_streamflow) == pytest.approx(expected)
+    assert _score(config, hydro_model, observations['Q'].astype(float)) == 1
@@ -0,0 +1,83 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+import spotpy.parameter
+
+from hoopla.calibration.optimization import lbfgsb_refinement
+
+
+class QuadraticModel:
+    """Hydro model stand-in: the simulation is the parameters, the cost their squared distance to a target"""
+
+    def __init__(self, target: list[float]):
+        self.model_params = [
+            spotpy.parameter.Uniform(low=0, high=1, optguess=0.5),
+            spotpy.parameter.Uniform(low=-2, high=2, optguess=0),
+            spotpy.parameter.Constant(3.0),
+        ]
+        self.target = np.array(target)
+        self.n_evaluations = 0
+
+    def simulation(self, parameters):
+        self.n_evaluations += 1
+        return np.array(parameters, dtype=float)
+
+    def evaluation(self):
+        return self.target
+
+    def objectivefunction(self, simulation, evaluation):
+        return float(np.sum((simulation - evaluation) ** 2))
+
+
+def _bounds(hydro_model):
+    return np.array([p.minbound for p in hydro_model.model_params]), np.array([p.maxbound for p in hydro_model.model_params])
+
+
+@pytest.mark.parametrize('target', [
+    [0.3, 0.7, 3.0],  # Inside the boundaries
+    [1.5, -3.0, 3.0],  # Outside the boundaries: the solution is on the boundaries
+])
+def test_lbfgsb_refinement(target):
+    hydro_model = QuadraticModel(target)
+    lower_bounds, upper_bounds = _bounds(hydro_model)
+    initial_parameters = [0.9, 1.0, 3.0]
+    initial_cost = hydro_model.objectivefunction(np.array(initial_parameters), hydro_model.target)
+
+    parameters, cost = lbfgsb_refinement(hydro_model, initial_parameters, peps=1e-10, max_iteration=200)
+
+    assert np.all((lower_bounds <= parameters) & (parameters <= upper_bounds))
+    assert parameters[2] == 3.0
+    assert cost < initial_cost
+    assert cost == pytest.approx(hydro_model.objectivefunction(np.array(parameters), hydro_model.target))
+    np.testing.assert_allclose(parameters, np.clip(target, lower_bounds, upper_bounds), atol=1e-3)
+
+
+def test_lbfgsb_refinement_evaluations():
+    hydro_model = QuadraticModel([0.3, 0.7, 3.0])
+
+    lbfgsb_refinement(hydro_model, [0.9, 1.0, 3.0], peps=1e-12, max_iteration=10)
+
+    # One evaluation of the initial parameters, and at most 2 calls of 2·n + 1 evaluations
+    assert hydro_model.n_evaluations <= 1 + 2 * 5
+
+
+def test_lbfgsb_refinement_does_not_worsen():
+    hydro_model = QuadraticModel([0.3, 0.7, 3.0])
+
+    parameters, cost = lbfgsb_refinement(hydro_model, [0.3, 0.7, 3.0], peps=1e-10, max_iteration=100)
+
+    assert parameters == (0.3, 0.7, 3.0) and cost == 0
+
+
+def _refine(target: list[float]) -> tuple:
+    return lbfgsb_refinement(QuadraticModel(target), [0.9, 1.0, 3.0], peps=1e-10, max_iteration=200, parallelism=True)
+
+
+def test_lbfgsb_refinement_in_pool_worker():
+    # As the models combinations run in parallel (see main.py): the pool workers cannot have their own pool
+    with multiprocessing.Pool(1) as pool:
+        parameters, cost = pool.apply(_refine, ([0.3, 0.7, 3.0],))
+
+    assert (parameters, cost) == _refine([0.3, 0.7, 3.0])
+    np.testing.assert_allclose(parameters, [0.3, 0.7, 3.0], atol=1e-3)
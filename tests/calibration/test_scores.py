@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from spotpy import objectivefunctions
+
+from hoopla.calibration.scores import SCORES, cost, pareto_front
+
+
+@pytest.mark.parametrize('score_name, spotpy_function', [
+    ('RMSE', objectivefunctions.rmse),
+    ('MSE', objectivefunctions.mse),
+    ('MAE', objectivefunctions.mae),
+    ('NSE', objectivefunctions.nashsutcliffe),
+    ('r', objectivefunctions.correlationcoefficient),
+    ('gKGE', objectivefunctions.kge),
+])
+def test_scores_match_spotpy(score_name, spotpy_function):
+    rng = np.random.default_rng(42)
+    evaluation = rng.gamma(2, 2, size=100)
+    simulation = evaluation + rng.normal(0, 1, size=100)
+
+    result = SCORES[score_name](evaluation, simulation)
+
+    assert result == pytest.approx(spotpy_function(evaluation, simulation))
+
+
+def test_scores_ignore_missing_values():
+    evaluation = np.array([1.0, 2.0, np.nan, 4.0])
+    simulation = np.array([1.5, 2.0, 3.0, np.nan])
+
+    result = SCORES['RMSE'](evaluation, simulation)
+
+    assert result == pytest.approx(np.sqrt(0.5 ** 2 / 2))
+
+
+def test_scores_along_axis():
+    rng = np.random.default_rng(42)
+    evaluation = rng.gamma(2, 2, size=(50, 3))
+    simulation = evaluation + rng.normal(0, 1, size=(50, 3))
+
+    result = SCORES['NSE'](evaluation, simulation, axis=0)
+
+    assert result == pytest.approx([SCORES['NSE'](evaluation[:, i], simulation[:, i]) for i in range(3)])
+
+
+def test_cost_of_maximized_score():
+    evaluation = np.array([1.0, 2.0, 3.0])
+
+    assert cost('NSE', evaluation, evaluation) == pytest.approx(0)
+    assert cost('RMSE', evaluation, evaluation) == pytest.approx(0)
+
+
+def test_pareto_front():
+    costs = np.array([
+        [1, 4],
+        [2, 2],
+        [3, 3],  # Dominated by [2, 2]
+        [4, 1],
+        [4, 1.5],  # Dominated by [4, 1]
+    ])
+
+    result = pareto_front(costs)
+
+    assert result.tolist() == [True, True, False, True, False]
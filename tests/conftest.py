@@ -0,0 +1,50 @@
+import copy
+import os
+
+import numpy as np
+import pytest
+
+import hoopla
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_config = hoopla.load_config(os.path.join(ROOT, 'config.toml'))
+
+
+@pytest.fixture
+def config():
+    """Configuration of the repository (config.toml), modifiable by the test"""
+    return copy.deepcopy(_config)
+
+
+def synthetic_observations(begin: str, end: str, time_step: str = '24h', seed: int = 0) -> dict:
+    """Synthetic observations, shaped as returned by `data.load_observations`"""
+    dates = np.arange(np.datetime64(begin, 's'), np.datetime64(end, 's') + 1,
+                      np.timedelta64(int(time_step.replace('h', '')), 'h'))
+    rng = np.random.default_rng(seed)
+    seasons = np.cos(2 * np.pi * (dates - dates.astype('datetime64[Y]')).astype(float) / (365.25 * 86400))
+
+    T = (5 - 10 * seasons + rng.normal(0, 3, len(dates))).astype(np.float32)  # Cold winters, with snow
+    P = np.where(rng.random(len(dates)) < 0.4, rng.gamma(0.8, 8, len(dates)), 0).astype(np.float32)  # Dry and wet steps
+
+    return {
+        'Beta': 0,
+        'QNBV': 322.7,
+        'Vmin': 0.1,
+        'latitude': 47.19,
+        'Q': rng.gamma(2, 1, len(dates)).astype(np.float32),
+        'T': T,
+        'Tmax': T + 4,
+        'Tmin': T - 4,
+        'Zz5': np.array([218.4, 299.5, 347.1, 381.8, 446.3]),
+        'gradT': np.full(365, -0.4),
+        'P': P,
+        'dates': dates,
+        'E': np.maximum(2 - 2 * seasons, 0) + rng.random(len(dates)) * 0.1,
+    }
+
+
+@pytest.fixture
+def make_observations():
+    """Factory of synthetic observations (see `synthetic_observations`)"""
+    return synthetic_observations
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from hoopla.data import cache
+from hoopla.data.ensemble import EnsembleForecastVariable
+
+
+class _Reader:
+    """Reads the source files as {'x': their bytes, 'scale': 2.5}, counting the reads"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, filepath: str) -> dict:
+        self.count += 1
+        with open(filepath, 'rb') as file:
+            return {'x': np.frombuffer(file.read(), dtype=np.uint8), 'scale': 2.5}
+
+
+def test_cache_is_reused_until_the_file_changes(tmp_path):
+    filepath = str(tmp_path / 'data.mat')
+    with open(filepath, 'wb') as file:
+        file.write(bytes(range(10)))
+    read = _Reader()
+
+    for _ in range(2):
+        variables = cache.load(filepath, read)
+        np.testing.assert_array_equal(variables['x'], np.arange(10))
+        assert variables['scale'] == 2.5
+    assert read.count == 1
+
+    # Touched only
+    os.utime(filepath, ns=(0, 0))
+    cache.load(filepath, read)
+    assert read.count == 1
+
+    with open(filepath, 'wb') as file:
+        file.write(bytes(range(1, 11)))
+    np.testing.assert_array_equal(cache.load(filepath, read)['x'], np.arange(1, 11))
+    assert read.count == 2
+
+
+def test_ensemble_forecasts_and_uncacheable_files(tmp_path):
+    filepath = str(tmp_path / 'ens.mat')
+    open(filepath, 'wb').close()
+    members = np.random.default_rng(0).random((4, 6, 3))
+
+    variables = cache.load(filepath, lambda _: {'T': EnsembleForecastVariable(members.T.copy(), transposed=True)})
+    np.testing.assert_array_equal(variables['T'], members)
+
+    filepath = str(tmp_path / 'names.mat')
+    open(filepath, 'wb').close()
+
+    variables = cache.load(filepath, lambda _: {'T': members, 'name': 'Demo'})
+    assert variables['name'] == 'Demo'
+    assert not os.path.exists(tmp_path / cache.CACHE_DIRECTORY / 'names.mat')
+
+
+def test_cached_hdf5_file_is_closed(tmp_path):
+    h5py = pytest.importorskip('h5py')
+    filepath = str(tmp_path / 'ens.mat')
+    members = np.random.default_rng(0).random((4, 6, 3))
+    with h5py.File(filepath, 'w') as file:
+        file['T'] = members.T
+
+    file = h5py.File(filepath, 'r')
+    variables = cache.load(filepath, lambda _: {'T': EnsembleForecastVariable(file['T'], transposed=True)})
+
+    assert not file  # Closed once cached
+    np.testing.assert_array_equal(np.stack([variables['T'][i] for i in range(4)]), members)
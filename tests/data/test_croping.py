@@ -0,0 +1,71 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from hoopla import models
+from hoopla.data import croping
+from hoopla.data.croping import crop_data, find_warm_up_year
+
+
+def test_find_warm_up_year():
+    dates = np.arange(np.datetime64('2001-01-01', 's'), np.datetime64('2005-01-01', 's'), np.timedelta64(1, 'D'))
+    years = dates.astype('datetime64[Y]').astype(int) + 1970
+    P = (years - 2001) ** 2.  # Sliding years of 2002 to 2004: total precipitation of 1, 4 and 9 per day
+
+    index_warmup = find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.)
+
+    # The sliding year closest to the mean is the one of 2003
+    np.testing.assert_array_equal(years[index_warmup], 2003)
+    assert len(index_warmup) == 364
+    assert find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.) is index_warmup
+
+    # Missing precipitation in a sliding year (as np.sum, the mean is NaN and the first sliding year is kept)
+    P = P.copy()
+    P[-10] = np.nan
+    np.testing.assert_array_equal(years[find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.)], 2002)
+
+
+def test_find_warm_up_year_cache():
+    dates = np.arange(np.datetime64('2001-01-01', 's'), np.datetime64('2005-01-01', 's'), np.timedelta64(1, 'D'))
+    P = np.ones(len(dates))
+    index_warmup = find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.)
+
+    # The cache is bounded: the least recently used indexes are dropped
+    for _ in range(croping.WARM_UP_YEARS_CACHE_SIZE - 1):
+        find_warm_up_year(dates, np.ones(len(dates)), np.datetime64('2004-07-01', 's'), 24.)
+    assert find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.) is index_warmup
+    for _ in range(croping.WARM_UP_YEARS_CACHE_SIZE):
+        find_warm_up_year(dates, np.ones(len(dates)), np.datetime64('2004-07-01', 's'), 24.)
+
+    assert len(croping._warm_up_years) == croping.WARM_UP_YEARS_CACHE_SIZE
+    assert find_warm_up_year(dates, P, np.datetime64('2004-07-01', 's'), 24.) is not index_warmup
+
+
+@pytest.mark.parametrize('time_step', ['3h', '24h'])
+def test_perfect_forecast(config, make_observations, time_step):
+    config.general.time_step = time_step
+    config.general.compute_warm_up = False
+    config.forecast.perfect_forecast = True
+    config.forecast.horizon = 10
+    config.forecast.issue_time = 6
+    config.dates.forecast.begin, config.dates.forecast.end = datetime.datetime(2001, 2, 1), datetime.datetime(2001, 3, 1)
+    observations = make_observations('2001-01-01', '2001-03-31', time_step)
+
+    observations_cropped, forecast_data, _ = crop_data(
+        config=config, observations=observations.copy(), hydro_model=models.load_hydro_model('HydroMod1'),
+        pet_model=models.load_pet_model('Oudin'), sar_model=models.load_sar_model('CemaNeige'), ini_type='ini_forecast',
+        forecast_data={}
+    )
+
+    np.testing.assert_array_equal(forecast_data['dates'], observations_cropped['dates'])
+    for i in [0, 1, 2, 3, len(forecast_data['dates']) - 1]:
+        t = np.flatnonzero(observations['dates'] == forecast_data['dates'][i])[0]
+        for name in ['P', 'T', 'Tmin', 'Tmax']:
+            if time_step == '3h' and forecast_data['dates'][i].item().hour != 6:  # Not issued
+                assert np.all(np.isnan(forecast_data[name][i]))
+            else:
+                np.testing.assert_array_equal(forecast_data[name][i], observations[name][t + 1:t + 1 + 10])
+
+    # The daily forecasts are views of the observations
+    assert np.shares_memory(forecast_data['P'], observations['P']) == (time_step == '24h')
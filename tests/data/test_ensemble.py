@@ -0,0 +1,31 @@
+import h5py
+import numpy as np
+import pytest
+
+from hoopla.data.ensemble import EnsembleForecastVariable
+
+
+@pytest.fixture
+def forecast():
+    return np.random.default_rng(0).random(size=(6, 4, 3))  # (issues, lead times, members)
+
+
+def test_hdf5_matches_array(forecast, tmp_path):
+    with h5py.File(tmp_path / 'forecast.mat', 'w') as file:
+        file['P'] = forecast.T  # MATLAB v7.3 files store the arrays in column-major order
+
+    with h5py.File(tmp_path / 'forecast.mat', 'r') as file:
+        lazy = EnsembleForecastVariable(file['P'], transposed=True)
+
+        assert lazy.shape == (6, 4, 3)
+        for issue in range(6):
+            np.testing.assert_array_equal(lazy[issue], forecast[issue])
+
+
+def test_crop(forecast):
+    cropped = EnsembleForecastVariable(forecast).crop([-1, 4, -1, 1], horizon=2)
+
+    assert cropped.shape == (4, 2, 3)
+    assert np.all(np.isnan(cropped[0])) and np.all(np.isnan(cropped[2]))
+    np.testing.assert_array_equal(cropped[1], forecast[4, :2])
+    np.testing.assert_array_equal(cropped.crop([1, 3], horizon=2)[1], forecast[1, :2])
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from hoopla import models
+
+
+def test_rng_must_be_seeded():
+    da_model = models.load_da_model('ParticleFilter')
+
+    with pytest.raises(ValueError, match='seeded'):
+        da_model.rng.random()
+
+    da_model.seed(np.random.SeedSequence(1, spawn_key=(0,)))
+    draws = da_model.rng.random(3)
+
+    # Same stream for the same seed sequence
+    da_model.seed(np.random.SeedSequence(1, spawn_key=(0,)))
+    np.testing.assert_array_equal(da_model.rng.random(3), draws)
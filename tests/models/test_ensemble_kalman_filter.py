@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from hoopla.models.DA.ensemble_kalman_filter import update
+
+
+@pytest.mark.parametrize('n_obs', [1, 3])
+def test_update(n_obs):
+    rng = np.random.default_rng(0)
+    N = 20
+    X = rng.gamma(2, 10, size=(4, N))
+    HX = rng.gamma(2, 1, size=(n_obs, N))
+    E = rng.normal(0, 0.1, size=(n_obs, N))
+    D = HX.mean(axis=1, keepdims=True) + E
+
+    # Kalman gain computed from the sample covariances
+    A = X - X.mean(axis=1, keepdims=True)
+    HA = HX - HX.mean(axis=1, keepdims=True)
+    K = A @ HA.T / (N - 1) @ np.linalg.inv(HA @ HA.T / (N - 1) + E @ E.T / N)
+    expected = X + K @ (D - HX)
+
+    result = update(X.copy(), HX, D, E)
+
+    np.testing.assert_allclose(result, expected)
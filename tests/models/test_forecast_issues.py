@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from hoopla import models
+from hoopla.models import hydro_model as hydro_model_module
+from hoopla.data.ensemble import EnsembleForecastVariable
+
+PARAMS = [300., 0.5, 20., 2.3, 0.3, 5., 0.9, 0.4]
+HORIZON = 5
+
+
+def _observations_for_forecast(observations: dict, meteo_ens: bool) -> dict:
+    """Forecasts issued every other time step (not issued: nan rows, or issue index -1)"""
+    rng = np.random.default_rng(1)
+    nbr_steps = len(observations['dates'])
+    issued = np.arange(nbr_steps) % 2 == 0
+    issued[-HORIZON:] = False
+
+    observations_for_forecast = {
+        'dates': observations['dates'],
+        'leadTime': np.arange(1, HORIZON + 1) * (observations['dates'][1] - observations['dates'][0]),
+    }
+    T = rng.normal(5, 8, (nbr_steps, HORIZON, 4))
+    meteo_forecast = {
+        'P': np.where(rng.random(T.shape) < 0.4, rng.gamma(0.8, 8, T.shape), 0), 'T': T, 'Tmin': T - 4, 'Tmax': T + 4
+    }
+    for name, values in meteo_forecast.items():
+        if meteo_ens:
+            observations_for_forecast[name] = EnsembleForecastVariable(values, issue_indexes=np.where(issued, np.arange(nbr_steps), -1))
+        else:
+            observations_for_forecast[name] = np.where(issued[:, np.newaxis], values[..., 0], np.nan)
+
+    return observations_for_forecast
+
+
+def _forecast(config, observations: dict, observations_for_forecast: dict):
+    hydro_model = models.load_hydro_model('HydroMod1')
+    hydro_model.setup(
+        config=config, operation='forecast', observations=observations, pet_model=models.load_pet_model('Oudin'),
+        sar_model=models.load_sar_model('CemaNeige'), observations_for_warmup={},
+        observations_for_forecast=observations_for_forecast, da_model=models.load_da_model('EnsembleKalmanFilter'),
+        seed_sequence=np.random.SeedSequence(7)
+    )
+
+    return hydro_model.simulation(PARAMS)
+
+
+def _assert_equal_results(results, expected):
+    for result, expected_result in zip(results, expected):
+        if isinstance(expected_result, dict):
+            assert result.keys() == expected_result.keys()
+            for name in expected_result:
+                np.testing.assert_array_equal(result[name], expected_result[name])
+        else:
+            np.testing.assert_array_equal(result, expected_result)
+
+    forecast_streamflow = expected[1]['mean'] if isinstance(expected[1], dict) else expected[1]
+    assert np.sum(~np.isnan(forecast_streamflow).any(axis=1)) > 30  # The forecasts of the issues are compared
+
+
+@pytest.fixture(params=[(False, False), (False, True), (True, False), (True, True)], ids=lambda p: 'meteo_ens={}-DA={}'.format(*p))
+def forecast_setup(request, config, make_observations):
+    """Configuration, observations and forecasts of a forecast (meteorological ensemble, data assimilation)"""
+    meteo_ens, do_data_assimilation = request.param
+    observations = make_observations('2001-01-01', '2001-03-31')
+    config.general.time_step = '24h'
+    config.general.compute_warm_up = False
+    config.general.compute_pet = True
+    config.general.compute_snowmelt = True
+    config.data.do_data_assimilation = do_data_assimilation
+    config.data.N = 5
+    config.data.updated_res = ['S', 'R', 'T']  # Updated by the EnKF (see hoopla.forecast)
+    config.forecast.horizon = HORIZON
+    config.forecast.meteo_ens = meteo_ens
+    config.forecast.shards = 1
+
+    return config, observations, _observations_for_forecast(observations, meteo_ens)
+
+
+def test_batched_forecast_equals_issue_by_issue_forecast(forecast_setup, monkeypatch):
+    batched = _forecast(*forecast_setup)
+
+    monkeypatch.setattr(hydro_model_module, 'FORECAST_BATCH_SIZE', 1)  # Batches of a single issue
+    issue_by_issue = _forecast(*forecast_setup)
+
+    _assert_equal_results(batched, issue_by_issue)
+
+
+def test_sharded_forecast_equals_serial_forecast(forecast_setup):
+    config, observations, observations_for_forecast = forecast_setup
+    serial = _forecast(config, observations, observations_for_forecast)
+
+    config.forecast.shards = 3  # Run on a process pool
+    sharded = _forecast(config, observations, observations_for_forecast)
+
+    _assert_equal_results(sharded, serial)
+
+
+def test_forecast_model_has_no_observations(forecast_setup):
+    config, observations, observations_for_forecast = forecast_setup
+    hydro_model = models.load_hydro_model('HydroMod1')
+    hydro_model.setup(
+        config=config, operation='forecast', observations=observations, pet_model=models.load_pet_model('Oudin'),
+        sar_model=models.load_sar_model('CemaNeige'), observations_for_warmup={},
+        observations_for_forecast=observations_for_forecast
+    )
+
+    # Sent to the workers of the forecast shards
+    forecast_model = hydro_model._forecast_model()
+
+    assert forecast_model.observations is None and forecast_model.observations_for_forecast is None
+    assert forecast_model.config is config and forecast_model.sar_model is hydro_model.sar_model
+
+
+@pytest.mark.parametrize('time_step', ['3h', '24h'])
+def test_forecast_pet_equals_issue_by_issue_pet(config, make_observations, time_step):
+    config.general.time_step = time_step
+    config.general.compute_pet = True
+    config.forecast.horizon = HORIZON
+    config.forecast.meteo_ens = False
+    observations = make_observations('2001-01-01', '2001-03-31', time_step)
+    observations_for_forecast = _observations_for_forecast(observations, meteo_ens=False)
+    hydro_model, pet_model = models.load_hydro_model('HydroMod1'), models.load_pet_model('Oudin')
+    hydro_model.setup(
+        config=config, operation='forecast', observations=observations, pet_model=pet_model,
+        sar_model=models.load_sar_model('CemaNeige'), observations_for_warmup={},
+        observations_for_forecast=observations_for_forecast
+    )
+
+    E = hydro_model._setup_forecast_pet_data()
+
+    issued = ~np.isnan(observations_for_forecast['P']).any(axis=1)
+    assert issued.sum() > 30 and not issued.all()
+    assert np.all(np.isnan(E[~issued]))
+    for t in np.flatnonzero(issued):
+        pet_params = pet_model.prepare(
+            time_step=config.general.time_step,
+            model_inputs={
+                'dates': observations_for_forecast['dates'][t] + observations_for_forecast['leadTime'],
+                'T': observations_for_forecast['T'][t]
+            },
+            hyper_parameters={'latitude': observations['latitude']}
+        )
+        np.testing.assert_array_equal(E[t], pet_model.run(pet_params))
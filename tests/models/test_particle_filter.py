@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from hoopla.models.DA.particle_filter import effective_sample_size, resample, update_weights
+
+
+@pytest.mark.parametrize('technique', ['systematic_resampling', 'multinomial_resampling'])
+def test_resample(technique):
+    generator = np.random.default_rng(0)
+    weights = np.array([0.0, 0.5, 0.0, 0.25, 0.25])
+
+    result = resample(weights, technique, generator)
+
+    assert result.shape == (5,)
+    assert set(result) <= {1, 3, 4}
+
+
+def test_systematic_resampling_is_proportional():
+    generator = np.random.default_rng(0)
+    weights = np.array([0.1, 0.2, 0.3, 0.4])
+
+    result = resample(np.repeat(weights / 100, 100), 'systematic_resampling', generator) // 100
+
+    np.testing.assert_array_equal(np.bincount(result, minlength=4), [40, 80, 120, 160])
+
+
+def test_update_weights():
+    weights = np.full(3, 1 / 3)
+
+    result = update_weights(weights, Qsim=np.array([1.0, 2.0, 3.0]), Q=2.0, sigma=0.5)
+
+    assert np.isclose(result.sum(), 1)
+    assert result[1] > result[0]
+    assert np.isclose(result[0], result[2])
+    assert effective_sample_size(weights) == pytest.approx(3)
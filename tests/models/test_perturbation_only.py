@@ -0,0 +1,58 @@
+import numpy as np
+
+from hoopla import models, rng
+from hoopla.assimilation import initialize
+from hoopla.models.DA.perturbation_only import DAModel
+from hoopla.models.states import EnsembleStates
+
+PARAMS = [300., 0.5, 20., 2.3, 0.3, 5., 0.9, 0.4]
+
+
+def test_run_does_not_update_the_states():
+    states = EnsembleStates.from_state_variables({'S': 1., 'R': 2., 'HY': np.arange(3.)}, ['S', 'R', 'HY'], 4)
+    data = states.data.copy()
+    weights = np.full(4, 0.25)
+
+    result, result_weights = DAModel().run(
+        state_variables=states, Qsim=np.arange(4.), Q=10., QRP=np.full(4, 10.), eQ=np.ones(4),
+        DA_config=None, weights=weights
+    )
+
+    assert result is states and result_weights is weights
+    np.testing.assert_array_equal(result.data, data)
+
+
+def test_members_are_the_perturbed_input_runs(config, make_observations):
+    observations = make_observations('2001-01-01', '2001-06-30')
+    config.general.compute_warm_up = False
+    config.data.do_data_assimilation = True
+    config.data.N = 5
+    config.data.dt = 1  # The DA model is called at every time step
+    config.output.ensemble = 'members'
+    seed_sequence = np.random.SeedSequence(3)
+
+    hydro_model, pet_model, sar_model = models.load_hydro_model('HydroMod1'), models.load_pet_model('Oudin'), models.load_sar_model('CemaNeige')
+    hydro_model.setup(
+        config=config, operation='simulation', observations=observations, pet_model=pet_model, sar_model=sar_model,
+        observations_for_warmup={}, da_model=models.load_da_model('PertOnly'), seed_sequence=seed_sequence
+    )
+    members = hydro_model.simulation(PARAMS)['members']
+
+    # Each member run alone with its perturbed inputs, drawn from the same random stream
+    perturbations, _ = initialize(observations, config, pet_model, rng.spawn(seed_sequence, rng.PERTURBATIONS))
+    params, sar_params = hydro_model.precompute_parameters(np.array(PARAMS)), sar_model.precompute_parameters(np.array(PARAMS))
+    member_states = [hydro_model.prepare(params) for _ in range(config.data.N)]
+    member_sar_states = [sar_model.prepare(sar_params, observations) for _ in range(config.data.N)]
+    expected = np.empty((len(observations['dates']), config.data.N))
+    for t, date in enumerate(observations['dates']):
+        perturbed = perturbations[t]
+        for j in range(config.data.N):
+            runoff_d, member_sar_states[j] = sar_model.run(
+                {'P': perturbed['PtRP'][j], 'T': perturbed['TsnowRP'][j], 'Tmin': perturbed['TminRP'][j],
+                 'Tmax': perturbed['TmaxRP'][j], 'Date': date},
+                sar_params, member_sar_states[j]
+            )
+            expected[t, j], member_states[j] = hydro_model.run({'P': runoff_d, 'E': perturbed['ERP'][j]}, params, member_states[j])
+
+    np.testing.assert_allclose(members, expected, rtol=1e-12)
+    assert np.all(np.std(members[10:], axis=1) > 0)  # The members are driven by different inputs
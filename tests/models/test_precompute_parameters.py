@@ -0,0 +1,105 @@
+import calendar
+
+import numpy as np
+import pytest
+
+from hoopla import models
+
+PARAMS = [300., 0.5, 20., 2.3, 0.3, 5., 0.9, 0.4]
+
+
+def _baseline_hydro_model_1(P: float, E: float, params: list, state_variables: dict) -> float:
+    """HydroMod1 time step, computed from the model parameters only (before the precomputed parameters)"""
+    S, R, T, DL, HY = (state_variables[name] for name in ['S', 'R', 'T', 'DL', 'HY'])
+
+    Ps = (1 - params[4]) * P
+    Pr = P - Ps
+    if Ps >= E:
+        S = S + Ps - E
+        Is = max(0.0, S - params[0])
+        S = S - Is
+    else:
+        S = S * np.exp((Ps - E) / params[0])
+        Is = 0
+
+    R = R + Is * (1 - params[1])
+    Qr = R / (params[2] * params[5])
+    R = R - Qr
+
+    T = T + Pr + Is * params[1]
+    Qt = T / params[5]
+    T = T - Qt
+
+    HY = np.append(HY[1:], 0) + DL * (Qt + Qr)
+    state_variables.update({'S': S, 'R': R, 'T': T, 'HY': HY})
+
+    return max(0, HY[0])
+
+
+def _baseline_cema_neige(inputs: dict, params: list, state_variables: dict) -> float:
+    """CemaNeige time step, computed from the model parameters only (before the precomputed parameters)"""
+    CTg, Kf = params[-2], params[-1]
+    G, eTg, Zz, ZmedBV = state_variables['G'], state_variables['eTg'], state_variables['Zz'], state_variables['ZmedBV']
+
+    date = inputs['Date'].item()
+    day_of_year = date.timetuple().tm_yday
+    if calendar.isleap(date.year) and day_of_year > 59:
+        day_of_year -= 1
+    theta = state_variables['gradT'][day_of_year - 1]
+
+    Tz = inputs['T'] + theta * (Zz - ZmedBV) / 100
+    Tzmax = inputs['Tmax'] + theta * (Zz - ZmedBV) / 100
+    Tzmin = inputs['Tmin'] + theta * (Zz - ZmedBV) / 100
+    modc = np.exp(state_variables['Beta'] * (Zz - ZmedBV))
+    Pz = (1 / (np.sum(modc) / 5)) * (inputs['P'] / 5) * modc
+
+    fracneige = np.clip(np.where(Tzmax <= 0, 1, np.where(Tzmin >= 0, 0, 1 - Tzmax / (Tzmax - Tzmin))), 0, 1)
+    Pg = Pz * fracneige
+    Pl = Pz - Pg
+
+    G = G + Pg
+    eTg = np.clip(CTg * eTg + (1 - CTg) * Tz, a_max=0.0, a_min=None)
+    Fpot = (Tz > 0) * np.minimum(G, Kf * (Tz - state_variables['Tf']) * (eTg >= state_variables['Tf']))
+    fnts = np.clip(G / (state_variables['QNBV'] * 0.9), a_max=1, a_min=None)
+    snow_melt = Fpot * ((1 - state_variables['Vmin']) * fnts + state_variables['Vmin'])
+
+    state_variables.update({'G': G - snow_melt, 'eTg': eTg})
+
+    return np.sum(Pl) + np.sum(snow_melt)
+
+
+@pytest.mark.parametrize('compute_snowmelt', [False, True])
+def test_simulation_with_precomputed_parameters(config, make_observations, compute_snowmelt):
+    observations = make_observations('2001-01-01', '2001-12-31')
+    config.general.compute_pet = False
+    config.general.compute_warm_up = False
+    config.general.compute_snowmelt = compute_snowmelt
+
+    hydro_model, sar_model = models.load_hydro_model('HydroMod1'), models.load_sar_model('CemaNeige')
+    hydro_model.setup_for_calibration(
+        config=config,
+        operation='calibration',
+        objective_function=None,
+        observations=observations,
+        observations_for_warmup={},
+        observed_streamflow=observations['Q'],
+        pet_model=models.load_pet_model('Oudin'),
+        sar_model=sar_model,
+        model_parameters=[]
+    )
+    simulated_streamflow = hydro_model.simulation(PARAMS)
+
+    state_variables = hydro_model.prepare(np.array(PARAMS))
+    sar_state_variables = sar_model.prepare(params=None, hyper_parameters=observations)
+    expected = []
+    for i, date in enumerate(observations['dates']):
+        P = observations['P'][i]
+        if compute_snowmelt:
+            P = _baseline_cema_neige(
+                {name: observations[name][i] for name in ['P', 'T', 'Tmin', 'Tmax']} | {'Date': date},
+                PARAMS, sar_state_variables
+            )
+        expected.append(_baseline_hydro_model_1(P, observations['E'][i], PARAMS, state_variables))
+
+    assert np.sum(np.array(expected) > 0) > 300
+    np.testing.assert_array_equal(simulated_streamflow, expected)
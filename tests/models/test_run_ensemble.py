@@ -0,0 +1,61 @@
+import numpy as np
+
+from hoopla import models
+from hoopla.models.states import EnsembleStates
+
+N = 8
+N_STEPS = 400
+
+
+def _run_both(model, params: np.ndarray, state_variables: dict, inputs: list[dict]):
+    """Run the N members with `run_ensemble`, and one by one with `run`, from the same prepared states"""
+    ensemble = EnsembleStates.from_state_variables(state_variables, model.state_names(), N)
+    members = [ensemble.member(j) for j in range(N)]
+
+    for model_inputs in inputs:
+        Qsim, ensemble = model.run_ensemble(model_inputs, params, ensemble)
+
+        for j in range(N):
+            member_inputs = {name: value[j] if np.ndim(value) else value for name, value in model_inputs.items()}
+            Qsim_member, members[j] = model.run(member_inputs, params, members[j])
+            assert Qsim[j] == Qsim_member
+
+    for j in range(N):
+        for name in model.state_names():
+            np.testing.assert_array_equal(ensemble.member(j)[name], members[j][name])
+
+
+def test_hydro_model_1():
+    hydro_model = models.load_hydro_model('HydroMod1')
+    params = hydro_model.precompute_parameters(np.array([300., 0.5, 20., 2.3, 0.3, 5.]))
+    rng = np.random.default_rng(0)
+
+    # Dry (Ps < E) and wet steps, different for each member
+    inputs = [
+        {'P': np.where(rng.random(N) < 0.5, 0., rng.gamma(0.8, 10, N)), 'E': rng.random(N) * 4}
+        for _ in range(N_STEPS)
+    ]
+
+    _run_both(hydro_model, params, hydro_model.prepare(params), inputs)
+
+
+def test_cema_neige():
+    sar_model = models.load_sar_model('CemaNeige')
+    params = sar_model.precompute_parameters(np.array([0.25, 3.74]))
+    hyper_parameters = {
+        'Zz5': np.array([218.4, 299.5, 347.1, 381.8, 446.3]), 'Beta': 0, 'gradT': np.full(365, -0.4),
+        'QNBV': 322.7, 'Vmin': 0.1
+    }
+    rng = np.random.default_rng(0)
+
+    # Temperatures below and above zero (snow accumulation, mixed precipitation and melt)
+    dates = np.datetime64('2001-01-01', 's') + np.arange(N_STEPS) * np.timedelta64(1, 'D')
+    inputs = []
+    for date in dates:
+        T = rng.uniform(-10, 10, N)
+        inputs.append({
+            'P': rng.gamma(0.8, 10, N), 'T': T, 'Tmin': T - rng.uniform(0, 5, N), 'Tmax': T + rng.uniform(0, 5, N),
+            'Date': date
+        })
+
+    _run_both(sar_model, params, sar_model.prepare(params, hyper_parameters), inputs)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from hoopla.models.states import EnsembleStates, snapshot
+
+
+def _make_states(N=3):
+    state_variables = {'S': 1.0, 'R': 2.0, 'HY': np.zeros(4), 'UH': np.ones(4)}
+
+    return EnsembleStates.from_state_variables(state_variables, state_names=['S', 'R', 'HY'], N=N)
+
+
+def test_members_own_their_states():
+    states = _make_states()
+
+    member = states.member(0)
+    member['S'] = 10.0
+    member['HY'][:] = 5.0
+    states.set_member(0, member)
+
+    assert states.member(0)['S'] == 10.0
+    assert states.member(1)['S'] == 1.0
+    np.testing.assert_array_equal(states.member(1)['HY'], np.zeros(4))
+    np.testing.assert_array_equal(states.member(2)['UH'], np.ones(4))
+
+
+def test_get_set():
+    states = _make_states()
+
+    states.set(['R', 'S'], np.array([[1, 2], [3, 4], [5, 6]]))
+
+    np.testing.assert_array_equal(states.get(['S']), [[2], [4], [6]])
+    assert states.N == 3
+
+
+def test_forks_do_not_change_the_snapshot():
+    initial_states = _make_states().snapshot()
+
+    forks = initial_states.fork([0, 0, 2, 2])
+    forks.buffers['HY'][1] = 3.0
+    forks.set(['S'], np.array([[5], [6], [7], [8]]))
+
+    with pytest.raises(ValueError):
+        initial_states.buffers['HY'][0] = 1.0
+
+    np.testing.assert_array_equal(initial_states.data, _make_states().data)
+    np.testing.assert_array_equal(forks.data[:, 0], [5, 6, 7, 8])
+    np.testing.assert_array_equal(forks.member(1)['HY'], np.full(4, 3.0))
+    np.testing.assert_array_equal(forks.member(0)['HY'], np.zeros(4))
+
+
+def test_snapshot_of_a_state_variables_dictionary():
+    state_variables = {'S': 1.0, 'R': 2.0, 'HY': np.zeros(4), 'UH': np.ones(4)}
+
+    forecast_state_variables = snapshot(state_variables, ['S', 'R', 'HY']).member(0)
+    forecast_state_variables['HY'][:-1] = 1.0
+
+    np.testing.assert_array_equal(state_variables['HY'], np.zeros(4))
+
+
+def test_concatenate():
+    first, second = _make_states(N=2), _make_states(N=3)
+    second.set(['S'], np.full((3, 1), 7.0))
+
+    states = EnsembleStates.concatenate([first.snapshot(), second.snapshot()])
+
+    assert states.N == 5
+    np.testing.assert_array_equal(states.get(['S']).ravel(), [1, 1, 7, 7, 7])
+    np.testing.assert_array_equal(states.buffers['HY'], np.zeros((5, 4)))
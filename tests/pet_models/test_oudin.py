@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from hoopla.models.PET.oudin import PETModel
+
+
+@pytest.mark.parametrize('time_step', ['3h', '24h'])
+def test_ensemble_temperatures(time_step):
+    dates = np.array([datetime(2015, 6, 1) + timedelta(hours=3 * i) for i in range(16)])
+    T = np.random.default_rng(0).normal(15, 5, size=(16, 4))
+    pet_model = PETModel()
+
+    def run(T):
+        pet_params = pet_model.prepare(time_step, {'dates': dates, 'T': T}, {'latitude': 46.8})
+        return pet_model.run(pet_params)
+
+    E = run(T)
+
+    assert E.shape == (16, 4)
+    for j in range(4):
+        np.testing.assert_array_equal(E[:, j], run(T[:, j]))
@@ -1,8 +1,9 @@
 from datetime import datetime
 
+import numpy as np
 import pytest
 
-from hoopla.util import find_day_of_year
+from hoopla.util import find_date_indexes, find_day_of_year, find_hour, find_month, find_non_winter_indexes
 
 
 @pytest.mark.parametrize('date, expected_day_number', [
@@ -15,3 +16,25 @@ def test_find_day_of_year(date, expected_day_number):
     result = find_day_of_year(date)
 
     assert result == expected_day_number
+
+
+def test_find_day_of_year_of_datetime64_array():
+    dates = np.array(['2001-01-01T00', '2001-01-01T12', '2001-03-21T06'], dtype='datetime64[s]')
+
+    np.testing.assert_array_equal(find_day_of_year(dates), [0, 0.5, 79.25])
+
+
+def test_find_hour_and_month():
+    dates = np.array(['2001-01-01T00', '2001-06-15T03', '2001-12-31T21'], dtype='datetime64[s]')
+
+    np.testing.assert_array_equal(find_hour(dates), [0, 3, 21])
+    np.testing.assert_array_equal(find_month(dates), [1, 6, 12])
+    np.testing.assert_array_equal(find_non_winter_indexes(dates), [1])
+
+
+def test_find_date_indexes():
+    reference_dates = np.array(['2001-01-02', '2001-01-01', '2001-01-04'], dtype='datetime64[s]')
+    dates = np.array(['2000-12-31', '2001-01-01', '2001-01-02', '2001-01-03', '2001-01-04', '2001-01-05'], dtype='datetime64[s]')
+
+    np.testing.assert_array_equal(find_date_indexes(dates, reference_dates), [-1, 1, 0, -1, 2, -1])
+    np.testing.assert_array_equal(find_date_indexes(dates, reference_dates[:0]), np.full(6, -1))
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from hoopla.assimilation import BLOCK_SIZE, Perturbations
+
+
+@pytest.fixture
+def perturbations():
+    T = 2 * BLOCK_SIZE + 10
+    rng = np.random.default_rng(0)
+    observations = {
+        'dates': [datetime(2000, 1, 1) + timedelta(days=t) for t in range(T)],
+        'P': rng.gamma(0.5, 4, size=T) * (rng.random(T) > 0.5),
+        'T': rng.normal(5, 10, size=T),
+        'Tmin': rng.normal(0, 10, size=T),
+        'Tmax': rng.normal(10, 10, size=T),
+        'E': rng.gamma(2, 1, size=T),
+        'Q': rng.gamma(2, 1, size=T),
+    }
+    config = SimpleNamespace(
+        general=SimpleNamespace(compute_pet=False, time_step='24h'),
+        data=SimpleNamespace(N=4, Uc_T_pet=2, Uc_T_snow_melt=2, Uc_T_max=2, Uc_T_min=2, Uc_Q=0.1, Uc_Pt=0.5, Uc_E=0.1),
+    )
+
+    return Perturbations(observations, config, seed=42)
+
+
+def test_perturbations_do_not_depend_on_chunks(perturbations):
+    whole = perturbations.chunk(0, len(perturbations))
+    chunks = [perturbations.chunk(begin, min(begin + 100, len(perturbations))) for begin in range(0, len(perturbations), 100)]
+
+    for name, values in whole.items():
+        assert values.shape == (len(perturbations), 4)
+        np.testing.assert_array_equal(values, np.concatenate([chunk[name] for chunk in chunks]))
+        np.testing.assert_array_equal(values[BLOCK_SIZE + 3], perturbations[BLOCK_SIZE + 3][name])
+
+
+def test_perturbations(perturbations):
+    whole = perturbations.chunk(0, len(perturbations))
+
+    assert np.all(whole['PtRP'] >= 0)
+    assert np.all(whole['PtRP'][perturbations.observations['P'] == 0] == 0)
+    np.testing.assert_allclose(whole['QRP'] + whole['eQRP'], np.tile(perturbations.observations['Q'][:, np.newaxis], (1, 4)))
+
+
+def test_perturbations_do_not_depend_on_the_beginning(perturbations):
+    whole = perturbations.chunk(0, len(perturbations))
+
+    # Observations beginning later (ex. an operational update): same perturbations at the same dates
+    begin = BLOCK_SIZE // 2 + 7
+    later = Perturbations(
+        {name: values[begin:] for name, values in perturbations.observations.items()}, perturbations.config, seed=42
+    )
+
+    for name, values in later.chunk(0, len(later)).items():
+        np.testing.assert_array_equal(values, whole[name][begin:])
+        np.testing.assert_array_equal(later[3][name], whole[name][begin + 3])
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from hoopla import rng
+
+
+def _config(seed):
+    return SimpleNamespace(general=SimpleNamespace(seed=seed))
+
+
+def test_streams_only_depend_on_their_keys():
+    parent = rng.seed_sequence(_config(42), 0, 1)
+
+    first = rng.generator(parent, rng.PERTURBATIONS, 3).random(5)
+    rng.generator(parent, rng.PERTURBATIONS, 2).random(100)
+    second = rng.generator(rng.seed_sequence(_config(42), 0, 1), rng.PERTURBATIONS, 3).random(5)
+
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, rng.generator(rng.seed_sequence(_config(42), 1, 1), rng.PERTURBATIONS, 3).random(5))
+
+
+def test_seed_global_state():
+    parent = rng.seed_sequence(_config(42))
+
+    seed = rng.seed_global_state(parent, rng.CALIBRATION)
+    first = np.random.random()
+    rng.seed_global_state(parent, rng.CALIBRATION)
+
+    assert 0 <= seed < 2 ** 30
+    assert np.random.random() == first
+    assert rng.seed_global_state(None) is None
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from hoopla import state_store
+from hoopla.models.states import EnsembleStates
+
+
+def _states(N):
+    return EnsembleStates.from_state_variables({'S': 1., 'R': 2., 'UH': np.zeros(3), 'weights': np.ones(3)}, ['S', 'R', 'UH'], N)
+
+
+def test_save_and_load(tmp_path):
+    filepath = str(tmp_path / 'states.npz')
+    assert state_store.load_states(filepath) is None
+
+    data = np.random.default_rng(0).random((4, 5))
+    state_store.save_states(filepath, state_store.StoredStates(
+        last_date=np.datetime64('2016-07-01T06:00:00'), state_variables=data, weights=np.full(4, 0.25)
+    ))
+    stored_states = state_store.load_states(filepath)
+
+    assert stored_states.last_date == np.datetime64('2016-07-01T06:00:00')
+    np.testing.assert_array_equal(stored_states.state_variables, data)
+    np.testing.assert_array_equal(stored_states.weights, np.full(4, 0.25))
+    assert stored_states.sar_state_variables is None
+
+
+def test_restore():
+    data = np.arange(10.).reshape(2, 5)
+    states = state_store.restore(_states(2).snapshot(), data)
+
+    assert states.member(1)['R'] == 6
+    np.testing.assert_array_equal(states.buffers['UH'], data[:, 2:])
+    np.testing.assert_array_equal(states.constants['weights'], np.ones(3))
+
+    states.set(['S'], np.zeros((2, 1)))  # Writable, and independent of the stored states
+    assert data[0, 0] == 0 and data[1, 0] == 5
+
+    with pytest.raises(ValueError):
+        state_store.restore(_states(3), data)
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from hoopla.summary import EnsembleSummary
+
+
+def _output_config(ensemble='summary', n_traces=0):
+    return SimpleNamespace(ensemble=ensemble, quantiles=[0.1, 0.5, 0.9], n_traces=n_traces)
+
+
+@pytest.mark.parametrize('shape', [(600,), (300, 4)])
+def test_summary_matches_full_ensemble(shape):
+    rng = np.random.default_rng(0)
+    members = rng.gamma(2, 1, size=(*shape, 20))
+    members[7] = np.nan  # Rows never added are left to nan
+
+    summary = EnsembleSummary(shape, 20, _output_config(n_traces=3), generator=rng, block_size=64)
+    for index in range(shape[0]):
+        if index != 7:
+            summary.add(index, members[index])
+    results = summary.results()
+
+    np.testing.assert_allclose(results['mean'], members.mean(axis=-1))
+    np.testing.assert_allclose(results['variance'], members.var(axis=-1, ddof=1))
+    np.testing.assert_allclose(results['quantiles'], np.moveaxis(np.quantile(members, [0.1, 0.5, 0.9], axis=-1), 0, -1))
+    np.testing.assert_array_equal(results['traces'], members[..., results['trace_members']])
+    assert len(np.unique(results['trace_members'])) == 3
+
+
+def test_members():
+    members = np.random.default_rng(0).random(size=(10, 5))
+
+    summary = EnsembleSummary((10,), 5, _output_config(ensemble='members'))
+    for index in range(10):
+        summary.add(index, members[index])
+
+    assert list(summary.results()) == ['members']
+    np.testing.assert_array_equal(summary.results()['members'], members)
+
+    with pytest.raises(ValueError):
+        EnsembleSummary((10,), 5, _output_config(ensemble='all'))
@@ -0,0 +1,113 @@
+import datetime
+import json
+import os
+
+import numpy as np
+import pytest
+
+from hoopla import models, state_store
+from hoopla.update import make_update
+
+from tests.conftest import ROOT
+
+
+def _make_update(config, observations: dict, tmp_path, hydro_model=None):
+    filepath_states, filepath_results = str(tmp_path / 'states.npz'), str(tmp_path / 'results-{date:%Y%m%dT%H}.json')
+
+    make_update(
+        config=config, observations=observations, forecast_data={},
+        hydro_model=hydro_model if hydro_model is not None else models.load_hydro_model('HydroMod1'),
+        pet_model=models.load_pet_model('Oudin'), sar_model=models.load_sar_model('CemaNeige'),
+        da_model=models.load_da_model('EnsembleKalmanFilter'), parameters=[300., 0.5, 20., 2.3, 0.3, 5., 0.9, 0.4],
+        filepath_states=filepath_states, filepath_results=filepath_results
+    )
+
+    return filepath_states
+
+
+def test_states_up_to_date(config, make_observations, tmp_path, capsys):
+    config.general.time_step = '24h'
+    config.forecast.perfect_forecast = False
+    observations = make_observations('2001-01-01', '2001-03-31')
+    stored_states = state_store.StoredStates(last_date=observations['dates'][-1], state_variables=np.ones((1, 3)))
+    state_store.save_states(str(tmp_path / 'states.npz'), stored_states)
+
+    filepath_states = _make_update(config, observations, tmp_path)
+
+    assert f'since {observations["dates"][-1]}' in capsys.readouterr().out
+    assert state_store.load_states(filepath_states).last_date == stored_states.last_date
+    assert os.listdir(tmp_path) == ['states.npz']  # No forecast results
+
+
+def test_no_observations_in_forecast_period(config, make_observations, tmp_path, capsys):
+    config.general.time_step = '24h'
+    config.forecast.perfect_forecast = True  # The last horizon of observations are the forecasts
+    observations = make_observations('2001-01-01', '2001-03-31')
+    config.dates.forecast.begin = (observations['dates'][-config.forecast.horizon]).item()
+
+    filepath_states = _make_update(config, observations, tmp_path)
+
+    assert 'no states stored' in capsys.readouterr().out
+    assert state_store.load_states(filepath_states) is None
+    assert os.listdir(tmp_path) == []
+
+
+def _results(directory, date: np.datetime64) -> dict:
+    with open(os.path.join(directory, f'results-{date.item():%Y%m%dT%H}.json')) as file:
+        return json.load(file)
+
+
+def _assert_results_equal(results, expected, begin: int):
+    """Results of an update equal to the results of the same time steps (from `begin`) of a continuous run"""
+    for name in ['Qsim', 'Qforecast']:
+        # Ensemble summary (dict of mean, quantiles, ...) or streamflow
+        values = results[name] if isinstance(results[name], dict) else {'': results[name]}
+        expected_values = expected[name] if isinstance(expected[name], dict) else {'': expected[name]}
+        assert values.keys() == expected_values.keys()
+
+        for key, value in values.items():
+            value = np.array(value, dtype=float)
+            np.testing.assert_array_equal(value, np.array(expected_values[key], dtype=float)[begin:begin + len(value)])
+
+
+@pytest.mark.parametrize('do_data_assimilation', [False, True])
+def test_updates_continue_the_run(config, make_observations, tmp_path, monkeypatch, do_data_assimilation):
+    monkeypatch.chdir(ROOT)  # Reservoirs updated by the data assimilation (see hoopla.forecast)
+    config.general.time_step = '24h'
+    config.general.compute_warm_up = False
+    config.general.overwrite = True
+    config.data.do_data_assimilation = do_data_assimilation
+    config.data.N = 5
+    config.forecast.perfect_forecast = True
+    config.forecast.horizon = 5
+    config.dates.forecast.begin = datetime.datetime(2001, 3, 1)
+    observations = make_observations('2001-01-01', '2001-08-31')
+    horizon = config.forecast.horizon
+
+    # Updates with the observations up to the end of June (period A), then up to the end of August (period B)
+    end_A = np.flatnonzero(observations['dates'] == np.datetime64('2001-06-30', 's'))[0]
+    os.mkdir(tmp_path / 'updates')
+    hydro_model = models.load_hydro_model('HydroMod1')
+    filepath_states = _make_update(
+        config, {name: values[:end_A + 1 + horizon] if name in ('dates', 'P', 'T', 'Tmin', 'Tmax', 'Q', 'E') else values
+                 for name, values in observations.items()},
+        tmp_path / 'updates', hydro_model
+    )
+    assert state_store.load_states(filepath_states).last_date == observations['dates'][end_A]
+    _make_update(config, observations, tmp_path / 'updates', hydro_model)
+    states = state_store.load_states(filepath_states)
+    assert states.last_date == observations['dates'][-1 - horizon]
+
+    # Continuous run over A and B
+    os.mkdir(tmp_path / 'continuous')
+    continuous_states = state_store.load_states(_make_update(config, observations, tmp_path / 'continuous'))
+
+    assert continuous_states.last_date == states.last_date
+    np.testing.assert_array_equal(states.state_variables, continuous_states.state_variables)
+    np.testing.assert_array_equal(states.sar_state_variables, continuous_states.sar_state_variables)
+    np.testing.assert_array_equal(states.weights, continuous_states.weights)
+
+    begin_B = end_A + 1 - np.flatnonzero(observations['dates'] == np.datetime64('2001-03-01', 's'))[0]
+    continuous = _results(tmp_path / 'continuous', observations['dates'][-1 - horizon])
+    _assert_results_equal(_results(tmp_path / 'updates', observations['dates'][end_A]), continuous, begin=0)  # A
+    _assert_results_equal(_results(tmp_path / 'updates', observations['dates'][-1 - horizon]), continuous, begin=begin_B)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from hoopla import verification
+
+
+def test_crps_matches_definition():
+    rng = np.random.default_rng(0)
+    observed = rng.gamma(2, 1, size=(30, 4))
+    members = rng.gamma(2, 1, size=(30, 4, 15))
+
+    expected = np.mean(np.abs(members - observed[..., np.newaxis]), axis=-1) - 0.5 * np.mean(
+        np.abs(members[..., :, np.newaxis] - members[..., np.newaxis, :]), axis=(-2, -1)
+    )
+
+    np.testing.assert_allclose(verification.crps(observed, members), expected)
+
+
+def test_rank_histogram_ignores_missing_values():
+    observed = np.array([[0.5, 2.5], [np.nan, 1.5], [3.5, 0.5]])
+    members = np.tile([1., 2., 3.], (3, 2, 1))
+    members[2, 1, 0] = np.nan  # Ensemble not issued
+
+    np.testing.assert_array_equal(verification.rank_histogram(observed, members), [[1, 0, 0, 1], [0, 1, 1, 0]])
+
+
+def test_verify_deterministic_forecasts():
+    observed = np.arange(1., 21.)
+    forecast = verification.observed_at_lead_times(observed, 3)
+
+    np.testing.assert_array_equal(forecast[0], [2, 3, 4])
+    np.testing.assert_array_equal(forecast[-2], [20, np.nan, np.nan])
+
+    forecast[::2] = np.nan  # Time steps without forecast
+    scores = verification.verify(observed, forecast)
+
+    np.testing.assert_allclose(scores['NSE'], 1)
+    np.testing.assert_allclose(scores['RMSE'], 0)
+
+
+def test_verify_ensemble_summary():
+    rng = np.random.default_rng(0)
+    observed = rng.normal(size=2001)
+    quantiles = [0.1, 0.5, 0.9]
+    # Reliable forecasts: the quantiles of the distribution of the observations
+    summary = {
+        'mean': np.zeros((2001, 2)),
+        'quantiles': np.broadcast_to(np.array([-1.2816, 0, 1.2816]), (2001, 2, 3))
+    }
+
+    scores = verification.verify(observed, summary, quantiles)
+
+    assert scores['reliability'].shape == (2, 3)
+    np.testing.assert_allclose(scores['reliability'], np.broadcast_to(quantiles, (2, 3)), atol=0.03)
+    assert 'CRPS' not in scores